@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+from eth_abi.abi import encode as abi_encode
+
+from chains import registery
+from clients.evm.dex.dto import TokenPair
+from clients.evm.dex.uniswap import UniswapV3Client
+from config import settings
+from utils.cpu import CpuExecutor
+
+POOLS = int(os.environ.get("BENCH_POOLS", 1000))
+TICK = 0.005
+
+
+def build_batch(client: UniswapV3Client) -> tuple[dict, dict]:
+    pairs_map, pool_data = {}, {}
+    fees = client.FEE_TIERS
+
+    for i in range(POOLS // len(fees)):
+        token_a = "0x" + f"{i + 1:040x}"
+        token_b = "0x" + f"{i + 1:040x}"[::-1]
+        pairs_map[f"pair_{i}"] = TokenPair(token_a, token_b, 18, 6, True)
+
+        for fee in fees:
+            pool_data[(token_a, token_b, fee)] = [
+                (True, abi_encode(
+                    ["uint160", "int24", "uint16", "uint16", "uint16", "uint8", "bool"],
+                    [2 ** 96 * (i + 7) // 3, 0, 0, 0, 0, 0, True]
+                )),
+                (True, abi_encode(["uint128"], [10 ** 21 + i])),
+                (True, abi_encode(["uint256"], [10 ** 22 + i * fee])),
+                (True, abi_encode(["uint256"], [10 ** 10 + i * fee])),
+            ]
+
+    return pairs_map, pool_data
+
+
+async def measure(client: UniswapV3Client, pairs_map: dict, pool_data: dict) -> tuple[float, float]:
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            max_lag = max(max_lag, time.perf_counter() - started - TICK)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 2)
+
+    started = time.perf_counter()
+    await client._parse_pool_jobs(pairs_map, pool_data)
+    elapsed = time.perf_counter() - started
+
+    done.set()
+    await task
+    return elapsed, max_lag
+
+
+async def main():
+    client = UniswapV3Client(registery.list()[0])
+    pairs_map, pool_data = build_batch(client)
+
+    # the first offloaded run pays for spawning the workers
+    settings.set("CPU_OFFLOAD_MIN_BATCH", 1)
+    await measure(client, pairs_map, pool_data)
+
+    for mode, min_batch in [("inline", POOLS + 1), ("offloaded", 1)]:
+        settings.set("CPU_OFFLOAD_MIN_BATCH", min_batch)
+        elapsed, max_lag = await measure(client, pairs_map, pool_data)
+        print(f"{mode:>10}: {len(pool_data)} pools in {elapsed * 1000:.1f} ms, max loop lag {max_lag * 1000:.1f} ms")
+
+    CpuExecutor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
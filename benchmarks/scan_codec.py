@@ -0,0 +1,93 @@
+import json
+import time
+from dataclasses import asdict
+from decimal import Decimal
+
+from chains import registery
+from clients.evm import codec
+from clients.evm.dex.dto import PoolInfoAerodromeV2, PoolInfoV2, PoolInfoV3, TokenSnapshot
+from clients.evm.dto import TokenMeta
+from clients.evm.scan_cache import ChainScan, SkippedStage
+from clients.evm.scanner import BestPool, ChainWithToken, ScanResult
+
+ROUNDS = 2000
+
+
+def build_samples() -> dict[str, object]:
+    chain = registery.list()[0]
+    meta = TokenMeta("0x" + "ab" * 20, "Sample Token", "SMPL", 18, 10 ** 27)
+
+    v3 = PoolInfoV3(
+        pool="0x" + "11" * 20,
+        price_raw=Decimal("0.000000000123456789012345678"),
+        price=Decimal("0.000412345678901234567890"),
+        tvl=Decimal("1234567.891234567890123456"),
+        fee=3000,
+        sqrt_price=2 ** 150 + 12345,
+        liquidity_raw=2 ** 90 + 7,
+        amount_a=Decimal("1000.123456789012345678"),
+        amount_b=Decimal("52000.987654321098765432"),
+    )
+    v2 = PoolInfoV2("0x" + "22" * 20, Decimal("1.5"), Decimal("1.5"), Decimal("90000.5"), 10 ** 24, 10 ** 25)
+    aero = PoolInfoAerodromeV2("0x" + "33" * 20, Decimal("2.5"), Decimal("2.5"), Decimal("1000"), 10 ** 20, 10 ** 21, True)
+
+    snapshots = [
+        TokenSnapshot(
+            dex=dex,
+            version=version,
+            chain=chain,
+            token=meta.address,
+            weth=chain.weth_address,
+            meta=meta,
+            eth_token_pool=pool,
+            eth_stable_pools={"usdt": v2, "usdc": v3},
+            stable_token_pools={"usdt": aero, "usdc": None},
+            market_cap=Decimal("4123456.78"),
+        )
+        for dex, version, pool in [("uniswap", "v3", v3), ("uniswap", "v2", v2), ("aerodrome", "v2", aero)]
+    ]
+
+    best = BestPool(chain, "eth_token", "uniswap", "v3", v3, v3.tvl)
+    result = ScanResult(
+        route_type="direct",
+        chains_found=[ChainWithToken(c, meta) for c in registery.list()],
+        market_cap=Decimal("4123456.78"),
+        best_eth_token_pool=best,
+        best_eth_stable_pool=None,
+        best_stable_token_pool=None,
+        token_meta=meta,
+        token_price=Decimal("0.00412345678901234"),
+        token_price_raw=Decimal("0.000000000123456789012345678"),
+        skipped=[SkippedStage(chain.chain_id, chain.name, "snapshots", "aerodrome")],
+        wallet_balances={chain.chain_id: {"wallets": [{"id": 1, "address": "0x" + "44" * 20, "balance": "1.5"}]}},
+    )
+    scan = ChainScan(chain, meta, snapshots, 21_000_000, time.time())
+
+    return {"ScanResult": result, "ChainScan": scan}
+
+
+def bench(fn, value) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(value)
+    return (time.perf_counter() - started) / ROUNDS * 1e6
+
+
+def main():
+    for name, value in build_samples().items():
+        payload = codec.dumps(value)
+
+        # what a plain dataclass dump costs, ChainConfig copies included
+        baseline = json.dumps(asdict(value), default=str)
+
+        print(
+            f"{name:>10}: msgpack {len(payload)} B, "
+            f"encode {bench(codec.dumps, value):.0f} us, decode {bench(codec.loads, payload):.0f} us | "
+            f"json {len(baseline)} B, "
+            f"encode {bench(lambda v: json.dumps(asdict(v), default=str), value):.0f} us, "
+            f"decode {bench(json.loads, baseline):.0f} us (no types restored)"
+        )
+
+
+if __name__ == "__main__":
+    main()
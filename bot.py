@@ -16,8 +16,17 @@ from sqlalchemy.orm import sessionmaker
 
 from dialogs import include_dialogs
 from middlewares.db import DbSessionMiddleware
+from middlewares.redis import RedisMiddleware
 from handlers import setup_routers
+from services.alerts import AlertEngine
+from services.limit_orders import LimitOrderEngine
+from services.notifier import notifier
+from services.positions import PositionEngine
+from services.watch_engine import watch_engine
+from services.watchlist import WatchlistNotifier
+from taskiq_app.broker import broker
 from config import settings
+from utils.cpu import CpuExecutor
 # from middlewares.throttling import ThrottlingMiddleware
 
 from redis.asyncio.client import Redis
@@ -80,6 +89,32 @@ async def main():
 
     dp.update.outer_middleware(DbSessionMiddleware(db_pool))
 
+    # data redis (eth price, scan cache) is shared with the taskiq workers
+    redis = Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASSWORD,
+        decode_responses=True
+    )
+    dp.update.outer_middleware(RedisMiddleware(redis))
+
+    # scans can be dispatched to taskiq workers, see SCAN_DISPATCH
+    if settings.get("SCAN_DISPATCH", "local") == "worker":
+        await broker.startup()
+
+    notifier.start(bot, redis)
+
+    limit_order_engine = LimitOrderEngine()
+    position_engine = PositionEngine()
+
+    # watched tokens are re-priced every block for all users at once
+    if settings.get("WATCH_ENABLED", True):
+        watch_engine.register(WatchlistNotifier())
+        watch_engine.register(AlertEngine())
+        watch_engine.register(limit_order_engine)
+        watch_engine.register(position_engine)
+        await watch_engine.start(db_pool, redis)
+
     routers = setup_routers()
     dp.include_router(routers)
 
@@ -114,7 +149,16 @@ async def main():
         module_logger.info(f"Failed to startup bot: {e}")
     finally:
         module_logger.info("Bot stopped")
+        await watch_engine.stop()
+        await limit_order_engine.close()
+        await position_engine.close()
+        await notifier.stop()
         await bot.session.close()
+        await redis.aclose()
+        CpuExecutor.shutdown()
+
+        if settings.get("SCAN_DISPATCH", "local") == "worker":
+            await broker.shutdown()
 
 
 if __name__ == '__main__':
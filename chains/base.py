@@ -16,5 +16,7 @@ base = ChainConfig(
     available_dex=["uniswap_v2", "uniswap_v3", "aerodrome_v2"],
     stables=[
         StableConfig("USDC", "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913", 6),
-    ]
+    ],
+    block_time=2.0,
+    v3_ranking="depth",
 )
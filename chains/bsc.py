@@ -16,5 +16,6 @@ bsc = ChainConfig(
     available_dex=["uniswap_v2", "uniswap_v3"],
     stables=[
         StableConfig("USDT", "0x55d398326f99059fF775485246999027B3197955", 18),
-    ]
+    ],
+    block_time=0.75,
 )
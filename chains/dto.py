@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from decimal import Decimal
+from typing import Literal
 
 @dataclass
 class StableConfig:
@@ -21,3 +23,8 @@ class ChainConfig:
     quoter_address: str
     available_dex: list[str]
     stables: list[StableConfig]
+    block_time: float = 12.0
+    # concurrent RPC stages the scheduler lets through on this chain
+    rpc_capacity: int = 16
+    v3_ranking: Literal["tvl", "depth"] = "tvl"
+    v3_depth_range: Decimal = Decimal("2")
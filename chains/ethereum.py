@@ -17,7 +17,8 @@ ethereum = ChainConfig(
     stables=[
         StableConfig("USDC", "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48", 6),
         StableConfig("USDT", "0xdAC17F958D2ee523a2206206994597C13D831ec7", 6),
-    ]
+    ],
+    block_time=12.0,
 )
 
 # sepolia = ChainConfig(
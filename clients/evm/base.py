@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
+import asyncio
 from decimal import Decimal
 from typing import Any
 from web3 import AsyncWeb3
 from web3.providers import AsyncHTTPProvider
 from chains.dto import ChainConfig
 from clients.evm.dto import TokenMeta, TraceResult
+from utils.cpu import CpuExecutor
 
 
 class BaseWeb3Client(ABC):
@@ -48,6 +50,20 @@ class BaseWeb3Client(ABC):
             ],
             "stateMutability": "payable",
             "type": "function",
+        },
+        {
+            "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+            "name": "getEthBalance",
+            "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function",
+        },
+        {
+            "inputs": [],
+            "name": "getBlockNumber",
+            "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function",
         }
     ]
 
@@ -139,8 +155,9 @@ class BaseWeb3Client(ABC):
         max_gas_price: float,
         max_gas_limit: int,
         gas_delta: float,
+        gas_multiplier: float = 1.2,
     ) -> dict[str, Any]:
-        gas_limit = int(estimate_gas * 1.2)
+        gas_limit = int(estimate_gas * gas_multiplier)
 
         if gas_limit > max_gas_limit:
             gas_limit = max_gas_limit
@@ -167,10 +184,14 @@ class BaseWeb3Client(ABC):
 
         return tx_params
 
-    async def trace_call(self, tx: dict):
+    async def trace_call(self, tx: dict, state_overrides: dict | None = None):
+        trace_config = {"tracer": "callTracer"}
+        if state_overrides:
+            trace_config["stateOverrides"] = state_overrides
+
         trace_result = await self.w3.provider.make_request(
             "debug_traceCall",
-            [tx, "latest", {"tracer": "callTracer"}],
+            [tx, "latest", trace_config],
         )
         return trace_result
 
@@ -219,20 +240,55 @@ class BaseWeb3Client(ABC):
 
 
     async def get_gas_fees(self) -> tuple[int, int]:
-        latest_block = await self.w3.eth.get_block("latest")
+        latest_block, max_priority_fee = await asyncio.gather(
+            self.w3.eth.get_block("latest"),
+            self.w3.eth.max_priority_fee
+        )
         base_fee = latest_block.get("baseFeePerGas", 0)
 
-        max_priority_fee = await self.w3.eth.max_priority_fee
-
         max_fee = base_fee + max_priority_fee
 
         return max_priority_fee, max_fee
 
 
+def parse_pool_job(job: tuple, client_cls: type, chain_config: ChainConfig):
+    # runs in pool worker processes, so the client is rebuilt from picklable parts
+    return client_cls(chain_config)._parse_pool_job(job)
+
+
+def parse_pool_ref_job(job: tuple, client_cls: type, chain_config: ChainConfig):
+    # (chunk, pair, ref) of an already known pool
+    return client_cls(chain_config).parse_pool(*job)
+
+
 class BaseDexClient(BaseWeb3Client, ABC):
     def __init__(self, chain_config: ChainConfig):
         super().__init__(chain_config)
 
+    # pool address derivation and decoding both happen in _parse_pool_job,
+    # jobs only carry the raw multicall results
+    def _pool_jobs(self, pair, pool_data: dict) -> list[tuple]:
+        return []
+
+    def _parse_pool_job(self, job: tuple):
+        return None
+
+    async def _parse_pool_jobs(self, pairs_map: dict, pool_data: dict) -> dict[str, list]:
+        jobs, owners = [], []
+        for pair_name, pair in pairs_map.items():
+            for job in self._pool_jobs(pair, pool_data):
+                jobs.append(job)
+                owners.append(pair_name)
+
+        parsed = await CpuExecutor.map(parse_pool_job, jobs, type(self), self.chain_config)
+
+        pools_by_pair = {pair_name: [] for pair_name in pairs_map}
+        for pair_name, pool_info in zip(owners, parsed):
+            if pool_info:
+                pools_by_pair[pair_name].append(pool_info)
+
+        return pools_by_pair
+
     @abstractmethod
     async def get_pool_address(self, token_a: str, token_b: str, **kwargs):
         pass
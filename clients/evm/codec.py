@@ -0,0 +1,128 @@
+import base64
+from dataclasses import fields
+from decimal import Decimal
+
+import msgpack
+
+from chains import registery
+from chains.dto import ChainConfig
+from clients.evm.dex.dto import PoolInfoAerodromeV2, PoolInfoBase, PoolInfoV2, PoolInfoV3, PoolRef, TokenSnapshot
+from clients.evm.dto import TokenMeta
+
+# first byte of every payload, bump it when a registered type changes its
+# fields; payloads of another version are rejected and read as cache misses
+VERSION = 2
+
+EXT_DECIMAL = 1
+EXT_CHAIN = 2
+EXT_BIGINT = 3
+EXT_OBJECT = 4
+
+
+class CodecError(ValueError):
+    pass
+
+
+# type ids are part of the format, never reuse or renumber them
+_TYPES: dict[int, type] = {}
+_TYPE_IDS: dict[type, int] = {}
+_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def register_types(types: dict[int, type]):
+    for type_id, cls in types.items():
+        if _TYPES.get(type_id, cls) is not cls:
+            raise CodecError(f"Type id {type_id} is taken by {_TYPES[type_id].__name__}")
+
+        _TYPES[type_id] = cls
+        _TYPE_IDS[cls] = type_id
+        _FIELDS[cls] = tuple(f.name for f in fields(cls))
+
+
+register_types({
+    1: PoolInfoBase,
+    2: PoolInfoV2,
+    3: PoolInfoV3,
+    4: PoolInfoAerodromeV2,
+    5: TokenMeta,
+    6: TokenSnapshot,
+    7: PoolRef,
+})
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(value).encode())
+
+    # chains are referenced by id, the config itself lives in code
+    if isinstance(value, ChainConfig):
+        return msgpack.ExtType(EXT_CHAIN, value.chain_id.to_bytes(8, "big"))
+
+    # uint160 prices, liquidity and supplies do not fit msgpack ints
+    if isinstance(value, int):
+        return msgpack.ExtType(EXT_BIGINT, value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True))
+
+    cls = type(value)
+    if cls in _TYPE_IDS:
+        # fields are positional, so a payload carries no field names
+        return msgpack.ExtType(EXT_OBJECT, _pack([
+            _TYPE_IDS[cls],
+            *[getattr(value, name) for name in _FIELDS[cls]]
+        ]))
+
+    raise CodecError(f"Cannot encode {type(value).__name__}")
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == EXT_DECIMAL:
+        return Decimal(data.decode())
+
+    if code == EXT_CHAIN:
+        chain_id = int.from_bytes(data, "big")
+        chain_config = registery.get(chain_id)
+        # a chain dropped from the registry since the payload was written
+        if chain_config is None:
+            raise CodecError(f"Unknown chain id {chain_id}")
+        return chain_config
+
+    if code == EXT_BIGINT:
+        return int.from_bytes(data, "big", signed=True)
+
+    if code == EXT_OBJECT:
+        type_id, *values = _unpack(data)
+        if type_id not in _TYPES:
+            raise CodecError(f"Unknown type id {type_id}")
+        return _TYPES[type_id](*values)
+
+    return msgpack.ExtType(code, data)
+
+
+def _pack(value) -> bytes:
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def _unpack(data: bytes):
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def dumps(value) -> bytes:
+    return bytes([VERSION]) + _pack(value)
+
+
+def loads(raw: bytes):
+    if not raw or raw[0] != VERSION:
+        raise CodecError(f"Unsupported payload version {raw[:1]!r}")
+
+    try:
+        return _unpack(raw[1:])
+    except (msgpack.UnpackException, ValueError, TypeError) as e:
+        raise CodecError(f"Corrupted payload: {e}") from e
+
+
+# for transports that only carry text, like taskiq results
+def dumps_text(value) -> str:
+    return base64.b64encode(dumps(value)).decode()
+
+
+def loads_text(raw: str):
+    return loads(base64.b64decode(raw))
@@ -26,6 +26,7 @@ class PoolInfoV3(PoolInfoBase):
     liquidity_raw: int
     amount_a: Decimal
     amount_b: Decimal
+    depth: Decimal | None = None # active liquidity near the price, in the quote token, see ChainConfig.v3_ranking
 
 
 @dataclass
@@ -33,6 +34,24 @@ class PoolInfoAerodromeV2(PoolInfoV2):
     is_stable: bool
 
 
+@dataclass
+class PoolRef:
+    # enough to re-read one selected pool without rescanning its dex
+    category: Literal["eth_token", "eth_stable", "stable_token"]
+    dex: str
+    version: str
+    pool: str
+    token_x: str
+    token_y: str
+    decimals_x: int
+    decimals_y: int
+    tvl: str
+    fee: int | None = None
+    is_stable: bool | None = None
+    stable_symbol: str | None = None
+    stable_address: str | None = None
+
+
 @dataclass
 class TokenPair:
     token_a: str
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from decimal import Decimal, getcontext
+from decimal import Decimal, getcontext, localcontext
 from typing import Literal
 from web3 import AsyncWeb3
 from chains.dto import StableConfig
@@ -8,7 +8,7 @@ from eth_utils.crypto import keccak
 from eth_abi.abi import encode as abi_encode, decode as abi_decode
 from eth_abi.packed import encode_packed
 
-from clients.evm.dex.dto import PairPools, PoolInfoV2, PoolInfoV3, PoolInfoAerodromeV2, RouteInfo, TokenPair, TokenSnapshot
+from clients.evm.dex.dto import PairPools, PoolInfoV2, PoolInfoV3, PoolInfoAerodromeV2, PoolRef, RouteInfo, TokenPair, TokenSnapshot
 from clients.evm.dto import TokenMeta
 
 
@@ -55,7 +55,14 @@ class UniswapV3Client(BaseDexClient):
     ]
 
     POOL_INIT_CODE_HASH = "e34f199b19b2b4f47f68442619d555527d244f78a3297ea89325f843f87b8b54"
+
+    # slot0, liquidity, balanceOf(token_a), balanceOf(token_b)
+    CALLS_PER_POOL = 4
     
+    @property
+    def ranking(self) -> Literal["tvl", "depth"]:
+        return self.chain_config.v3_ranking
+
     @staticmethod
     def _human_amount(raw: int, decimals: int) -> Decimal:
         return Decimal(raw) / (Decimal(10) ** decimals)
@@ -69,6 +76,26 @@ class UniswapV3Client(BaseDexClient):
         price = price_raw * (Decimal(10) ** (Decimal(dec0) - Decimal(dec1)))
         return price_raw, price
 
+    @staticmethod
+    def _calculate_depth_amounts(
+        sqrt_price: int,
+        liquidity: int,
+        range_pct: Decimal
+    ) -> tuple[Decimal, Decimal]:
+        # raw token0/token1 amounts the active liquidity holds between
+        # price * (1 - range) and price * (1 + range), assuming no tick is crossed
+        with localcontext() as ctx:
+            ctx.prec = 60
+            ratio = range_pct / Decimal(100)
+            sqrt_p = Decimal(sqrt_price) / (Decimal(2) ** 96)
+            sqrt_lower = sqrt_p * (Decimal(1) - ratio).sqrt()
+            sqrt_upper = sqrt_p * (Decimal(1) + ratio).sqrt()
+            liq = Decimal(liquidity)
+
+            amount0 = liq * (sqrt_upper - sqrt_p) / (sqrt_p * sqrt_upper)
+            amount1 = liq * (sqrt_p - sqrt_lower)
+        return amount0, amount1
+
     @staticmethod
     def _sort_tokens(token_x: str, token_y: str) -> tuple[str, str, bool]:
         return (token_x, token_y, True) if token_x.lower() < token_y.lower() else (token_y, token_x, False)
@@ -98,9 +125,10 @@ class UniswapV3Client(BaseDexClient):
                 AsyncWeb3.to_checksum_address(pool_addr), 
                 abi=self.POOL_ABI
             )
+            
             contract_a = self._get_erc20_contract(token_a)
             contract_b = self._get_erc20_contract(token_b)
-            
+
             calls.extend([
                 self._create_call(pool_addr, pool_contract.functions.slot0()._encode_transaction_data()),
                 self._create_call(pool_addr, pool_contract.functions.liquidity()._encode_transaction_data()),
@@ -110,6 +138,12 @@ class UniswapV3Client(BaseDexClient):
         
         return calls
     
+    def pool_calls(self, pair: TokenPair, ref: PoolRef) -> list:
+        return self._build_multicall_requests({(pair.token_a, pair.token_b, ref.fee): ref.pool})
+
+    def parse_pool(self, chunk: list[tuple[bool, bytes]], pair: TokenPair, ref: PoolRef) -> PoolInfoV3 | None:
+        return self._parse_pool_chunk(chunk, ref.fee, ref.pool, pair)
+
     async def _fetch_all_pools_data(
         self,
         pairs: list[TokenPair],
@@ -124,8 +158,10 @@ class UniswapV3Client(BaseDexClient):
         calls = self._build_multicall_requests(pool_addresses)
         results = await multicall.functions.aggregate3(calls).call()
 
+        step = self.CALLS_PER_POOL
+
         return {
-            key: results[i * 4:(i + 1) * 4]
+            key: results[i * step:(i + 1) * step]
             for i, key in enumerate(pool_addresses.keys())
         }
 
@@ -177,7 +213,10 @@ class UniswapV3Client(BaseDexClient):
         ba, ba_bytes = chunk[2]
         bb, bb_bytes = chunk[3]
 
-        if not all([slot, slot_bytes, len(slot_bytes) > 0, ba, ba_bytes, bb, bb_bytes]):
+        if not all([slot, slot_bytes, len(slot_bytes) > 0]):
+            return None
+
+        if not all([ba, ba_bytes, bb, bb_bytes]):
             return None
         
         sqrt_price_x96, *_ = abi_decode(
@@ -186,12 +225,13 @@ class UniswapV3Client(BaseDexClient):
         )
         
         liquidity_raw = int.from_bytes(liq_bytes[-32:], "big") if liq and liq_bytes else 0
-        balance_a_raw = int(abi_decode(["uint256"], ba_bytes)[0])
-        balance_b_raw = int(abi_decode(["uint256"], bb_bytes)[0])
         
-        if liquidity_raw == 0:
+        if liquidity_raw == 0 or sqrt_price_x96 == 0:
             return None
 
+        balance_a_raw = int(abi_decode(["uint256"], ba_bytes)[0])
+        balance_b_raw = int(abi_decode(["uint256"], bb_bytes)[0])
+
         token_price_raw, token_price = self._calculate_price(
             sqrt_price_x96, 
             pair.token_a_decimals, 
@@ -214,6 +254,23 @@ class UniswapV3Client(BaseDexClient):
 
         tvl = base_amount + target_amount * token_price
 
+        # tvl and the amounts stay the pool balances, so they compare with v2
+        # reserves; depth only ranks the fee tiers of one pair
+        depth = None
+        if self.ranking == "depth":
+            depth_a_raw, depth_b_raw = self._calculate_depth_amounts(
+                sqrt_price_x96,
+                liquidity_raw,
+                self.chain_config.v3_depth_range
+            )
+            depth_a = self._human_amount(depth_a_raw, pair.token_a_decimals)
+            depth_b = self._human_amount(depth_b_raw, pair.token_b_decimals)
+
+            if pair.is_target_token_a:
+                depth = depth_b + depth_a * token_price
+            else:
+                depth = depth_a + depth_b * token_price
+
         return PoolInfoV3(
             pool=pool_address,
             price_raw=token_price_raw,
@@ -224,27 +281,32 @@ class UniswapV3Client(BaseDexClient):
             liquidity_raw=int(liquidity_raw),
             amount_a=amount_a,
             amount_b=amount_b,
+            depth=depth,
         )
+
+    def _rank(self, pool: PoolInfoV3) -> Decimal:
+        return pool.depth if self.ranking == "depth" else pool.tvl
     
-    async def _parse_pools_for_pair(
+    def _pool_jobs(
         self,
         pair: TokenPair,
         pool_data: dict[tuple[str, str, int], list[tuple[bool, bytes]]]
-    ) -> list[PoolInfoV3]:
-        pools = []
+    ) -> list[tuple]:
+        jobs = []
         
         for fee in self.FEE_TIERS:
             chunk = pool_data.get((pair.token_a, pair.token_b, fee))
             if not chunk:
                 continue
             
-            pool_addr = self.get_pool_address(pair.token_a, pair.token_b, fee)
-            pool_info = self._parse_pool_chunk(chunk, fee, pool_addr, pair)
-            
-            if pool_info:
-                pools.append(pool_info)
+            jobs.append((chunk, fee, pair))
         
-        return pools
+        return jobs
+
+    def _parse_pool_job(self, job: tuple) -> PoolInfoV3 | None:
+        chunk, fee, pair = job
+        pool_addr = self.get_pool_address(pair.token_a, pair.token_b, fee)
+        return self._parse_pool_chunk(chunk, fee, pool_addr, pair)
 
     async def get_all_pairs(
         self,
@@ -257,11 +319,12 @@ class UniswapV3Client(BaseDexClient):
         pairs_map = self._build_pairs_map(weth, token, token_meta.decimals)
 
         pool_data = await self._fetch_all_pools_data(list(pairs_map.values()))
+        pools_by_pair = await self._parse_pool_jobs(pairs_map, pool_data)
 
         result = {}
         for pair_name, pair in pairs_map.items():
-            pools = await self._parse_pools_for_pair(pair, pool_data)
-            best_pool = max(pools, key=lambda p: p.tvl) if pools else None
+            pools = pools_by_pair[pair_name]
+            best_pool = max(pools, key=self._rank) if pools else None
             
             result[pair_name] = PairPools(
                 pair_name=pair_name,
@@ -416,6 +479,12 @@ class UniswapV2Client(BaseDexClient):
         
         return calls
     
+    def pool_calls(self, pair: TokenPair, ref: PoolRef) -> list:
+        return self._build_multicall_requests({(pair.token_a, pair.token_b): ref.pool})
+
+    def parse_pool(self, chunk: list[tuple[bool, bytes]], pair: TokenPair, ref: PoolRef) -> PoolInfoV2 | None:
+        return self._parse_pool_chunk(chunk[0], ref.pool, pair)
+
     async def _fetch_all_pools_data(
         self,
         pairs: list[TokenPair],
@@ -519,20 +588,22 @@ class UniswapV2Client(BaseDexClient):
             reserve1=int(reserve1),
         )
     
-    async def _parse_pools_for_pair(
+    def _pool_jobs(
         self,
         pair: TokenPair,
         pool_data: dict[tuple[str, str], tuple[bool, bytes]]
-    ) -> list[PoolInfoV2]:
+    ) -> list[tuple]:
         chunk = pool_data.get((pair.token_a, pair.token_b))
         if not chunk:
             return []
         
-        pool_addr = self.get_pool_address(pair.token_a, pair.token_b)
-        pool_info = self._parse_pool_chunk(chunk, pool_addr, pair)
-        
         # V2 возвращает список с одним пулом (или пустой)
-        return [pool_info] if pool_info else []
+        return [(chunk, pair)]
+
+    def _parse_pool_job(self, job: tuple) -> PoolInfoV2 | None:
+        chunk, pair = job
+        pool_addr = self.get_pool_address(pair.token_a, pair.token_b)
+        return self._parse_pool_chunk(chunk, pool_addr, pair)
     
     async def get_all_pairs(
         self,
@@ -545,10 +616,11 @@ class UniswapV2Client(BaseDexClient):
         pairs_map = self._build_pairs_map(weth, token, token_meta.decimals)
 
         pool_data = await self._fetch_all_pools_data(list(pairs_map.values()))
+        pools_by_pair = await self._parse_pool_jobs(pairs_map, pool_data)
 
         result = {}
         for pair_name, pair in pairs_map.items():
-            pools = await self._parse_pools_for_pair(pair, pool_data)
+            pools = pools_by_pair[pair_name]
             best_pool = max(pools, key=lambda p: p.tvl) if pools else None
             
             result[pair_name] = PairPools(
@@ -682,6 +754,12 @@ class AerodromeV2Client(BaseDexClient):
         
         return calls
     
+    def pool_calls(self, pair: TokenPair, ref: PoolRef) -> list:
+        return self._build_multicall_requests({(pair.token_a, pair.token_b, ref.is_stable): ref.pool})
+
+    def parse_pool(self, chunk: list[tuple[bool, bytes]], pair: TokenPair, ref: PoolRef) -> PoolInfoAerodromeV2 | None:
+        return self._parse_pool_chunk(chunk[0], ref.is_stable, ref.pool, pair)
+
     async def _fetch_all_pools_data(
         self,
         pairs: list[TokenPair],
@@ -788,25 +866,26 @@ class AerodromeV2Client(BaseDexClient):
             is_stable=is_stable
         )
     
-    async def _parse_pools_for_pair(
+    def _pool_jobs(
         self,
         pair: TokenPair,
         pool_data: dict[tuple[str, str, bool], tuple[bool, bytes]]
-    ) -> list[PoolInfoAerodromeV2]:
-        pools = []
+    ) -> list[tuple]:
+        jobs = []
 
         for is_stable in [True, False]:
             chunk = pool_data.get((pair.token_a, pair.token_b, is_stable))
             if not chunk:
                 return []
         
-            pool_addr = self.get_pool_address(pair.token_a, pair.token_b, is_stable)
-            pool_info = self._parse_pool_chunk(chunk, is_stable, pool_addr, pair)
-
-            if pool_info:
-                pools.append(pool_info)
+            jobs.append((chunk, is_stable, pair))
                 
-        return pools
+        return jobs
+
+    def _parse_pool_job(self, job: tuple) -> PoolInfoAerodromeV2 | None:
+        chunk, is_stable, pair = job
+        pool_addr = self.get_pool_address(pair.token_a, pair.token_b, is_stable)
+        return self._parse_pool_chunk(chunk, is_stable, pool_addr, pair)
     
     async def get_all_pairs(
         self,
@@ -818,10 +897,11 @@ class AerodromeV2Client(BaseDexClient):
 
         pairs_map = self._build_pairs_map(weth, token, token_meta.decimals)
         pool_data = await self._fetch_all_pools_data(list(pairs_map.values()))
+        pools_by_pair = await self._parse_pool_jobs(pairs_map, pool_data)
 
         result = {}
         for pair_name, pair in pairs_map.items():
-            pools = await self._parse_pools_for_pair(pair, pool_data)
+            pools = pools_by_pair[pair_name]
             best_pool = max(pools, key=lambda p: p.tvl) if pools else None
             
             result[pair_name] = PairPools(
@@ -1,3 +1,4 @@
+from decimal import Decimal
 from typing import Any
 from dataclasses import dataclass
 
@@ -16,3 +17,35 @@ class TraceResult:
     gas_used: int | None = None
     error_message: str | None = None
     raw_trace: dict[str, Any] | None = None
+
+
+@dataclass
+class AccountState:
+    chain_id: int
+    has_code: bool
+    native_balance: Decimal
+
+
+@dataclass(frozen=True)
+class AllowanceSlot:
+    layout: str
+    base_slot: int
+
+
+@dataclass
+class RoundTripResult:
+    buy_success: bool
+    sell_success: bool
+    buy_tax: Decimal = Decimal(0)
+    sell_tax: Decimal = Decimal(0)
+    buy_gas: int = 0
+    sell_gas: int = 0
+    amount_in: int = 0
+    bought: int = 0
+    amount_out: int = 0
+    error_message: str | None = None
+    checked: bool = True # False when the probe could not run on the chain
+
+    @property
+    def is_honeypot(self) -> bool:
+        return self.buy_success and not self.sell_success
@@ -0,0 +1,74 @@
+import time
+
+from redis.asyncio import Redis
+
+from chains.dto import ChainConfig
+from config import settings
+from utils.bloom import BloomFilter
+
+
+class NegativeTokenCache:
+    # members are "{chain_id}:{address}", scores are expiry timestamps
+    KEY = "token:negative"
+
+    # in-process pre-check, shared by all instances; it only says "maybe",
+    # Redis holds the truth and the expiry
+    _bloom = BloomFilter(int(settings.get("NEGATIVE_CACHE_CAPACITY", 100_000)))
+    _synced_at = 0.0
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def _member(chain_id: int, address: str) -> str:
+        return f"{chain_id}:{address.lower()}"
+
+    async def _sync(self):
+        now = time.time()
+        if now - self._synced_at < float(settings.get("NEGATIVE_CACHE_SYNC", 60)):
+            return
+
+        # expired entries leave the bloom filter on rebuild, entries from other
+        # processes enter it
+        await self.redis.zremrangebyscore(self.KEY, "-inf", now)
+        members = await self.redis.zrangebyscore(self.KEY, now, "+inf")
+
+        bloom = BloomFilter(int(settings.get("NEGATIVE_CACHE_CAPACITY", 100_000)))
+        for member in members:
+            bloom.add(member.decode() if isinstance(member, bytes) else member)
+
+        NegativeTokenCache._bloom = bloom
+        NegativeTokenCache._synced_at = now
+
+    async def known_absent(self, chain_configs: list[ChainConfig], address: str) -> set[int]:
+        await self._sync()
+
+        candidates = [
+            c for c in chain_configs
+            if self._member(c.chain_id, address) in self._bloom
+        ]
+        if not candidates:
+            return set()
+
+        scores = await self.redis.zmscore(
+            self.KEY,
+            [self._member(c.chain_id, address) for c in candidates]
+        )
+
+        now = time.time()
+        return {
+            c.chain_id
+            for c, score in zip(candidates, scores)
+            if score is not None and score > now
+        }
+
+    async def add(self, chain_config: ChainConfig, address: str):
+        member = self._member(chain_config.chain_id, address)
+        expires_at = time.time() + int(settings.get("NEGATIVE_CACHE_TTL", 600))
+
+        await self.redis.zadd(self.KEY, {member: expires_at})
+        self._bloom.add(member)
+
+    async def invalidate(self, chain_id: int, address: str):
+        # a stale bloom bit only costs one Redis lookup
+        await self.redis.zrem(self.KEY, self._member(chain_id, address))
@@ -0,0 +1,158 @@
+from eth_utils.crypto import keccak
+
+# Helper contract injected through an eth_call code override. In one call it
+# buys the token through the router, approves the router, sells everything it
+# received and reports both legs.
+#
+# calldata (no selector):
+#   0x00 router | 0x20 token | 0x40 buy value | 0x60 buy data length
+#   0x80 sell data length | 0xa0 buy data | 0xa0 + buy length sell data
+#
+# The sell data amountIn argument (bytes 0x44..0x64, executeRoute's third
+# parameter) is overwritten with the amount actually received by the buy.
+#
+# returns 9 words followed by the revert data of the failed leg:
+#   buy_ok, bought, buy_gas, approve_ok, sell_ok, eth_out, sell_gas,
+#   sell_return, revert_length
+#
+# Calls with empty calldata (native currency sent back by the router) stop
+# immediately.
+
+ROUND_TRIP_PROBE_ADDRESS = "0x00000000000000000000000000000000009E7A11"
+
+OUTPUT_WORDS = 9
+
+OPCODES = {
+    "STOP": 0x00, "ADD": 0x01, "SUB": 0x03, "ISZERO": 0x15, "NOT": 0x19,
+    "SHL": 0x1b, "ADDRESS": 0x30, "CALLDATALOAD": 0x35, "CALLDATASIZE": 0x36,
+    "CALLDATACOPY": 0x37, "RETURNDATASIZE": 0x3d, "RETURNDATACOPY": 0x3e,
+    "SELFBALANCE": 0x47, "POP": 0x50, "MLOAD": 0x51, "MSTORE": 0x52,
+    "JUMP": 0x56, "JUMPI": 0x57, "GAS": 0x5a, "JUMPDEST": 0x5b,
+    "DUP1": 0x80, "SWAP1": 0x90, "CALL": 0xf1, "RETURN": 0xf3,
+    "STATICCALL": 0xfa,
+}
+
+M_TMP = 0xe0
+M_OUT = 0x100
+M_DATA = 0x240
+
+ROUTER = 0x00
+TOKEN = 0x20
+BUY_VALUE = 0x40
+BUY_LENGTH = 0x60
+SELL_LENGTH = 0x80
+BUY_DATA = 0xa0
+
+SELECTOR_BALANCE_OF = int.from_bytes(keccak(text="balanceOf(address)")[:4], "big")
+SELECTOR_APPROVE = int.from_bytes(keccak(text="approve(address,uint256)")[:4], "big")
+
+
+def _slot(index: int) -> int:
+    return M_OUT + index * 0x20
+
+
+def _balance_of(dest: int) -> list:
+    return [
+        ("PUSH", SELECTOR_BALANCE_OF), ("PUSH", 0xe0), "SHL", ("PUSH", 0x00), "MSTORE",
+        "ADDRESS", ("PUSH", 0x04), "MSTORE",
+        ("PUSH", 0x20), ("PUSH", dest), ("PUSH", 0x24), ("PUSH", 0x00),
+        ("PUSH", TOKEN), "CALLDATALOAD", "GAS", "STATICCALL", "POP",
+    ]
+
+
+def _measure_call(gas_slot: int, ok_slot: int) -> list:
+    # stack before: [success, gas_before]
+    return [
+        "SWAP1", "GAS", "SWAP1", "SUB", ("PUSH", gas_slot), "MSTORE",
+        "DUP1", ("PUSH", ok_slot), "MSTORE",
+        "ISZERO", ("LABEL_REF", "fail"), "JUMPI",
+    ]
+
+
+PROGRAM = [
+    "CALLDATASIZE", "ISZERO", ("LABEL_REF", "stop"), "JUMPI",
+
+    *_balance_of(M_TMP),
+
+    # buy
+    ("PUSH", BUY_LENGTH), "CALLDATALOAD", ("PUSH", BUY_DATA), ("PUSH", M_DATA), "CALLDATACOPY",
+    "GAS",
+    ("PUSH", 0x00), ("PUSH", 0x00), ("PUSH", BUY_LENGTH), "CALLDATALOAD", ("PUSH", M_DATA),
+    ("PUSH", BUY_VALUE), "CALLDATALOAD", ("PUSH", ROUTER), "CALLDATALOAD", "GAS", "CALL",
+    *_measure_call(_slot(2), _slot(0)),
+
+    # bought = balance after - balance before
+    *_balance_of(_slot(1)),
+    ("PUSH", M_TMP), "MLOAD", ("PUSH", _slot(1)), "MLOAD", "SUB", ("PUSH", _slot(1)), "MSTORE",
+
+    # approve(router, max)
+    ("PUSH", SELECTOR_APPROVE), ("PUSH", 0xe0), "SHL", ("PUSH", 0x00), "MSTORE",
+    ("PUSH", ROUTER), "CALLDATALOAD", ("PUSH", 0x04), "MSTORE",
+    ("PUSH", 0x00), "NOT", ("PUSH", 0x24), "MSTORE",
+    ("PUSH", 0x00), ("PUSH", 0x00), ("PUSH", 0x44), ("PUSH", 0x00), ("PUSH", 0x00),
+    ("PUSH", TOKEN), "CALLDATALOAD", "GAS", "CALL",
+    ("PUSH", _slot(3)), "MSTORE",
+
+    # sell everything that was received
+    ("PUSH", SELL_LENGTH), "CALLDATALOAD",
+    ("PUSH", BUY_LENGTH), "CALLDATALOAD", ("PUSH", BUY_DATA), "ADD",
+    ("PUSH", M_DATA), "CALLDATACOPY",
+    ("PUSH", _slot(1)), "MLOAD", ("PUSH", M_DATA + 0x44), "MSTORE",
+    "SELFBALANCE", ("PUSH", M_TMP), "MSTORE",
+    "GAS",
+    ("PUSH", 0x20), ("PUSH", _slot(7)), ("PUSH", SELL_LENGTH), "CALLDATALOAD", ("PUSH", M_DATA),
+    ("PUSH", 0x00), ("PUSH", ROUTER), "CALLDATALOAD", "GAS", "CALL",
+    *_measure_call(_slot(6), _slot(4)),
+
+    "SELFBALANCE", ("PUSH", M_TMP), "MLOAD", "SWAP1", "SUB", ("PUSH", _slot(5)), "MSTORE",
+
+    ("LABEL", "done"),
+    ("PUSH", OUTPUT_WORDS * 0x20), ("PUSH", M_OUT), "RETURN",
+
+    ("LABEL", "fail"),
+    "RETURNDATASIZE", ("PUSH", _slot(8)), "MSTORE",
+    "RETURNDATASIZE", ("PUSH", 0x00), ("PUSH", _slot(9)), "RETURNDATACOPY",
+    "RETURNDATASIZE", ("PUSH", OUTPUT_WORDS * 0x20), "ADD", ("PUSH", M_OUT), "RETURN",
+
+    ("LABEL", "stop"),
+    "STOP",
+]
+
+
+def _push(value: int, width: int | None = None) -> bytes:
+    width = width or max(1, (value.bit_length() + 7) // 8)
+    return bytes([0x5f + width]) + value.to_bytes(width, "big")
+
+
+def assemble(program: list) -> bytes:
+    # label references are always PUSH2 so offsets are known in one pass
+    labels = {}
+    offset = 0
+
+    for item in program:
+        if isinstance(item, str):
+            offset += 1
+        elif item[0] == "PUSH":
+            offset += len(_push(item[1]))
+        elif item[0] == "LABEL_REF":
+            offset += 3
+        elif item[0] == "LABEL":
+            labels[item[1]] = offset
+            offset += 1
+
+    code = b""
+
+    for item in program:
+        if isinstance(item, str):
+            code += bytes([OPCODES[item]])
+        elif item[0] == "PUSH":
+            code += _push(item[1])
+        elif item[0] == "LABEL_REF":
+            code += _push(labels[item[1]], 2)
+        elif item[0] == "LABEL":
+            code += bytes([OPCODES["JUMPDEST"]])
+
+    return code
+
+
+ROUND_TRIP_PROBE_CODE = "0x" + assemble(PROGRAM).hex()
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Literal
+
+from redis.asyncio import Redis
+from redis.client import NEVER_DECODE
+
+from chains.dto import ChainConfig
+from clients.evm.codec import CodecError, dumps, loads, register_types
+from clients.evm.dex.dto import TokenSnapshot
+from clients.evm.dto import TokenMeta
+from config import settings
+from utils import metrics
+
+module_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SkippedStage:
+    chain_id: int
+    chain_name: str
+    stage: Literal["code", "metadata", "snapshots", "balances", "scan"]
+    dex: str | None = None
+    failed: bool = False # the stage raised instead of timing out
+
+
+@dataclass
+class ChainScan:
+    chain_config: ChainConfig
+    token_meta: TokenMeta
+    snapshots: list[TokenSnapshot]
+    block_number: int
+    created_at: float
+    skipped: list[SkippedStage] = field(default_factory=list)
+
+
+register_types({
+    10: SkippedStage,
+    11: ChainScan,
+})
+
+
+class ScanCache:
+    KEY_PREFIX = "scan"
+    LOCK_PREFIX = "scan:lock"
+    CHANNEL_PREFIX = "scan:done"
+    METRICS_NAME = "scan_cache"
+
+    # published to followers when the scan owner finishes
+    CACHED = "cached"
+    ABSENT = "absent"
+    FAILED = "failed"
+
+    RELEASE_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @classmethod
+    def _key(cls, chain_id: int, token_address: str) -> str:
+        return f"{cls.KEY_PREFIX}:{chain_id}:{token_address.lower()}"
+
+    @classmethod
+    def _lock_key(cls, chain_id: int, token_address: str) -> str:
+        return f"{cls.LOCK_PREFIX}:{chain_id}:{token_address.lower()}"
+
+    @classmethod
+    def _channel(cls, chain_id: int, token_address: str) -> str:
+        return f"{cls.CHANNEL_PREFIX}:{chain_id}:{token_address.lower()}"
+
+    @staticmethod
+    def _ttl(chain_config: ChainConfig) -> int:
+        blocks = int(settings.get("SCAN_CACHE_BLOCKS", 3))
+        return max(1, round(blocks * chain_config.block_time))
+
+    async def get_many(
+        self,
+        chain_configs: list[ChainConfig],
+        token_address: str,
+        record_metrics: bool = True
+    ) -> dict[int, ChainScan]:
+        # entries are binary, the shared client decodes replies to str
+        raw_entries = await self.redis.execute_command(
+            "MGET",
+            *[self._key(c.chain_id, token_address) for c in chain_configs],
+            **{NEVER_DECODE: True}
+        )
+
+        now = time.time()
+        entries = {}
+        counters = {"hit": 0, "miss": 0, "age_total": 0.0}
+
+        for chain_config, raw in zip(chain_configs, raw_entries):
+            try:
+                entry = loads(raw) if raw is not None else None
+            except CodecError as e:
+                module_logger.debug(f"Scan cache entry {chain_config.name} {token_address} dropped: {e}")
+                entry = None
+
+            if entry is None:
+                counters["miss"] += 1
+                counters[f"miss:{chain_config.chain_id}"] = 1
+                continue
+
+            age = now - entry.created_at
+
+            entries[chain_config.chain_id] = entry
+            counters["hit"] += 1
+            counters[f"hit:{chain_config.chain_id}"] = 1
+            counters["age_total"] += age
+
+            module_logger.debug(
+                f"Scan cache hit {chain_config.name} {token_address} "
+                f"block {entry.block_number} age {age:.1f}s"
+            )
+
+        if record_metrics:
+            await metrics.incr(self.redis, self.METRICS_NAME, counters)
+        return entries
+
+    async def set_many(self, token_address: str, entries: list[ChainScan]):
+        if not entries:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+
+        for entry in entries:
+            pipe.set(
+                self._key(entry.chain_config.chain_id, token_address),
+                dumps(entry),
+                ex=self._ttl(entry.chain_config)
+            )
+
+        await pipe.execute()
+
+    async def stats(self) -> dict[str, float]:
+        counters = await metrics.get(self.redis, self.METRICS_NAME)
+
+        hits = counters.get("hit", 0)
+        total = hits + counters.get("miss", 0)
+
+        counters["hit_rate"] = hits / total if total else 0
+        counters["avg_age"] = counters.get("age_total", 0) / hits if hits else 0
+        return counters
+
+    async def acquire(self, chain_config: ChainConfig, token_address: str) -> str | None:
+        owner = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            self._lock_key(chain_config.chain_id, token_address),
+            owner,
+            nx=True,
+            ex=int(settings.get("SCAN_LOCK_TTL", 10))
+        )
+        return owner if acquired else None
+
+    async def release(
+        self,
+        chain_config: ChainConfig,
+        token_address: str,
+        owner: str,
+        status: str
+    ):
+        await self.redis.eval(
+            self.RELEASE_SCRIPT,
+            1,
+            self._lock_key(chain_config.chain_id, token_address),
+            owner
+        )
+        await self.redis.publish(self._channel(chain_config.chain_id, token_address), status)
+
+    async def wait_for(
+        self,
+        chain_config: ChainConfig,
+        token_address: str
+    ) -> tuple[str, ChainScan | None]:
+        timeout = float(settings.get("SCAN_LOCK_TTL", 10))
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+
+        try:
+            await pubsub.subscribe(self._channel(chain_config.chain_id, token_address))
+
+            # the owner may have finished before the subscription was made
+            entries = await self.get_many([chain_config], token_address, False)
+            if entries:
+                return self.CACHED, entries[chain_config.chain_id]
+
+            deadline = time.monotonic() + timeout
+            status = self.FAILED
+
+            while (left := deadline - time.monotonic()) > 0:
+                message = await pubsub.get_message(timeout=left)
+                if message is None:
+                    await asyncio.sleep(0)
+                    continue
+
+                status = message["data"]
+                status = status.decode() if isinstance(status, bytes) else status
+                break
+
+            if status != self.CACHED:
+                return status, None
+
+            entries = await self.get_many([chain_config], token_address, False)
+            if not entries:
+                return self.FAILED, None
+
+            return self.CACHED, entries[chain_config.chain_id]
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
@@ -1,35 +1,48 @@
 
 import asyncio
 from decimal import Decimal
-from typing import Any, Literal
+import logging
+import math
+import time
+from typing import Any, AsyncIterator, Literal
+from redis.asyncio import Redis
 from sqlalchemy.orm import sessionmaker
+from web3 import AsyncWeb3
+from chains import registery
 from chains.dto import ChainConfig
-from clients.evm.dex.dto import PoolInfoBase, TokenSnapshot
+from clients.evm.codec import register_types
+from clients.evm.dex.dto import PoolInfoBase, PoolRef, TokenSnapshot
 from clients.evm.dex.uniswap import AerodromeV2Client, UniswapV2Client, UniswapV3Client
-from clients.evm.dto import TokenMeta
+from clients.evm.dto import AccountState, TokenMeta
+from clients.evm.negative_cache import NegativeTokenCache
+from clients.evm.scan_cache import ChainScan, ScanCache, SkippedStage
+from clients.evm.scheduler import rpc_scheduler
 from clients.evm.token import TokenService
+from config import settings
+from utils import metrics
 
 
-from dataclasses import dataclass
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass, field
 
 from clients.evm.wallet import WalletClient
+from db.repositories.token import TokenRepository
+from enums.rpc import RpcClass
+
+module_logger = logging.getLogger(__name__)
+
+
+class ScanStageTimeout(Exception):
+    def __init__(self, skipped: SkippedStage):
+        super().__init__(f"{skipped.chain_name} {skipped.stage} timed out")
+        self.skipped = skipped
+
 
 @dataclass
 class ChainWithToken:
     chain_config: ChainConfig
     token_meta: TokenMeta
 
-@dataclass
-class WalletItem:
-    wallet_name: str
-    address: str
-
-@dataclass
-class ChainBalances:
-    wallets: list[WalletItem]
-    native_total: int | float
-    token_total: int | float
-
 
 @dataclass
 class BestPool:
@@ -52,9 +65,31 @@ class ScanResult:
     best_eth_stable_pool: BestPool | None
     best_stable_token_pool: BestPool | None
     token_meta: TokenMeta | None
-    wallet_balances: list[ChainBalances]
     token_price: Decimal
     token_price_raw: Decimal
+    complete: bool = True
+    skipped: list[SkippedStage] = field(default_factory=list)
+    # chain_id -> {"wallets": [...]}, filled by load_wallet_balances for the
+    # displayed chain only
+    wallet_balances: dict[int, dict[str, list[dict[str, Any]]]] = field(default_factory=dict)
+
+    @property
+    def display_pool(self) -> BestPool | None:
+        return self.best_eth_token_pool \
+                if self.route_type == "direct" else \
+                self.best_stable_token_pool
+
+    @property
+    def display_chain(self) -> ChainConfig | None:
+        return self.display_pool.chain if self.display_pool else None
+
+
+# scan results cross process boundaries through the binary codec
+register_types({
+    20: ChainWithToken,
+    21: BestPool,
+    22: ScanResult,
+})
 
 
 class LiquidityScanner:
@@ -64,199 +99,618 @@ class LiquidityScanner:
         "aerodrome_v2": AerodromeV2Client
     }
 
-    def __init__(self, chain_configs: list[ChainConfig], session_factory: sessionmaker):
+    # (chain_id, token) -> class and task of the running chain scan, shared
+    # by all scanner instances
+    _inflight: dict[tuple[int, str], tuple[RpcClass, asyncio.Task]] = {}
+
+    def __init__(
+        self,
+        chain_configs: list[ChainConfig],
+        session_factory: sessionmaker,
+        redis: Redis | None = None,
+        user_id: int | None = None,
+        rpc_class: RpcClass = RpcClass.SCAN
+    ):
         self.chain_configs = chain_configs
         self.session_factory = session_factory
+        self.redis = redis
+        self.user_id = user_id
+        self.rpc_class = rpc_class
+        self.scan_cache = ScanCache(redis) if redis is not None else None
+        self.negative_cache = NegativeTokenCache(redis) if redis is not None else None
+        self.accounts: dict[int, AccountState] = {}
 
-    async def scan_token(self, token_address: str, wallets: dict[str, list[str]], price: Decimal) -> ScanResult:
-        if not self.chain_configs:
-            return ScanResult(
-                route_type=None,
-                chains_found=[],
-                market_cap=Decimal(0),
-                best_eth_token_pool=None,
-                best_eth_stable_pool=None,
-                best_stable_token_pool=None,
-                token_meta=None,
-                wallet_balances=[],
-                token_price=Decimal("0"),
-                token_price_raw=Decimal("0")
-            )
-        
-        chains_with_token = await self._fetch_chains_with_token(token_address)
-
-        if not chains_with_token:
-            return ScanResult(
-                route_type=None,
-                chains_found=[],
-                market_cap=Decimal(0),
-                best_eth_token_pool=None,
-                best_eth_stable_pool=None,
-                best_stable_token_pool=None,
-                token_meta=None,
-                wallet_balances=[],
-                token_price=Decimal("0"),
-                token_price_raw=Decimal("0")
-            )
-        
-        snapshots_task = self._fetch_all_snapshots(chains_with_token, token_address)
-        balances_task = self._fetch_wallet_balances(
-            chains_with_token,
-            token_address,
-            wallets
+    @staticmethod
+    def _stage_timeout(stage: str, deadline: float | None = None) -> float:
+        timeout = float(settings.get(f"SCAN_{stage.upper()}_TIMEOUT", 5))
+
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+
+        return timeout
+
+    @staticmethod
+    def _scan_deadline() -> float:
+        return time.monotonic() + float(settings.get("SCAN_TOTAL_TIMEOUT", 10))
+
+    async def _record_timeout(
+        self,
+        chain_config: ChainConfig,
+        stage: str,
+        dex: str | None = None
+    ) -> SkippedStage:
+        module_logger.warning(f"Scan {stage} timed out on {chain_config.name} {dex or ''}")
+
+        if self.redis is not None:
+            await metrics.incr(self.redis, "scan_timeouts", {
+                str(chain_config.chain_id): 1,
+                f"{chain_config.chain_id}:{stage}": 1,
+            })
+
+        return SkippedStage(
+            chain_id=chain_config.chain_id,
+            chain_name=chain_config.display_name,
+            stage=stage,
+            dex=dex
+        )
+
+    async def _record_failure(
+        self,
+        chain_config: ChainConfig,
+        stage: str,
+        error: Exception
+    ) -> SkippedStage:
+        module_logger.error(f"Scan {stage} failed on {chain_config.name}: {error}", exc_info=error)
+
+        if self.redis is not None:
+            await metrics.incr(self.redis, "scan_failures", {
+                str(chain_config.chain_id): 1,
+                f"{chain_config.chain_id}:{stage}": 1,
+            })
+
+        return SkippedStage(
+            chain_id=chain_config.chain_id,
+            chain_name=chain_config.display_name,
+            stage=stage,
+            failed=True
+        )
+
+    async def _run_stage(
+        self,
+        coro,
+        chain_config: ChainConfig,
+        stage: str,
+        dex: str | None = None,
+        deadline: float | None = None
+    ):
+        async def scheduled():
+            try:
+                async with rpc_scheduler.slot(chain_config, self.rpc_class, self.user_id):
+                    return await coro
+            finally:
+                # never started if the stage timed out in the queue
+                coro.close()
+
+        # wait_for cancels the stage when its budget runs out, time spent
+        # queued in the scheduler counts against it
+        try:
+            return await asyncio.wait_for(scheduled(), self._stage_timeout(stage, deadline))
+        except asyncio.TimeoutError:
+            raise ScanStageTimeout(await self._record_timeout(chain_config, stage, dex))
+
+    @staticmethod
+    def _empty_result() -> ScanResult:
+        return ScanResult(
+            route_type=None,
+            chains_found=[],
+            market_cap=Decimal(0),
+            best_eth_token_pool=None,
+            best_eth_stable_pool=None,
+            best_stable_token_pool=None,
+            token_meta=None,
+            token_price=Decimal("0"),
+            token_price_raw=Decimal("0")
+        )
+
+    async def probe_accounts(self, address: str) -> dict[int, AccountState]:
+        async def probe(chain_config: ChainConfig) -> AccountState:
+            async with WalletClient(chain_config) as wallet:
+                return await wallet.get_account_state(address)
+
+        results = await asyncio.gather(
+            *[self._run_stage(probe(c), c, "code") for c in self.chain_configs],
+            return_exceptions=True
+        )
+
+        # chains that failed to answer are left out and still get scanned
+        self.accounts = {
+            result.chain_id: result
+            for result in results
+            if isinstance(result, AccountState)
+        }
+
+        # code showed up where the address was cached as absent
+        if self.negative_cache:
+            for account in self.accounts.values():
+                if account.has_code:
+                    await self.negative_cache.invalidate(account.chain_id, address)
+
+        return self.accounts
+
+    @staticmethod
+    def is_eoa(chain_configs: list[ChainConfig], accounts: dict[int, AccountState]) -> bool:
+        return all(
+            c.chain_id in accounts and not accounts[c.chain_id].has_code
+            for c in chain_configs
         )
 
-        all_snapshots, wallet_balances = await asyncio.gather(
-            snapshots_task,
-            balances_task
+    def drop_chains_without_code(self, accounts: dict[int, AccountState]):
+        self.chain_configs = [
+            c for c in self.chain_configs
+            if c.chain_id not in accounts or accounts[c.chain_id].has_code
+        ]
+
+    async def scan_token(self, token_address: str, price: Decimal) -> ScanResult:
+        if not self.chain_configs:
+            return self._empty_result()
+
+        skipped = []
+        chain_scans = await self._get_chain_scans(token_address, skipped, self._scan_deadline())
+
+        return self._build_from_chain_scans(chain_scans, price, skipped=skipped) \
+                or self._empty_result()
+
+    async def scan_token_stream(
+        self,
+        token_address: str,
+        price: Decimal
+    ) -> AsyncIterator[ScanResult]:
+        if not self.chain_configs:
+            return
+
+        skipped = []
+        chain_scans = []
+
+        # every result but the last one is partial
+        async for chain_scan in self._iter_chain_scans(token_address, skipped, self._scan_deadline()):
+            chain_scans.append(chain_scan)
+
+            partial = self._build_from_chain_scans(chain_scans, price, False, skipped)
+            if partial:
+                yield partial
+
+        result = self._build_from_chain_scans(chain_scans, price, skipped=skipped)
+        if result:
+            yield result
+
+    async def load_wallet_balances(
+        self,
+        result: ScanResult,
+        wallets: dict[str, list[dict[str, Any]]]
+    ) -> dict[int, dict[str, list[dict[str, Any]]]]:
+        # pool scans carry no user data, balances are read for the displayed
+        # chain once it is known
+        chain_config = result.display_chain
+        items = wallets.get(str(chain_config.chain_id), []) if chain_config else []
+        addresses = [w["address"] for w in items if w.get("address")]
+
+        if not addresses:
+            result.wallet_balances = {}
+            return result.wallet_balances
+
+        token_meta = next(
+            (c.token_meta for c in result.chains_found if c.chain_config.chain_id == chain_config.chain_id),
+            result.token_meta
         )
 
-        if not all_snapshots:
-            return ScanResult(
-                route_type=None,
-                chains_found=[],
-                market_cap=Decimal(0),
-                best_eth_token_pool=None,
-                best_eth_stable_pool=None,
-                best_stable_token_pool=None,
-                token_meta=None,
-                wallet_balances=[],
-                token_price=Decimal("0"),
-                token_price_raw=Decimal("0")
+        try:
+            balances = await self._run_stage(
+                self._get_balances_for_chain(chain_config, token_meta, addresses),
+                chain_config,
+                "balances"
             )
-        
-        return self._build_scan_result(
+        except ScanStageTimeout as e:
+            result.skipped.append(e.skipped)
+            balances = None
+        except Exception as e:
+            module_logger.warning(f"Balances failed on {chain_config.name}: {e}")
+            balances = None
+
+        if balances is None:
+            result.wallet_balances = {}
+            return result.wallet_balances
+
+        result.wallet_balances = {
+            chain_config.chain_id: {
+                "wallets": [
+                    {
+                        "wallet_name": w["wallet_name"],
+                        "id": w["id"],
+                        "address": w["address"],
+                        "native_balance": balances[w["address"]][0],
+                        "token_balance": balances[w["address"]][1],
+                    }
+                    for w in items
+                    if w["address"] in balances
+                ]
+            }
+        }
+        return result.wallet_balances
+
+    def _build_from_chain_scans(
+        self,
+        chain_scans: list[ChainScan],
+        price: Decimal,
+        complete: bool = True,
+        skipped: list[SkippedStage] | None = None
+    ) -> ScanResult | None:
+        chains_with_token = [
+            ChainWithToken(chain_config=entry.chain_config, token_meta=entry.token_meta)
+            for entry in chain_scans
+        ]
+
+        all_snapshots = [
+            snapshot
+            for entry in chain_scans
+            for snapshot in entry.snapshots
+        ]
+
+        # route and prices are built around the eth-token pool
+        if not any(snapshot.eth_token_pool for snapshot in all_snapshots):
+            return None
+
+        result = self._build_scan_result(
             all_snapshots, 
             chains_with_token,
-            wallet_balances,
             price
         )
+        result.complete = complete
+        result.skipped = [
+            *(skipped or []),
+            *[s for entry in chain_scans for s in entry.skipped]
+        ]
+        return result
 
-    async def _fetch_wallet_balances(
-        self, 
-        chains: list[ChainWithToken], 
+    async def _iter_chain_scans(
+        self,
         token_address: str,
-        wallets: dict[str, list[str]]
-    ) -> dict:
-        tasks = []
+        skipped: list[SkippedStage],
+        deadline: float
+    ) -> AsyncIterator[ChainScan]:
+        cached = await self.scan_cache.get_many(self.chain_configs, token_address) \
+                if self.scan_cache else \
+                {}
 
-        for chain in chains:
-            chain_id = chain.chain_config.chain_id
+        viewed = list(cached)
 
-            items = wallets.get(str(chain_id), [])
+        for entry in cached.values():
+            yield entry
 
-            if not items:
-                continue
+        missing_chains = [c for c in self.chain_configs if c.chain_id not in cached]
 
-            addresses = [w["address"] for w in items if w.get("address")]
+        # chains where the address was recently found not to be an ERC-20
+        absent = await self.negative_cache.known_absent(missing_chains, token_address) \
+                if self.negative_cache and missing_chains else \
+                set()
+        missing_chains = [c for c in missing_chains if c.chain_id not in absent]
 
-            if not addresses:
-                continue
+        stored_metas, chain_pks = await self._get_stored_metas(missing_chains, token_address)
+        fetched_metas = {}
 
-            task = self._get_balances_for_chain(
-                chain.chain_config,
-                token_address,
-                addresses
+        pending = {c.chain_id: c for c in missing_chains}
+
+        async def scan_chain(chain_config: ChainConfig):
+            try:
+                return chain_config, await self._scan_chain_shared(
+                    chain_config,
+                    token_address,
+                    stored_metas.get(chain_config.chain_id)
+                )
+            except Exception as e:
+                return chain_config, e
+
+        # shared chain scans keep running past this caller's deadline and
+        # still fill the cache for the next request
+        try:
+            for next_scan in asyncio.as_completed(
+                [scan_chain(c) for c in missing_chains],
+                timeout=max(0.0, deadline - time.monotonic())
+            ):
+                chain_config, result = await next_scan
+                pending.pop(chain_config.chain_id, None)
+
+                if isinstance(result, ScanStageTimeout):
+                    skipped.append(result.skipped)
+                elif isinstance(result, Exception):
+                    skipped.append(await self._record_failure(chain_config, "scan", result))
+                elif isinstance(result, ChainScan):
+                    if chain_config.chain_id not in stored_metas:
+                        fetched_metas[chain_config.chain_id] = result.token_meta
+                    viewed.append(chain_config.chain_id)
+                    yield result
+        except asyncio.TimeoutError:
+            for chain_config in pending.values():
+                skipped.append(await self._record_timeout(chain_config, "scan"))
+
+        await self._persist_lookup(token_address, fetched_metas, chain_pks, viewed)
+
+        if self.redis is not None:
+            await rpc_scheduler.flush(self.redis)
+
+    async def _get_stored_metas(
+        self,
+        chain_configs: list[ChainConfig],
+        token_address: str
+    ) -> tuple[dict[int, TokenMeta], dict[int, int]]:
+        if not chain_configs:
+            return {}, {}
+
+        # one query for every chain, misses fall back to on-chain metadata
+        try:
+            async with self.session_factory() as session:
+                rows = await TokenRepository(session).get_by_address_in_chains(
+                    token_address,
+                    [c.chain_id for c in chain_configs]
+                )
+        except Exception as e:
+            module_logger.warning(f"Token metadata lookup failed for {token_address}: {e}")
+            return {}, {}
+
+        token_metas = {
+            chain_id: TokenService.meta_from_model(token)
+            for chain_id, _, token in rows
+            if token is not None
+        }
+        chain_pks = {chain_id: chain_pk for chain_id, chain_pk, _ in rows}
+
+        return token_metas, chain_pks
+
+    async def _persist_lookup(
+        self,
+        token_address: str,
+        token_metas: dict[int, TokenMeta],
+        chain_pks: dict[int, int],
+        viewed: list[int]
+    ):
+        tokens = [
+            TokenService.model_values(chain_pks[chain_id], token_meta)
+            for chain_id, token_meta in token_metas.items()
+            if chain_id in chain_pks and TokenService.is_storable(token_meta)
+        ]
+        if not tokens and not viewed:
+            return
+
+        # view counts pick the tokens the prewarm job keeps hot
+        try:
+            async with self.session_factory() as session:
+                token_repo = TokenRepository(session)
+                await token_repo.create_many(tokens)
+                await token_repo.increment_views(token_address, viewed)
+                await session.commit()
+        except Exception as e:
+            module_logger.warning(f"Token lookup persist failed for {token_address}: {e}")
+
+    async def refresh_chain(self, chain_config: ChainConfig, token_meta: TokenMeta) -> ChainScan | None:
+        return await self._scan_chain_shared(chain_config, token_meta.address, token_meta)
+
+    async def _get_chain_scans(
+        self,
+        token_address: str,
+        skipped: list[SkippedStage],
+        deadline: float
+    ) -> list[ChainScan]:
+        return [
+            chain_scan
+            async for chain_scan in self._iter_chain_scans(token_address, skipped, deadline)
+        ]
+
+    async def _scan_chain_shared(
+        self,
+        chain_config: ChainConfig,
+        token_address: str,
+        token_meta: TokenMeta | None = None
+    ) -> ChainScan | None:
+        key = (chain_config.chain_id, token_address.lower())
+
+        # concurrent callers in this process await the same scan, it keeps
+        # running even if the caller that started it is cancelled. A scan
+        # queued at a lower class is not joined, a user scan would wait
+        # behind prewarm traffic
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] <= self.rpc_class:
+            task = inflight[1]
+        else:
+            task = asyncio.create_task(
+                self._scan_chain_locked(chain_config, token_address, token_meta)
             )
+            self._inflight[key] = (self.rpc_class, task)
 
-            tasks.append((chain_id, task))
+            def forget(done: asyncio.Task):
+                # a higher class scan may have taken the key meanwhile
+                if key in self._inflight and self._inflight[key][1] is done:
+                    del self._inflight[key]
 
-        results = await asyncio.gather(
-            *[task for _, task in tasks],
-            return_exceptions=True
+            task.add_done_callback(forget)
+
+        return await asyncio.shield(task)
+
+    async def _scan_chain_locked(
+        self,
+        chain_config: ChainConfig,
+        token_address: str,
+        token_meta: TokenMeta | None = None
+    ) -> ChainScan | None:
+        # prewarm never holds the cross-process lock other requests wait on
+        if self.scan_cache is None or self.rpc_class == RpcClass.PREWARM:
+            scan = await self._scan_chain(chain_config, token_address, token_meta)
+            if scan is not None and self.scan_cache is not None:
+                await self.scan_cache.set_many(token_address, [scan])
+            return scan
+
+        owner = await self.scan_cache.acquire(chain_config, token_address)
+
+        if owner is None:
+            # another process owns the scan, wait for its result
+            status, scan = await self.scan_cache.wait_for(chain_config, token_address)
+
+            if status == ScanCache.CACHED:
+                return scan
+            if status == ScanCache.ABSENT:
+                return None
+
+            return await self._scan_chain(chain_config, token_address, token_meta)
+
+        status = ScanCache.FAILED
+        try:
+            scan = await self._scan_chain(chain_config, token_address, token_meta)
+
+            if scan is None:
+                status = ScanCache.ABSENT
+            else:
+                await self.scan_cache.set_many(token_address, [scan])
+                status = ScanCache.CACHED
+
+            return scan
+        finally:
+            await self.scan_cache.release(chain_config, token_address, owner, status)
+
+    async def _has_code(self, chain_config: ChainConfig, address: str) -> bool:
+        account = self.accounts.get(chain_config.chain_id)
+        if account is not None:
+            return account.has_code
+
+        async def fetch_code():
+            async with TokenService(chain_config) as client:
+                return await client.w3.eth.get_code(AsyncWeb3.to_checksum_address(address))
+
+        # an unanswered probe counts as code, nothing gets cached
+        try:
+            return len(await self._run_stage(fetch_code(), chain_config, "code")) > 0
+        except Exception:
+            return True
+
+    async def _get_block_number(self, chain_config: ChainConfig) -> int:
+        async with TokenService(chain_config) as client:
+            return await client.w3.eth.block_number
+
+    async def _scan_chain(
+        self,
+        chain_config: ChainConfig,
+        token_address: str,
+        token_meta: TokenMeta | None = None
+    ) -> ChainScan | None:
+        chain = await self._run_stage(
+            self._check_token_in_chain(chain_config, token_address, token_meta),
+            chain_config,
+            "metadata"
         )
 
-        balances = {}
-        for (chain_id, _), result in zip(tasks, results):
-            if isinstance(result, Exception):
-                continue
+        if chain is None:
+            # a contract whose name() reverts is not cached as absent, it
+            # may still be a token on the next look
+            if self.negative_cache and not await self._has_code(chain_config, token_address):
+                await self.negative_cache.add(chain_config, token_address)
+            return None
+
+        if token_meta is None and self.negative_cache:
+            await self.negative_cache.invalidate(chain_config.chain_id, token_address)
+
+        skipped = []
+        snapshots, block_number = await asyncio.gather(
+            self._fetch_all_snapshots([chain], token_address, skipped),
+            self._run_stage(self._get_block_number(chain_config), chain_config, "metadata")
+        )
+
+        return ChainScan(
+            chain_config=chain_config,
+            token_meta=chain.token_meta,
+            snapshots=snapshots,
+            block_number=block_number,
+            created_at=time.time(),
+            skipped=skipped
+        )
+
+    @staticmethod
+    def _balances_key(chain_config: ChainConfig, token_address: str, block_number: int) -> str:
+        return f"balances:{chain_config.chain_id}:{token_address.lower()}:{block_number}"
+
+    @staticmethod
+    def _balances_head_key(chain_config: ChainConfig, token_address: str) -> str:
+        # the block of the newest cached balances of the token
+        return f"balances:{chain_config.chain_id}:{token_address.lower()}:head"
 
-            native_map: dict[str, Any] = result.get("native_balance", {}) if isinstance(result, dict) else {}
-            token_map: dict[str, Any]  = result.get("token_balance",  {}) if isinstance(result, dict) else {}
-
-            items = wallets.get(str(chain_id), [])
-            wallet_rows: list[dict[str, Any]] = []
-            native_total = 0
-            token_total  = 0
-
-            for w in items:
-                addr = w["address"]
-                row = {
-                    "wallet_name": w["wallet_name"],
-                    "id": w["id"],
-                    "address": addr,
-                    "native_balance": native_map.get(addr, 0),
-                    "token_balance": token_map.get(addr, 0),
-                }
-                wallet_rows.append(row)
-                nv = row["native_balance"]
-                tv = row["token_balance"]
-                native_total += nv if isinstance(nv, (int, float)) else 0
-                token_total  += tv if isinstance(tv, (int, float)) else 0
-
-            balances[chain_id] = {"wallets": wallet_rows}
-        return balances
-    
     async def _get_balances_for_chain(
         self,
         chain_config: ChainConfig,
-        token_address: str,
+        token_meta: TokenMeta,
         addresses: list[str]
-    ):
+    ) -> dict[str, tuple[Decimal, Decimal]]:
+        ttl = max(1, math.ceil(chain_config.block_time * 2))
+
         async with WalletClient(chain_config) as wallet:
-            native_balances, token_balances = await asyncio.gather(
-                wallet.get_native_balances(addresses),
-                wallet.get_token_balances(token_address, addresses),
-                return_exceptions=True
+            if self.redis is None:
+                _, balances = await wallet.get_balances_with_block(
+                    token_meta.address, addresses, token_meta.decimals
+                )
+                return balances
+
+            # balances are cached per (wallet, token, block), the head key
+            # finds the last block without asking the rpc
+            balances = {}
+            head_key = self._balances_head_key(chain_config, token_meta.address)
+            head = await self.redis.get(head_key)
+
+            if head is not None:
+                key = self._balances_key(chain_config, token_meta.address, int(head))
+                cached = await self.redis.hmget(key, addresses)
+
+                for address, value in zip(addresses, cached):
+                    if value is not None:
+                        value = value.decode() if isinstance(value, bytes) else value
+                        native, token = value.split(":")
+                        balances[address] = (Decimal(native), Decimal(token))
+
+            if all(a in balances for a in addresses):
+                return balances
+
+            # a miss reads every wallet again, the card never mixes blocks
+            block_number, fetched = await wallet.get_balances_with_block(
+                token_meta.address, addresses, token_meta.decimals
             )
-            
-            return {
-                "native_balance": native_balances if isinstance(native_balances, dict) else {},
-                "token_balance": token_balances if isinstance(token_balances, dict) else {}
-            }
 
-    async def _fetch_chains_with_token(
-        self,
-        token_address: str
-    ) -> list[ChainWithToken]:
-        tasks = [
-            self._check_token_in_chain(
-                chain_config,
-                token_address
-            ) for chain_config in self.chain_configs
-        ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+            key = self._balances_key(chain_config, token_meta.address, block_number)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={
+                address: f"{native}:{token}" for address, (native, token) in fetched.items()
+            })
+            pipe.expire(key, ttl)
+            pipe.set(head_key, block_number, ex=max(1, math.ceil(chain_config.block_time)))
+            await pipe.execute()
 
-        chains_with_token = [
-            result for result in results if isinstance(result, ChainWithToken)
-        ]
-        return chains_with_token
+            return fetched
 
     async def _check_token_in_chain(
         self,
         chain_config: ChainConfig,
-        token_address: str
+        token_address: str,
+        token_meta: TokenMeta | None = None
     ) -> ChainWithToken | None:
-        async with self.session_factory() as session:
+        if token_meta is None:
             async with TokenService(chain_config) as token_service:
-                token_meta = await token_service.get_token_meta(
-                    session,
-                    token_address,
-                    chain_config.chain_id
-                )
+                token_meta = await token_service.fetch_token_meta(token_address)
 
-                if token_meta:
-                    return ChainWithToken(
-                        chain_config=chain_config, 
-                        token_meta=token_meta
-                    )
-                return None
+        if token_meta:
+            return ChainWithToken(
+                chain_config=chain_config, 
+                token_meta=token_meta
+            )
+        return None
             
     async def _fetch_all_snapshots(
         self,
         chains_with_token: list[ChainWithToken],
-        token_address: str
+        token_address: str,
+        skipped: list[SkippedStage] | None = None
     ) -> list[TokenSnapshot]:
         tasks = []
 
@@ -269,10 +723,15 @@ class LiquidityScanner:
                 if dex not in self.DEX_CLIENTS:
                     continue
 
-                task = self._fetch_snapshot_from_dex(
-                    chain,
-                    token_address,
-                    dex,
+                task = self._run_stage(
+                    self._fetch_snapshot_from_dex(
+                        chain,
+                        token_address,
+                        dex,
+                    ),
+                    chain_config,
+                    "snapshots",
+                    dex
                 )
 
                 tasks.append(task)
@@ -281,6 +740,9 @@ class LiquidityScanner:
 
         snapshots = [result for result in results if isinstance(result, TokenSnapshot)]
 
+        if skipped is not None:
+            skipped.extend(r.skipped for r in results if isinstance(r, ScanStageTimeout))
+
         return snapshots
     
     async def _fetch_snapshot_from_dex(
@@ -301,6 +763,158 @@ class LiquidityScanner:
                 return snapshot
             return None
     
+    @staticmethod
+    def route_state(result: ScanResult, refreshes: int = 0) -> dict[str, Any]:
+        chain_config = result.display_chain
+        token_meta = next(
+            (c.token_meta for c in result.chains_found if c.chain_config.chain_id == chain_config.chain_id),
+            result.token_meta
+        )
+        weth = AsyncWeb3.to_checksum_address(chain_config.weth_address)
+        token = AsyncWeb3.to_checksum_address(token_meta.address)
+
+        refs = []
+        for best in (result.best_eth_token_pool, result.best_eth_stable_pool, result.best_stable_token_pool):
+            if best is None:
+                continue
+
+            # pools spread over chains cannot be re-read in one multicall,
+            # an empty route always falls back to a full scan
+            if best.chain.chain_id != chain_config.chain_id:
+                refs = []
+                break
+
+            stable = next(
+                (s for s in chain_config.stables if s.symbol == best.stable_symbol),
+                None
+            )
+
+            # same pair orientation as the dex clients build for a scan
+            if best.category == "eth_token":
+                token_x, decimals_x, token_y, decimals_y = weth, 18, token, token_meta.decimals
+            elif stable is None:
+                refs = []
+                break
+            elif best.category == "eth_stable":
+                token_x, decimals_x, token_y, decimals_y = weth, 18, stable.contract, stable.decimals
+            else:
+                token_x, decimals_x, token_y, decimals_y = stable.contract, stable.decimals, token, token_meta.decimals
+
+            refs.append(asdict(PoolRef(
+                category=best.category,
+                dex=best.dex,
+                version=best.version,
+                pool=best.pool.pool,
+                token_x=AsyncWeb3.to_checksum_address(token_x),
+                token_y=AsyncWeb3.to_checksum_address(token_y),
+                decimals_x=decimals_x,
+                decimals_y=decimals_y,
+                tvl=str(best.tvl),
+                fee=getattr(best.pool, "fee", None),
+                is_stable=getattr(best.pool, "is_stable", None),
+                stable_symbol=best.stable_symbol,
+                stable_address=best.stable_address,
+            )))
+
+        return {
+            "chain_id": chain_config.chain_id,
+            "token_meta": asdict(token_meta),
+            "pools": refs,
+            "refreshes": refreshes,
+        }
+
+    async def refresh_route(
+        self,
+        route: dict[str, Any],
+        price: Decimal,
+        wallets: dict[str, list[dict[str, Any]]]
+    ) -> ScanResult | None:
+        # re-reads the pools picked by the last full scan and the balances in
+        # one multicall, None asks the caller for a full rescan
+        chain_config = registery.get(route["chain_id"])
+        token_meta = TokenMeta(**route["token_meta"])
+        refs = [PoolRef(**ref) for ref in route["pools"]]
+
+        if not any(ref.category == "eth_token" for ref in refs):
+            return None
+
+        items = wallets.get(str(chain_config.chain_id), [])
+        addresses = [w["address"] for w in items if w.get("address")]
+        max_drop = Decimal(str(settings.get("REFRESH_TVL_DROP", 0.5)))
+
+        async with AsyncExitStack() as stack:
+            wallet = await stack.enter_async_context(WalletClient(chain_config))
+
+            calls, parsers = [], []
+            for ref in refs:
+                client = await stack.enter_async_context(
+                    self.DEX_CLIENTS[f"{ref.dex}_{ref.version}"](chain_config)
+                )
+                pair = client._create_token_pair(ref.token_x, ref.token_y, ref.decimals_x, ref.decimals_y)
+                pool_calls = client.pool_calls(pair, ref)
+
+                parsers.append((ref, client, pair, len(calls), len(pool_calls)))
+                calls.extend(pool_calls)
+
+            balances_at = len(calls)
+            calls.extend(wallet.balance_calls(token_meta.address, addresses))
+
+            multicall = wallet._get_multicall_contract()
+            results = await self._run_stage(
+                multicall.functions.aggregate3(calls).call(),
+                chain_config,
+                "snapshots"
+            )
+
+            best_pools = {"eth_token": None, "eth_stable": None, "stable_token": None}
+            for ref, client, pair, start, count in parsers:
+                pool = client.parse_pool(results[start:start + count], pair, ref)
+
+                if pool is None or pool.tvl < Decimal(ref.tvl) * (1 - max_drop):
+                    module_logger.info(
+                        f"Refresh of {ref.pool} on {chain_config.name} fell back to a full scan"
+                    )
+                    return None
+
+                best_pools[ref.category] = BestPool(
+                    chain=chain_config,
+                    category=ref.category,
+                    dex=ref.dex,
+                    version=ref.version,
+                    pool=pool,
+                    tvl=pool.tvl,
+                    stable_symbol=ref.stable_symbol,
+                    stable_address=ref.stable_address,
+                )
+
+            balances = wallet.parse_balances(results[balances_at:], addresses, token_meta.decimals)
+
+        result = self._price_result(
+            best_pools,
+            [ChainWithToken(chain_config=chain_config, token_meta=token_meta)],
+            token_meta,
+            price
+        )
+
+        if addresses:
+            result.wallet_balances = {
+                chain_config.chain_id: {
+                    "wallets": [
+                        {
+                            "wallet_name": w["wallet_name"],
+                            "id": w["id"],
+                            "address": w["address"],
+                            "native_balance": balances[w["address"]][0],
+                            "token_balance": balances[w["address"]][1],
+                        }
+                        for w in items
+                        if w["address"] in balances
+                    ]
+                }
+            }
+
+        return result
+
     @staticmethod
     def _get_best_pools(snapshots: list[TokenSnapshot]) -> dict[str, BestPool | None]:
         best = {
@@ -362,17 +976,26 @@ class LiquidityScanner:
         self,
         all_snapshots: list[TokenSnapshot],
         chains_found: list[ChainWithToken],
-        wallet_balances: dict[str, dict[str, dict[str, Decimal]]],
         price: Decimal
     ) -> ScanResult:
-        best_pools = self._get_best_pools(all_snapshots)
+        return self._price_result(
+            self._get_best_pools(all_snapshots),
+            chains_found,
+            all_snapshots[0].meta,
+            price
+        )
 
+    @staticmethod
+    def _price_result(
+        best_pools: dict[str, BestPool | None],
+        chains_found: list[ChainWithToken],
+        token_meta: TokenMeta,
+        price: Decimal
+    ) -> ScanResult:
         eth_token_tvl = best_pools['eth_token'].tvl
         stable_token_tvl = best_pools['stable_token'].tvl if best_pools['stable_token'] else Decimal(0)
 
         route_type = "multihop" if stable_token_tvl > eth_token_tvl * price else "direct"
-        
-        token_meta = all_snapshots[0].meta
 
         supply = Decimal(token_meta.supply) / (10 ** token_meta.decimals)
         
@@ -394,7 +1017,6 @@ class LiquidityScanner:
             best_stable_token_pool=best_pools['stable_token'],
             chains_found=chains_found,
             token_meta=token_meta,
-            wallet_balances=wallet_balances,
             market_cap=market_cap,
             token_price=token_price_eth,
             token_price_raw=token_price_eth_raw
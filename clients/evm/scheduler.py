@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Hashable
+
+from redis.asyncio import Redis
+
+from chains.dto import ChainConfig
+from config import settings
+from enums.rpc import RpcClass
+from utils import metrics
+
+
+@dataclass(order=True)
+class _Waiter:
+    rpc_class: int
+    finish: float
+    seq: int
+    start: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+@dataclass
+class _ChainQueue:
+    capacity: int
+    active: int = 0
+    virtual_time: float = 0.0
+    heap: list[_Waiter] = field(default_factory=list)
+    # user -> finish tag of the user's last queued request
+    finish_tags: dict[Hashable, float] = field(default_factory=dict)
+
+
+class RpcScheduler:
+    METRICS_NAME = "rpc_wait"
+
+    def __init__(self):
+        self._queues: dict[int, _ChainQueue] = {}
+        self._seq = itertools.count()
+        # class name -> [count, total wait, max wait]
+        self._waits: dict[str, list[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self._flushed_at = time.monotonic()
+
+    def _queue(self, chain_config: ChainConfig) -> _ChainQueue:
+        queue = self._queues.get(chain_config.chain_id)
+        if queue is None:
+            queue = _ChainQueue(capacity=chain_config.rpc_capacity)
+            self._queues[chain_config.chain_id] = queue
+        return queue
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        chain_config: ChainConfig,
+        rpc_class: RpcClass,
+        user_id: Hashable | None = None
+    ):
+        queue = self._queue(chain_config)
+        enqueued_at = time.monotonic()
+
+        if queue.active < queue.capacity and not queue.heap:
+            queue.active += 1
+        else:
+            # fair queueing: each user's requests are spaced one slot apart,
+            # so a user with a long backlog cannot starve the others
+            start = max(queue.virtual_time, queue.finish_tags.get(user_id, 0.0))
+            finish = start + 1
+            queue.finish_tags[user_id] = finish
+
+            waiter = _Waiter(
+                rpc_class=int(rpc_class),
+                finish=finish,
+                seq=next(self._seq),
+                start=start,
+                future=asyncio.get_running_loop().create_future()
+            )
+            heapq.heappush(queue.heap, waiter)
+
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                # granted right before the cancel, the slot goes to the next one
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(queue)
+                raise
+
+        self._record_wait(rpc_class, time.monotonic() - enqueued_at)
+
+        try:
+            yield
+        finally:
+            self._release(queue)
+
+    def _release(self, queue: _ChainQueue):
+        while queue.heap:
+            waiter = heapq.heappop(queue.heap)
+
+            # cancelled waiters are dropped lazily
+            if waiter.future.done():
+                continue
+
+            queue.virtual_time = max(queue.virtual_time, waiter.start)
+            waiter.future.set_result(None)
+            return
+
+        queue.active -= 1
+        queue.virtual_time = 0.0
+        queue.finish_tags.clear()
+
+    def _record_wait(self, rpc_class: RpcClass, wait: float):
+        stats = self._waits[rpc_class.name.lower()]
+        stats[0] += 1
+        stats[1] += wait
+        stats[2] = max(stats[2], wait)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {
+                "count": count,
+                "avg_wait": total / count if count else 0.0,
+                "max_wait": max_wait,
+            }
+            for name, (count, total, max_wait) in self._waits.items()
+        }
+
+    def queued(self) -> dict[int, int]:
+        return {chain_id: len(queue.heap) for chain_id, queue in self._queues.items()}
+
+    async def flush(self, redis: Redis, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._flushed_at < float(settings.get("RPC_METRICS_FLUSH", 10)):
+            return
+
+        waits, self._waits = self._waits, defaultdict(lambda: [0, 0.0, 0.0])
+        self._flushed_at = now
+
+        counters = {}
+        for name, (count, total, _) in waits.items():
+            counters[f"{name}:count"] = int(count)
+            counters[f"{name}:total"] = float(total)
+
+        if counters:
+            await metrics.incr(redis, self.METRICS_NAME, counters)
+
+
+rpc_scheduler = RpcScheduler()
@@ -0,0 +1,31 @@
+from eth_abi.abi import encode as encode_abi
+from eth_utils.crypto import keccak
+
+# ERC-7201 namespace of OpenZeppelin upgradeable ERC20 (v5), allowances are the
+# second member of the struct
+OZ_ERC20_NAMESPACE = 0x52c63247e1f47db19d5ce0460030c497f067ca4cebf71ba98eeadabe20bace00
+
+SOLIDITY = "solidity"
+VYPER = "vyper"
+LAYOUTS = (SOLIDITY, VYPER)
+
+
+def mapping_slot(layout: str, base_slot: int, key: str) -> int:
+    if layout == SOLIDITY:
+        data = encode_abi(["address", "uint256"], [key, base_slot])
+    else:
+        data = encode_abi(["uint256", "address"], [base_slot, key])
+
+    return int.from_bytes(keccak(data), "big")
+
+
+def allowance_slot(layout: str, base_slot: int, owner: str, spender: str) -> int:
+    return mapping_slot(layout, mapping_slot(layout, base_slot, owner), spender)
+
+
+def candidate_base_slots(max_slot: int) -> list[int]:
+    return [*range(max_slot + 1), OZ_ERC20_NAMESPACE + 1]
+
+
+def to_slot_hex(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
@@ -1,4 +1,6 @@
 import asyncio
+import logging
+from collections import OrderedDict
 from dataclasses import dataclass
 from decimal import Decimal
 import time
@@ -6,13 +8,18 @@ from typing import Any
 
 from web3 import AsyncWeb3, Web3
 from web3.types import TxParams
-from eth_abi.abi import encode as encode_abi
+from eth_abi.abi import encode as encode_abi, decode as decode_abi
 
 from chains.dto import ChainConfig
 from clients.evm.base import BaseWeb3Client
 from clients.evm.dex.dto import TokenSnapshot
-from clients.evm.dto import TraceResult
+from clients.evm.dto import AllowanceSlot, RoundTripResult, TraceResult
+from clients.evm.probe import OUTPUT_WORDS, ROUND_TRIP_PROBE_ADDRESS, ROUND_TRIP_PROBE_CODE
 from clients.evm.scanner import BestPool, ScanResult
+from clients.evm.storage import LAYOUTS, allowance_slot, candidate_base_slots, to_slot_hex
+from config import settings
+
+module_logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -23,6 +30,8 @@ class SwapSimulation:
     slippage: Decimal
     success: bool = True
     error: str | None = None
+    needs_approve: bool = False
+    gas_used: int = 0
 
 
 @dataclass
@@ -44,6 +53,13 @@ class SwapRoute:
     hops: list[Hop]
 
 
+@dataclass
+class PreparedSwap:
+    simulation: SwapSimulation
+    route: SwapRoute | None = None
+    tx: dict | None = None
+
+
 class HopBuilder:
     @staticmethod
     def _build_v2_hop(
@@ -209,6 +225,9 @@ class SwapClient(BaseWeb3Client):
         "base": "0xA69418B7924d556f3ed8fc59f09710cCB58da538",
     }
 
+    V2_FEE = Decimal("0.003")
+    AERODROME_FEES = {True: Decimal("0.0005"), False: Decimal("0.003")}
+
     ROUTER_V2_ABI = [
         {
             "inputs": [
@@ -269,6 +288,24 @@ class SwapClient(BaseWeb3Client):
     ]
 
     ETH_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+    ALLOWANCE_PROBE_VALUE = 0xA110CA7E0000
+    ALLOWANCE_PROBE_OWNER = "0x000000000000000000000000000000000000dEaD"
+    MAX_TRACED_BASE_SLOT = 255
+
+    # traced gas excludes refund timing and the 63/64 rule, multihop touches more state
+    GAS_MARGIN = {
+        "direct": 1.25,
+        "multihop": 1.35,
+    }
+
+    # (chain_id, token) -> (expires_at, allowance mapping layout), shared by
+    # all clients and kept in lru order; expires_at is None for a layout the
+    # probe settled, failed probes are retried after ALLOWANCE_SLOT_RETRY
+    _allowance_slots: OrderedDict[tuple[int, str], tuple[float | None, AllowanceSlot | None]] = OrderedDict()
+
+    # (chain_id, wallet, token, is_buy, pools, amount_in) -> (simulated_at, gas_used)
+    _simulated_gas: dict[tuple, tuple[float, int]] = {}
     
     def __init__(self, chain_config):
         super().__init__(chain_config)
@@ -285,9 +322,8 @@ class SwapClient(BaseWeb3Client):
         return int(human * (Decimal(10) ** decimals))
 
     @staticmethod
-    def _calculate_price_impact(
+    def _expected_amount_out(
         amount_in: int,
-        amount_out: int,
         price_wei: int,
         token_decimals: int,
         is_buy: bool = True,
@@ -298,13 +334,21 @@ class SwapClient(BaseWeb3Client):
             return Decimal(0)
 
         if is_buy:
-            expected_out_raw = (
-                Decimal(amount_in) * (Decimal(10) ** token_decimals) / price_wei_dec
-            )
-        else:
-            expected_out_raw = (
-                Decimal(amount_in) * price_wei_dec / (Decimal(10) ** token_decimals)
-            )
+            return Decimal(amount_in) * (Decimal(10) ** token_decimals) / price_wei_dec
+
+        return Decimal(amount_in) * price_wei_dec / (Decimal(10) ** token_decimals)
+
+    @staticmethod
+    def _calculate_price_impact(
+        amount_in: int,
+        amount_out: int,
+        price_wei: int,
+        token_decimals: int,
+        is_buy: bool = True,
+    ) -> Decimal:
+        expected_out_raw = SwapClient._expected_amount_out(
+            amount_in, price_wei, token_decimals, is_buy
+        )
 
         if expected_out_raw == 0:
             return Decimal(0)
@@ -312,6 +356,75 @@ class SwapClient(BaseWeb3Client):
         price_impact = abs((expected_out_raw - Decimal(amount_out)) / expected_out_raw) * Decimal(100)
         return price_impact.quantize(Decimal("0.01"))
 
+    @staticmethod
+    def _calculate_tax(
+        amount_in: int,
+        amount_out: int,
+        price_wei: int,
+        token_decimals: int,
+        is_buy: bool = True,
+        route_cost: Decimal = Decimal(0),
+    ) -> Decimal:
+        # loss against the spot price minus what the pools themselves take
+        # (lp fee and price impact of the probe amount), see _route_cost
+        expected_out_raw = SwapClient._expected_amount_out(
+            amount_in, price_wei, token_decimals, is_buy
+        )
+
+        if expected_out_raw == 0:
+            return Decimal(0)
+
+        tax = (expected_out_raw - Decimal(amount_out)) / expected_out_raw * Decimal(100) - route_cost
+        return max(tax, Decimal(0)).quantize(Decimal("0.01"))
+
+    @classmethod
+    def _pool_fee(cls, best: BestPool) -> Decimal:
+        if best.version == "v3":
+            return Decimal(best.pool.fee) / Decimal(10 ** 6)
+        if best.dex == "aerodrome":
+            return cls.AERODROME_FEES[best.pool.is_stable]
+        return cls.V2_FEE
+
+    @classmethod
+    def _route_cost(cls, scan_result: ScanResult, amount_in: int) -> Decimal:
+        # percent of one leg lost to lp fees and price impact, the impact is
+        # taken as on a constant product pool holding half of the tvl
+        amount_eth = Decimal(amount_in) / Decimal(10 ** 18)
+
+        if scan_result.route_type == "direct":
+            pool = scan_result.best_eth_token_pool
+            legs = [(pool, pool.tvl)]
+        else:
+            eth_stable = scan_result.best_eth_stable_pool
+            stable_token = scan_result.best_stable_token_pool
+            # stable side tvl is in usd, the eth/stable price is eth per stable
+            legs = [(eth_stable, eth_stable.tvl), (stable_token, stable_token.tvl * eth_stable.pool.price)]
+
+        kept = Decimal(1)
+        for best, tvl_eth in legs:
+            reserve = tvl_eth / 2
+            impact = amount_eth / (reserve + amount_eth) if reserve > 0 else Decimal(0)
+            kept *= (1 - cls._pool_fee(best)) * (1 - impact)
+
+        return (1 - kept) * Decimal(100)
+
+    @staticmethod
+    def _decode_revert_reason(data: bytes) -> str:
+        if not data:
+            return "execution reverted"
+
+        selector, payload = data[:4], data[4:]
+
+        try:
+            if selector == bytes.fromhex("08c379a0"):
+                return decode_abi(["string"], payload)[0]
+            if selector == bytes.fromhex("4e487b71"):
+                return f"panic {hex(decode_abi(['uint256'], payload)[0])}"
+        except Exception:
+            pass
+
+        return "0x" + data.hex()
+
     @staticmethod
     def _calculate_min_amount_out(amount_out: Decimal, slippage: Decimal) -> Decimal:
         slippage_multiplier = Decimal(1) - (slippage / Decimal(100))
@@ -369,6 +482,68 @@ class SwapClient(BaseWeb3Client):
         
         return None
     
+    @staticmethod
+    def _route_pools(scan_result: ScanResult) -> tuple[str, ...]:
+        if scan_result.route_type == "direct":
+            return (scan_result.best_eth_token_pool.pool.pool,)
+
+        return (
+            scan_result.best_eth_stable_pool.pool.pool,
+            scan_result.best_stable_token_pool.pool.pool,
+        )
+
+    def _simulation_key(
+        self,
+        scan_result: ScanResult,
+        wallet_address: str,
+        amount_in: int,
+        is_buy: bool
+    ) -> tuple:
+        return (
+            self.chain_config.chain_id,
+            wallet_address.lower(),
+            scan_result.token_meta.address.lower(),
+            is_buy,
+            self._route_pools(scan_result),
+            int(amount_in),
+        )
+
+    def _remember_gas(self, key: tuple, gas_used: int):
+        now = time.time()
+        ttl = float(settings.get("SIMULATION_GAS_TTL", 30))
+
+        for stale_key in [k for k, (at, _) in self._simulated_gas.items() if now - at > ttl]:
+            del self._simulated_gas[stale_key]
+
+        self._simulated_gas[key] = (now, gas_used)
+
+    def _recent_gas(self, key: tuple) -> int | None:
+        ttl = float(settings.get("SIMULATION_GAS_TTL", 30))
+        simulated_at, gas_used = self._simulated_gas.get(key, (0.0, 0))
+
+        if not gas_used or time.time() - simulated_at > ttl:
+            return None
+
+        return gas_used
+
+    def _encode_route(
+        self,
+        route: SwapRoute,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        min_amount_out: int
+    ) -> str:
+        contract = self._get_contract()
+
+        return contract.functions.executeRoute(
+            token_in,
+            token_out,
+            int(amount_in),
+            int(min_amount_out),
+            self._convert_hops_to_tuples(route.hops)
+        )._encode_transaction_data()
+
     async def build_route(
         self,
         scan_result: ScanResult,
@@ -409,38 +584,28 @@ class SwapClient(BaseWeb3Client):
         scan_result: ScanResult,
         wallet_address: str,
         amount_in: int,
-        is_buy: bool = True
+        is_buy: bool = True,
+        state_overrides: dict | None = None,
+        route: SwapRoute | None = None
     ) -> SwapSimulation:
-        route = await self.build_route(scan_result, amount_in, is_buy)
+        route = route or await self.build_route(scan_result, amount_in, is_buy)
 
         token_in = self.ETH_ADDRESS if is_buy else scan_result.token_meta.address
         token_out = scan_result.token_meta.address if is_buy else self.ETH_ADDRESS
 
         price_token = scan_result.token_price_raw
-        
-        contract = self._get_contract()
-
-        hops_tuples = self._convert_hops_to_tuples(route.hops)
-
-        func = contract.functions.executeRoute(
-            token_in,
-            token_out,
-            amount_in,
-            0,
-            hops_tuples
-        )
 
         tx = {
-            'to': contract.address,
+            'to': AsyncWeb3.to_checksum_address(self.ROUTER_ADDRESS[self.chain_config.name]),
             'from': wallet_address,
-            'data': func._encode_transaction_data(),
+            'data': self._encode_route(route, token_in, token_out, amount_in, 0),
         }
 
         if is_buy:
             tx['value'] = hex(amount_in)
 
         try:
-            raw_result = await self.trace_call(tx)
+            raw_result = await self.trace_call(tx, state_overrides)
             trace_result = self._parse_trace_result(raw_result)
 
             if not trace_result.success:
@@ -465,11 +630,18 @@ class SwapClient(BaseWeb3Client):
                 is_buy
             )
 
+            gas_used = trace_result.gas_used or 0
+            self._remember_gas(
+                self._simulation_key(scan_result, wallet_address, amount_in, is_buy),
+                gas_used
+            )
+
             return SwapSimulation(
                 amount_in=Decimal(str(amount_in)),
                 amount_out=Decimal(str(amount_out)),
                 price_impact=price_impact,
-                slippage=slippage
+                slippage=slippage,
+                gas_used=gas_used
             )
         except Exception as e:
             return SwapSimulation(
@@ -486,24 +658,358 @@ class SwapClient(BaseWeb3Client):
         scan_result: ScanResult,
         wallet_address: str,
         amount_in: int,
-        is_buy: bool = True
+        is_buy: bool = True,
+        route: SwapRoute | None = None
     ) -> SwapSimulation:
         token_address = scan_result.token_meta.address
 
-        allowance, simulation = await asyncio.gather(
-            self.check_allowance(token_address, wallet_address),
-            self._simulate_swap_trace(
+        if is_buy:
+            return await self._simulate_swap_trace(
                 scan_result,
                 wallet_address,
                 amount_in,
-                is_buy
+                is_buy,
+                route=route
             )
+
+        allowance, state_overrides = await asyncio.gather(
+            self.check_allowance(token_address, wallet_address),
+            self.get_allowance_override(token_address, wallet_address)
+        )
+
+        simulation = await self._simulate_swap_trace(
+            scan_result,
+            wallet_address,
+            amount_in,
+            is_buy,
+            state_overrides,
+            route
         )
-        if not is_buy and allowance == 0 and not simulation.success:
+        simulation.needs_approve = allowance < amount_in
+
+        if simulation.needs_approve and state_overrides is None and not simulation.success:
             simulation.error = "Allowance is 0, need make approve"
 
         return simulation
+
+    async def _call_allowance(
+        self,
+        token_address: str,
+        owner: str,
+        spender: str,
+        state_diff: dict[str, str]
+    ) -> int:
+        token_contract = self._get_erc20_contract(token_address)
+        tx = {
+            "to": token_contract.address,
+            "data": token_contract.encode_abi("allowance", [owner, spender]),
+        }
+
+        response = await self.w3.provider.make_request(
+            "eth_call",
+            [tx, "latest", {token_contract.address: {"stateDiff": state_diff}}],
+        )
+        if "error" in response:
+            raise ValueError(response["error"].get("message", "Unknown RPC error"))
+
+        return int(response["result"], 16) if response["result"] != "0x" else 0
+
+    async def _probe_allowance_slot(
+        self,
+        token_address: str,
+        owner: str,
+        spender: str
+    ) -> AllowanceSlot | None:
+        max_slot = int(settings.get("ALLOWANCE_PROBE_SLOTS", 20))
+        candidates = [
+            AllowanceSlot(layout, base_slot)
+            for layout in LAYOUTS
+            for base_slot in candidate_base_slots(max_slot)
+        ]
+
+        # every candidate gets its own value, the returned allowance tells which one is real
+        state_diff = {
+            to_slot_hex(allowance_slot(c.layout, c.base_slot, owner, spender)): to_slot_hex(self.ALLOWANCE_PROBE_VALUE + i)
+            for i, c in enumerate(candidates)
+        }
+
+        index = await self._call_allowance(token_address, owner, spender, state_diff) - self.ALLOWANCE_PROBE_VALUE
+        return candidates[index] if 0 <= index < len(candidates) else None
+
+    async def _trace_allowance_slot(
+        self,
+        token_address: str,
+        owner: str,
+        spender: str
+    ) -> AllowanceSlot | None:
+        token_contract = self._get_erc20_contract(token_address)
+        tx = {
+            "to": token_contract.address,
+            "data": token_contract.encode_abi("allowance", [owner, spender]),
+        }
+
+        response = await self.w3.provider.make_request("eth_createAccessList", [tx, "latest"])
+        if "error" in response:
+            raise ValueError(response["error"].get("message", "Unknown RPC error"))
+
+        keys = [
+            key
+            for item in response["result"]["accessList"]
+            if item["address"].lower() == token_address.lower()
+            for key in item["storageKeys"]
+        ]
+        if not keys:
+            return None
+
+        state_diff = {key: to_slot_hex(self.ALLOWANCE_PROBE_VALUE + i) for i, key in enumerate(keys)}
+        index = await self._call_allowance(token_address, owner, spender, state_diff) - self.ALLOWANCE_PROBE_VALUE
+        if not 0 <= index < len(keys):
+            return None
+
+        # recover the layout so the slot can be reused for any wallet
+        slot = int(keys[index], 16)
+        for layout in LAYOUTS:
+            for base_slot in candidate_base_slots(self.MAX_TRACED_BASE_SLOT):
+                if allowance_slot(layout, base_slot, owner, spender) == slot:
+                    return AllowanceSlot(layout, base_slot)
+
+        return None
+
+    async def get_allowance_slot(self, token_address: str) -> AllowanceSlot | None:
+        key = (self.chain_config.chain_id, token_address.lower())
+        cached = self._allowance_slots.get(key)
+
+        if cached is not None:
+            expires_at, slot = cached
+            if expires_at is None or expires_at > time.time():
+                self._allowance_slots.move_to_end(key)
+                return slot
+
+        owner = self.ALLOWANCE_PROBE_OWNER
+        spender = AsyncWeb3.to_checksum_address(self.ROUTER_ADDRESS[self.chain_config.name])
+        expires_at = None
+
+        try:
+            slot = await self._probe_allowance_slot(token_address, owner, spender) \
+                or await self._trace_allowance_slot(token_address, owner, spender)
+        except Exception as e:
+            module_logger.warning(f"Allowance slot probe failed for {token_address} on {self.chain_config.name}: {e}")
+            slot = None
+            expires_at = time.time() + float(settings.get("ALLOWANCE_SLOT_RETRY", 300))
+
+        self._allowance_slots[key] = (expires_at, slot)
+        self._allowance_slots.move_to_end(key)
+
+        while len(self._allowance_slots) > int(settings.get("ALLOWANCE_SLOT_CACHE_SIZE", 10000)):
+            self._allowance_slots.popitem(last=False)
+
+        return slot
+
+    async def get_allowance_override(
+        self,
+        token_address: str,
+        wallet_address: str
+    ) -> dict | None:
+        slot = await self.get_allowance_slot(token_address)
+        if slot is None:
+            return None
+
+        spender = self.ROUTER_ADDRESS[self.chain_config.name]
+        key = allowance_slot(
+            slot.layout,
+            slot.base_slot,
+            AsyncWeb3.to_checksum_address(wallet_address),
+            AsyncWeb3.to_checksum_address(spender)
+        )
+
+        return {
+            AsyncWeb3.to_checksum_address(token_address): {
+                "stateDiff": {to_slot_hex(key): to_slot_hex(2 ** 256 - 1)}
+            }
+        }
     
+    async def check_round_trip(
+        self,
+        scan_result: ScanResult,
+        amount_in: int,
+        block_identifier: int | str = "latest"
+    ) -> RoundTripResult:
+        token = scan_result.token_meta.address
+        contract = self._get_contract()
+
+        buy_route = await self.build_route(scan_result, amount_in, True)
+        sell_route = await self.build_route(scan_result, Decimal(0), False)
+
+        # sell amountIn is patched by the probe with the amount actually bought
+        buy_data = AsyncWeb3.to_bytes(hexstr=contract.functions.executeRoute(
+            self.ETH_ADDRESS,
+            token,
+            amount_in,
+            0,
+            self._convert_hops_to_tuples(buy_route.hops)
+        )._encode_transaction_data())
+
+        sell_data = AsyncWeb3.to_bytes(hexstr=contract.functions.executeRoute(
+            token,
+            self.ETH_ADDRESS,
+            0,
+            0,
+            self._convert_hops_to_tuples(sell_route.hops)
+        )._encode_transaction_data())
+
+        calldata = encode_abi(
+            ["address", "address", "uint256", "uint256", "uint256"],
+            [contract.address, token, amount_in, len(buy_data), len(sell_data)]
+        ) + buy_data + sell_data
+
+        tx = {
+            "to": ROUND_TRIP_PROBE_ADDRESS,
+            "data": "0x" + calldata.hex(),
+        }
+        state_override = {
+            ROUND_TRIP_PROBE_ADDRESS: {
+                "code": ROUND_TRIP_PROBE_CODE,
+                "balance": hex(amount_in),
+            }
+        }
+
+        response = await self.w3.provider.make_request(
+            "eth_call",
+            [tx, hex(block_identifier) if isinstance(block_identifier, int) else block_identifier, state_override],
+        )
+
+        if "error" in response:
+            return RoundTripResult(
+                buy_success=False,
+                sell_success=False,
+                amount_in=amount_in,
+                error_message=response["error"].get("message", "Unknown RPC error"),
+            )
+
+        output = AsyncWeb3.to_bytes(hexstr=response["result"])
+        (
+            buy_ok, bought, buy_gas, _, sell_ok,
+            eth_out, sell_gas, sell_return, revert_length
+        ) = decode_abi(["uint256"] * OUTPUT_WORDS, output[:OUTPUT_WORDS * 32])
+
+        revert_data = output[OUTPUT_WORDS * 32:OUTPUT_WORDS * 32 + revert_length]
+
+        if not buy_ok:
+            return RoundTripResult(
+                buy_success=False,
+                sell_success=False,
+                buy_gas=buy_gas,
+                amount_in=amount_in,
+                error_message=self._decode_revert_reason(revert_data),
+            )
+
+        price_token = scan_result.token_price_raw
+        decimals = scan_result.token_meta.decimals
+        route_cost = self._route_cost(scan_result, amount_in)
+        buy_tax = self._calculate_tax(amount_in, bought, price_token, decimals, True, route_cost)
+
+        if not sell_ok:
+            return RoundTripResult(
+                buy_success=True,
+                sell_success=False,
+                buy_tax=buy_tax,
+                buy_gas=buy_gas,
+                sell_gas=sell_gas,
+                amount_in=amount_in,
+                bought=bought,
+                error_message=self._decode_revert_reason(revert_data),
+            )
+
+        # router may deliver WETH instead of native, fall back to its reported output
+        amount_out = eth_out or sell_return
+
+        return RoundTripResult(
+            buy_success=True,
+            sell_success=True,
+            buy_tax=buy_tax,
+            sell_tax=self._calculate_tax(bought, amount_out, price_token, decimals, False, route_cost),
+            buy_gas=buy_gas,
+            sell_gas=sell_gas,
+            amount_in=amount_in,
+            bought=bought,
+            amount_out=amount_out,
+        )
+    
+    async def prepare_swap(
+        self,
+        scan_result: ScanResult,
+        wallet_address: str,
+        amount_in: int,
+        slippage: Decimal,
+        max_gas_price: float,
+        max_gas_limit: int,
+        gas_delta: float,
+        is_buy: bool = True
+    ) -> PreparedSwap:
+        wallet_address = AsyncWeb3.to_checksum_address(wallet_address)
+        token_in = self.ETH_ADDRESS if is_buy else scan_result.token_meta.address
+        token_out = scan_result.token_meta.address if is_buy else self.ETH_ADDRESS
+
+        # nonce and fees don't depend on the simulation, fetch them while it runs
+        nonce_task = asyncio.ensure_future(self.w3.eth.get_transaction_count(wallet_address))
+        fees_task = asyncio.ensure_future(self.get_gas_fees())
+
+        try:
+            route = await self.build_route(scan_result, amount_in, is_buy)
+            simulation = await self.simulate_swap(
+                scan_result,
+                wallet_address,
+                amount_in,
+                is_buy,
+                route
+            )
+        except Exception:
+            nonce_task.cancel()
+            fees_task.cancel()
+            raise
+
+        if not simulation.success:
+            nonce_task.cancel()
+            fees_task.cancel()
+            return PreparedSwap(simulation=simulation)
+
+        min_amount_out = self._calculate_min_amount_out(simulation.amount_out, slippage)
+
+        tx = {
+            "chainId": self.chain_config.chain_id,
+            "type": 2,
+            "from": wallet_address,
+            "to": AsyncWeb3.to_checksum_address(self.ROUTER_ADDRESS[self.chain_config.name]),
+            "data": self._encode_route(route, token_in, token_out, amount_in, min_amount_out),
+            "value": amount_in if is_buy else 0,
+        }
+
+        nonce, (max_priority_fee, max_fee) = await asyncio.gather(nonce_task, fees_task)
+        tx["nonce"] = nonce
+        tx["maxFeePerGas"] = max_fee
+        tx["maxPriorityFeePerGas"] = max_priority_fee
+
+        if simulation.gas_used:
+            estimate_gas = simulation.gas_used
+            gas_multiplier = self.GAS_MARGIN[scan_result.route_type]
+        else:
+            state_override = await self.get_allowance_override(token_in, wallet_address) \
+                            if simulation.needs_approve else \
+                            None
+            estimate_gas = await self.w3.eth.estimate_gas(tx, state_override=state_override)
+            gas_multiplier = 1.2
+
+        tx = self._build_tx_params(
+            tx,
+            estimate_gas,
+            max_gas_price,
+            max_gas_limit,
+            gas_delta,
+            gas_multiplier
+        )
+
+        return PreparedSwap(simulation=simulation, route=route, tx=tx)
+
     async def make_swap(
         self,
         scan_result: ScanResult,
@@ -514,20 +1020,31 @@ class SwapClient(BaseWeb3Client):
         max_gas_price: float,
         max_gas_limit: int,
         gas_delta: float,
-        is_buy: bool = True
+        is_buy: bool = True,
+        nonce: int | None = None,
+        override_allowance: bool = False
     ):
         token_in = self.ETH_ADDRESS if is_buy else scan_result.token_meta.address
         token_out = scan_result.token_meta.address if is_buy else self.ETH_ADDRESS
         min_amount_out = self._calculate_min_amount_out(amount_out, slippage)
 
         route = await self.build_route(scan_result, amount_in, is_buy)
-        
-        nonce, (max_priority_fee, max_fee) = await asyncio.gather(
-            self.w3.eth.get_transaction_count(
-                AsyncWeb3.to_checksum_address(wallet_address)
-            ),
-            self.get_gas_fees()
-        )
+
+        # swap sent right after a pending approve: nonce is known and gas is estimated
+        # against the allowance the approve will set
+        state_override = await self.get_allowance_override(token_in, wallet_address) \
+                        if override_allowance and not is_buy else \
+                        None
+
+        if nonce is None:
+            nonce, (max_priority_fee, max_fee) = await asyncio.gather(
+                self.w3.eth.get_transaction_count(
+                    AsyncWeb3.to_checksum_address(wallet_address)
+                ),
+                self.get_gas_fees()
+            )
+        else:
+            max_priority_fee, max_fee = await self.get_gas_fees()
 
         contract = self._get_contract()
 
@@ -551,13 +1068,24 @@ class SwapClient(BaseWeb3Client):
         if is_buy:
             tx_params["value"] = int(amount_in)
 
-        estimate_gas = await func.estimate_gas(tx_params)
+        simulated_gas = self._recent_gas(
+            self._simulation_key(scan_result, wallet_address, amount_in, is_buy)
+        )
+
+        if simulated_gas:
+            estimate_gas = simulated_gas
+            gas_multiplier = self.GAS_MARGIN[scan_result.route_type]
+        else:
+            estimate_gas = await func.estimate_gas(tx_params, state_override=state_override)
+            gas_multiplier = 1.2
+
         tx_params = self._build_tx_params(
             tx_params, 
             estimate_gas,
             max_gas_price,
             max_gas_limit,
-            gas_delta
+            gas_delta,
+            gas_multiplier
         )
 
         tx = await func.build_transaction(tx_params)
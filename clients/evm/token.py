@@ -1,19 +1,58 @@
+import asyncio
 from eth_abi.abi import decode as abi_decode
 from web3 import AsyncWeb3
+from web3.exceptions import ContractLogicError, Web3RPCError
 from sqlalchemy.ext.asyncio import AsyncSession
 from clients.evm.base import BaseWeb3Client
 from clients.evm.dto import TokenMeta
+from config import settings
+from db import Token
 from db.repositories.chain import ChainRepository
 from db.repositories.token import TokenRepository
 
 
 class TokenService(BaseWeb3Client):
-    async def _fetch_token_meta(self, token_address: str) -> TokenMeta | None:
+    @staticmethod
+    def meta_from_model(token: Token) -> TokenMeta:
+        return TokenMeta(
+            address=token.address,
+            name=token.name,
+            ticker=token.ticker,
+            decimals=token.decimals,
+            supply=token.total_supply * (10 ** token.decimals)
+        )
+
+    @staticmethod
+    def is_storable(token_meta: TokenMeta) -> bool:
+        # mirrors the tokens table check constraint
+        return 0 < token_meta.decimals <= 18
+
+    @staticmethod
+    def model_values(chain_pk: int, token_meta: TokenMeta) -> dict:
+        return {
+            "chain_id": chain_pk,
+            "address": token_meta.address,
+            "name": token_meta.name[:100],
+            "ticker": token_meta.ticker[:20],
+            "decimals": token_meta.decimals,
+            "total_supply": token_meta.supply // (10 ** token_meta.decimals)
+        }
+
+    @staticmethod
+    def _decode_text(data: bytes) -> str:
+        try:
+            return abi_decode(["string"], data)[0]
+        except Exception:
+            # pre-standard tokens (MKR, SAI) return bytes32
+            if len(data) != 32:
+                raise
+            return data.rstrip(b"\x00").decode("utf-8", errors="ignore")
+
+    def _meta_calls(self, token_address: str) -> list[tuple]:
         token = AsyncWeb3.to_checksum_address(token_address)
         contract = self._get_erc20_contract(token)
-        multicall = self._get_multicall_contract()
 
-        calls = [
+        return [
             self._create_call(
                 token, contract.functions.name()._encode_transaction_data()
             ),
@@ -28,28 +67,88 @@ class TokenService(BaseWeb3Client):
             ),
         ]
 
-        results = await multicall.functions.aggregate3(calls).call()
-
-        if all(success and data for success, data in results):
-            name, name_bytes = results[0]
-            symbol, symbol_bytes = results[1]
-            decimals, decimals_bytes = results[2]
-            supply, supply_bytes = results[3]
-
-            name = abi_decode(["string"], name_bytes)[0]
-            symbol = abi_decode(["string"], symbol_bytes)[0]
-            decimals = abi_decode(["uint8"], decimals_bytes)[0]
-            supply = abi_decode(["uint256"], supply_bytes)[0]
+    def _decode_meta(self, token_address: str, results: list[tuple]) -> TokenMeta | None:
+        if not all(success and data for success, data in results):
+            return None
 
+        try:
             return TokenMeta(
                 address=token_address,
-                name=name, 
-                ticker=symbol, 
-                decimals=decimals, 
-                supply=supply
+                name=self._decode_text(results[0][1]),
+                ticker=self._decode_text(results[1][1]),
+                decimals=abi_decode(["uint8"], results[2][1])[0],
+                supply=abi_decode(["uint256"], results[3][1])[0]
             )
-        return None
-    
+        except Exception:
+            return None
+
+    async def fetch_token_meta(self, token_address: str) -> TokenMeta | None:
+        multicall = self._get_multicall_contract()
+
+        results = await multicall.functions.aggregate3(self._meta_calls(token_address)).call()
+
+        return self._decode_meta(token_address, results)
+
+    @staticmethod
+    def _is_call_failure(error: Exception) -> bool:
+        # the batch reverted or ran out of gas, a transport error or an rpc
+        # outage would only repeat on the halves
+        if isinstance(error, ContractLogicError):
+            return True
+
+        message = str(error).lower()
+        return isinstance(error, Web3RPCError) and any(
+            reason in message for reason in ("revert", "out of gas", "gas required exceeds")
+        )
+
+    async def _fetch_tokens_meta_chunk(self, token_addresses: list[str]) -> dict[str, TokenMeta]:
+        multicall = self._get_multicall_contract()
+        calls = [
+            call
+            for token_address in token_addresses
+            for call in self._meta_calls(token_address)
+        ]
+
+        try:
+            results = await multicall.functions.aggregate3(calls).call()
+        except Exception as e:
+            if not self._is_call_failure(e):
+                raise
+            if len(token_addresses) == 1:
+                return {}
+
+            # a single broken token can still blow the call gas, split until
+            # it is isolated
+            middle = len(token_addresses) // 2
+            halves = await asyncio.gather(
+                self._fetch_tokens_meta_chunk(token_addresses[:middle]),
+                self._fetch_tokens_meta_chunk(token_addresses[middle:])
+            )
+            return {**halves[0], **halves[1]}
+
+        token_metas = {}
+        for i, token_address in enumerate(token_addresses):
+            token_meta = self._decode_meta(token_address, results[i * 4:i * 4 + 4])
+            if token_meta is not None:
+                token_metas[token_address] = token_meta
+
+        return token_metas
+
+    async def fetch_tokens_meta(self, token_addresses: list[str]) -> dict[str, TokenMeta]:
+        token_addresses = list(dict.fromkeys(token_addresses))
+        chunk_size = int(settings.get("TOKEN_META_BATCH_SIZE", 150))
+
+        chunks = await asyncio.gather(*[
+            self._fetch_tokens_meta_chunk(token_addresses[i:i + chunk_size])
+            for i in range(0, len(token_addresses), chunk_size)
+        ])
+
+        return {
+            token_address: token_meta
+            for chunk in chunks
+            for token_address, token_meta in chunk.items()
+        }
+
     async def get_token_meta(
         self, 
         session: AsyncSession, 
@@ -60,15 +159,9 @@ class TokenService(BaseWeb3Client):
         token = await token_repo.get_by_address(token_address, chain_id)
 
         if token:
-            return TokenMeta(
-                address=token.address,
-                name=token.name,
-                ticker=token.ticker,
-                decimals=token.decimals,
-                supply=token.total_supply * (10 ** token.decimals)
-            )
+            return self.meta_from_model(token)
         
-        token_meta = await self._fetch_token_meta(token_address)
+        token_meta = await self.fetch_token_meta(token_address)
 
         if token_meta is not None:
             chain_repo = ChainRepository(session)
@@ -92,6 +185,36 @@ class TokenService(BaseWeb3Client):
         
         return None
     
+    async def get_tokens_meta(
+        self,
+        session: AsyncSession,
+        token_addresses: list[str],
+        chain_id: int,
+        refresh: bool = False
+    ) -> dict[str, TokenMeta]:
+        # refresh reads every token from chain, supplies move with mints and burns
+        token_repo = TokenRepository(session)
+        tokens = [] if refresh else await token_repo.get_by_addresses(token_addresses, chain_id)
+
+        token_metas = {token.address: self.meta_from_model(token) for token in tokens}
+
+        missing = [a for a in token_addresses if a not in token_metas]
+        if not missing:
+            return token_metas
+
+        fetched = await self.fetch_tokens_meta(missing)
+
+        chain = await ChainRepository(session).get_by_chain_id(chain_id)
+        if chain and fetched:
+            await token_repo.upsert_many([
+                self.model_values(chain.id, token_meta)
+                for token_meta in fetched.values()
+                if self.is_storable(token_meta)
+            ])
+            await session.commit()
+
+        return {**token_metas, **fetched}
+
     async def get_balance(self, token_address: str, wallet_address: str) -> int:
         token = AsyncWeb3.to_checksum_address(token_address)
         wallet = AsyncWeb3.to_checksum_address(wallet_address)
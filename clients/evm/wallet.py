@@ -5,11 +5,14 @@ from eth_abi.abi import decode as abi_decode
 from eth_typing import HexStr
 from web3 import AsyncWeb3
 from clients.evm.base import BaseWeb3Client
+from clients.evm.dto import AccountState
 
 
 class WalletClient(BaseWeb3Client):
-    def __init__(self, chain_config, private_key: str | None = None):
+    def __init__(self, chain_config, private_key: str | None = None, w3: AsyncWeb3 | None = None):
         super().__init__(chain_config)
+        # signing on the connection of another client, used without "async with"
+        self._w3 = w3
         self._account = None
         if private_key:
             self._account = Account.from_key(private_key)
@@ -27,6 +30,21 @@ class WalletClient(BaseWeb3Client):
 
         return Decimal(balance_wei) / Decimal(10**18)
 
+    async def get_account_state(self, address: str) -> AccountState:
+        account = AsyncWeb3.to_checksum_address(address)
+
+        # code and balance go out in one JSON-RPC batch request
+        async with self.w3.batch_requests() as batch:
+            batch.add(self.w3.eth.get_code(account))
+            batch.add(self.w3.eth.get_balance(account))
+            code, balance = await batch.async_execute()
+
+        return AccountState(
+            chain_id=self.chain_config.chain_id,
+            has_code=len(code) > 0,
+            native_balance=Decimal(balance) / Decimal(10**18)
+        )
+
     async def get_native_balances(self, addresses: list[str]) -> dict[str, Decimal]:
         if not addresses:
             return {}
@@ -172,3 +190,80 @@ class WalletClient(BaseWeb3Client):
     async def wait_transaction(self, tx_hash: HexStr):
         receipt = await self.wait_for_transaction(tx_hash, timeout=30)
         return receipt
+
+    def balance_calls(self, token_address: str, addresses: list[str]) -> list[tuple]:
+        token = AsyncWeb3.to_checksum_address(token_address)
+        contract = self._get_erc20_contract(token)
+        multicall = self._get_multicall_contract()
+
+        calls = []
+        for addr in addresses:
+            wallet = AsyncWeb3.to_checksum_address(addr)
+            calls.append(self._create_call(
+                multicall.address,
+                multicall.functions.getEthBalance(wallet)._encode_transaction_data()
+            ))
+            calls.append(self._create_call(
+                token,
+                contract.functions.balanceOf(wallet)._encode_transaction_data()
+            ))
+
+        return calls
+
+    @staticmethod
+    def parse_balances(
+        results: list[tuple[bool, bytes]],
+        addresses: list[str],
+        decimals: int
+    ) -> dict[str, tuple[Decimal, Decimal]]:
+        def decode(success: bool, data: bytes, divisor: Decimal) -> Decimal:
+            if not (success and data):
+                return Decimal(0)
+            return Decimal(int(abi_decode(["uint256"], data)[0])) / divisor
+
+        balances = {}
+        for i, addr in enumerate(addresses):
+            balances[addr] = (
+                decode(*results[i * 2], Decimal(10**18)),
+                decode(*results[i * 2 + 1], Decimal(10**decimals))
+            )
+
+        return balances
+
+    async def get_balances(
+        self,
+        token_address: str,
+        addresses: list[str],
+        decimals: int,
+        block_identifier: int | str = "latest"
+    ) -> dict[str, tuple[Decimal, Decimal]]:
+        if not addresses:
+            return {}
+
+        # native and token balances of every wallet in one aggregate3
+        multicall = self._get_multicall_contract()
+        results = await multicall.functions.aggregate3(
+            self.balance_calls(token_address, addresses)
+        ).call(block_identifier=block_identifier)
+
+        return self.parse_balances(results, addresses, decimals)
+
+    async def get_balances_with_block(
+        self,
+        token_address: str,
+        addresses: list[str],
+        decimals: int
+    ) -> tuple[int, dict[str, tuple[Decimal, Decimal]]]:
+        # the block the balances were read at comes back in the same aggregate3
+        multicall = self._get_multicall_contract()
+        block_call = self._create_call(
+            multicall.address,
+            multicall.functions.getBlockNumber()._encode_transaction_data()
+        )
+
+        results = await multicall.functions.aggregate3(
+            [block_call] + self.balance_calls(token_address, addresses)
+        ).call()
+
+        block_number = abi_decode(["uint256"], results[0][1])[0]
+        return block_number, self.parse_balances(results[1:], addresses, decimals)
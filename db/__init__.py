@@ -4,3 +4,8 @@ from .chain import Chain
 from .user_chain import UserChainSettings
 from .wallet import Wallet
 from .token import Token
+from .watchlist import WatchlistItem
+from .price_alert import PriceAlert
+from .limit_order import LimitOrder
+from .twap_order import TwapOrder
+from .position import Position
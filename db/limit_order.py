@@ -0,0 +1,72 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Boolean,
+    Numeric,
+    Text,
+    DateTime,
+    ForeignKey,
+    Index,
+    CheckConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+
+from .base import Base
+from .mixins import TimestampMixin
+
+
+class LimitOrder(Base, TimestampMixin):
+    __tablename__ = "limit_orders"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    wallet_id = Column(
+        Integer,
+        ForeignKey("wallets.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    token_id = Column(
+        Integer,
+        ForeignKey("tokens.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    route = Column(JSONB, nullable=False) # pools picked by the last full scan, see LiquidityScanner.route_state
+    is_buy = Column(Boolean, nullable=False)
+    amount = Column(Numeric(36, 18), nullable=False) # eth to spend on a buy, tokens to sell on a sell
+    limit_price = Column(Numeric(36, 18), nullable=False) # usd, buys fill at or below it, sells at or above
+    base_price = Column(Numeric(36, 18), nullable=False) # usd price when the order was placed
+
+    status = Column(String(16), default="open", nullable=False) # see enums.trade.OrderStatus
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_price = Column(Numeric(36, 18), nullable=True)
+    tx_hash = Column(String(66), nullable=True)
+    error = Column(Text, nullable=True)
+    defers = Column(Integer, default=0, nullable=False) # fills retried after a passing failure
+
+    user = relationship("User", back_populates="limit_orders")
+    wallet = relationship("Wallet", back_populates="limit_orders")
+    token = relationship("Token", back_populates="limit_orders")
+
+    __table_args__ = (
+        # tokens are per chain, so token_id also keys the chain
+        Index(
+            "idx_limit_order_open", "token_id", "is_buy", "limit_price",
+            postgresql_where=status == "open"
+        ),
+        CheckConstraint("amount > 0", name="check_limit_order_amount"),
+        CheckConstraint("limit_price > 0", name="check_limit_order_price"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<LimitOrder(id={self.id}, user_id={self.user_id}, token_id={self.token_id}, "
+            f"is_buy={self.is_buy}, amount={self.amount}, limit_price={self.limit_price}, status={self.status})>"
+        )
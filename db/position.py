@@ -0,0 +1,78 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Numeric,
+    Text,
+    DateTime,
+    ForeignKey,
+    Index,
+    CheckConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+
+from .base import Base
+from .mixins import TimestampMixin
+
+
+class Position(Base, TimestampMixin):
+    __tablename__ = "positions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    wallet_id = Column(
+        Integer,
+        ForeignKey("wallets.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    token_id = Column(
+        Integer,
+        ForeignKey("tokens.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    route = Column(JSONB, nullable=False) # pools picked by the last full scan, see LiquidityScanner.route_state
+    amount = Column(Numeric(36, 18), nullable=False) # tokens received by the buys
+    cost = Column(Numeric(36, 18), nullable=False) # eth spent by the buys
+    entry_price = Column(Numeric(36, 18), nullable=False) # usd per token, averaged over the buys, from their transfer logs
+    buy_tx_hash = Column(String(66), nullable=False) # the last buy
+    stop_loss = Column(Numeric(36, 18), nullable=True) # usd, sells at or below it
+    take_profit = Column(Numeric(36, 18), nullable=True) # usd, sells at or above it
+
+    status = Column(String(16), default="open", nullable=False) # see enums.trade.OrderStatus
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_price = Column(Numeric(36, 18), nullable=True)
+    sell_tx_hash = Column(String(66), nullable=True)
+    error = Column(Text, nullable=True)
+    defers = Column(Integer, default=0, nullable=False) # sells retried after a passing failure
+
+    user = relationship("User", back_populates="positions")
+    wallet = relationship("Wallet", back_populates="positions")
+    token = relationship("Token", back_populates="positions")
+
+    __table_args__ = (
+        # only positions with a stop loss or a take profit are watched
+        Index(
+            "idx_position_armed", "token_id",
+            postgresql_where=(status == "open") & (stop_loss.isnot(None) | take_profit.isnot(None))
+        ),
+        CheckConstraint("amount > 0", name="check_position_amount"),
+        CheckConstraint("entry_price > 0", name="check_position_entry_price"),
+        CheckConstraint(
+            "stop_loss IS NULL OR take_profit IS NULL OR stop_loss < take_profit",
+            name="check_position_triggers"
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Position(id={self.id}, user_id={self.user_id}, token_id={self.token_id}, "
+            f"amount={self.amount}, entry_price={self.entry_price}, stop_loss={self.stop_loss}, "
+            f"take_profit={self.take_profit}, status={self.status})>"
+        )
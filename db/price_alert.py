@@ -0,0 +1,57 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    Numeric,
+    DateTime,
+    ForeignKey,
+    Index,
+    CheckConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+
+from .base import Base
+from .mixins import TimestampMixin
+
+
+class PriceAlert(Base, TimestampMixin):
+    __tablename__ = "price_alerts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    token_id = Column(
+        Integer,
+        ForeignKey("tokens.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    route = Column(JSONB, nullable=False) # pools picked by the last full scan, see LiquidityScanner.route_state
+    base_price = Column(Numeric(36, 18), nullable=False) # usd price when the alert was set
+    upper_price = Column(Numeric(36, 18), nullable=True) # fires when the usd price rises to it
+    lower_price = Column(Numeric(36, 18), nullable=True) # fires when the usd price falls to it
+
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_price = Column(Numeric(36, 18), nullable=True)
+
+    user = relationship("User", back_populates="price_alerts")
+    token = relationship("Token", back_populates="price_alerts")
+
+    __table_args__ = (
+        # the engine only loads alerts that have not fired
+        Index("idx_price_alert_active", "token_id", postgresql_where=triggered_at.is_(None)),
+        CheckConstraint(
+            "upper_price IS NOT NULL OR lower_price IS NOT NULL", name="check_alert_threshold"
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<PriceAlert(id={self.id}, user_id={self.user_id}, token_id={self.token_id}, "
+            f"upper={self.upper_price}, lower={self.lower_price}, triggered_at={self.triggered_at})>"
+        )
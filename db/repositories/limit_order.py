@@ -0,0 +1,142 @@
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import Chain, LimitOrder, Token, User, UserChainSettings, Wallet
+from db.repositories.base import BaseRepository
+from enums.trade import OrderStatus
+
+
+class LimitOrderRepository(BaseRepository[LimitOrder]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, LimitOrder)
+
+    async def create_order(
+        self,
+        user_id: int,
+        wallet_id: int,
+        token_id: int,
+        route: dict[str, Any],
+        is_buy: bool,
+        amount: Decimal,
+        limit_price: Decimal,
+        base_price: Decimal
+    ) -> LimitOrder:
+        order = LimitOrder(
+            user_id=user_id,
+            wallet_id=wallet_id,
+            token_id=token_id,
+            route=route,
+            is_buy=is_buy,
+            amount=amount,
+            limit_price=limit_price,
+            base_price=base_price,
+            status=OrderStatus.OPEN.value
+        )
+
+        self.session.add(order)
+        await self.session.flush()
+
+        return order
+
+    async def cancel(self, user_id: int, order_id: int) -> bool:
+        # orders already claimed by the engine cannot be cancelled
+        query = update(LimitOrder).where(
+            LimitOrder.id == order_id,
+            LimitOrder.user_id == user_id,
+            LimitOrder.status == OrderStatus.OPEN.value
+        ).values(status=OrderStatus.CANCELLED.value)
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def count_open_by_user(self, user_id: int) -> int:
+        query = select(func.count()).where(
+            LimitOrder.user_id == user_id,
+            LimitOrder.status == OrderStatus.OPEN.value
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def get_open_by_user(self, user_id: int) -> Sequence[tuple[LimitOrder, Token, int, str]]:
+        query = (
+            select(LimitOrder, Token, Chain.chain_id, Wallet.name)
+            .join(Token, Token.id == LimitOrder.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(Wallet, Wallet.id == LimitOrder.wallet_id)
+            .where(LimitOrder.user_id == user_id, LimitOrder.status == OrderStatus.OPEN.value)
+            .order_by(LimitOrder.id)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_open(self) -> Sequence[tuple[LimitOrder, str, int, int, Wallet, UserChainSettings]]:
+        # (order, token address, evm chain id, telegram id, wallet, chain settings),
+        # everything a fill needs is loaded up front
+        query = (
+            select(LimitOrder, Token.address, Chain.chain_id, User.user_id, Wallet, UserChainSettings)
+            .join(Token, Token.id == LimitOrder.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(User, User.id == LimitOrder.user_id)
+            .join(Wallet, Wallet.id == LimitOrder.wallet_id)
+            .join(
+                UserChainSettings,
+                (UserChainSettings.user_id == LimitOrder.user_id) & (UserChainSettings.chain_id == Token.chain_id)
+            )
+            .where(
+                LimitOrder.status == OrderStatus.OPEN.value,
+                Chain.is_active.is_(True),
+                User.is_active.is_(True),
+                User.is_blocked.is_(False),
+                User.deleted_at.is_(None),
+                Wallet.is_active.is_(True),
+                Wallet.deleted_at.is_(None)
+            )
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def claim(self, prices: dict[int, Decimal]) -> set[int]:
+        # only orders that were still open come back, an order is sent once
+        # even if a reload or a restart sees the same crossing
+        if not prices:
+            return set()
+
+        query = (
+            update(LimitOrder)
+            .where(LimitOrder.id.in_(prices), LimitOrder.status == OrderStatus.OPEN.value)
+            .values(
+                status=OrderStatus.TRIGGERED.value,
+                triggered_at=func.now(),
+                triggered_price=case(prices, value=LimitOrder.id)
+            )
+            .returning(LimitOrder.id)
+        )
+        result = await self.session.execute(query)
+        return set(result.scalars().all())
+
+    async def set_result(
+        self,
+        order_id: int,
+        status: OrderStatus,
+        tx_hash: str | None = None,
+        error: str | None = None
+    ) -> None:
+        query = update(LimitOrder).where(LimitOrder.id == order_id).values(
+            status=status.value,
+            tx_hash=tx_hash,
+            error=error
+        )
+        await self.session.execute(query)
+
+    async def release(self, order_id: int, defers: int, error: str) -> None:
+        # a fill that failed for a passing reason goes back to the book
+        query = update(LimitOrder).where(
+            LimitOrder.id == order_id,
+            LimitOrder.status == OrderStatus.TRIGGERED.value
+        ).values(
+            status=OrderStatus.OPEN.value,
+            defers=defers,
+            error=error
+        )
+        await self.session.execute(query)
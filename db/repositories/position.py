@@ -0,0 +1,178 @@
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import Chain, Position, Token, User, UserChainSettings, Wallet
+from db.repositories.base import BaseRepository
+from enums.trade import OrderStatus
+
+
+class PositionRepository(BaseRepository[Position]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Position)
+
+    async def add_buy(
+        self,
+        user_id: int,
+        wallet_id: int,
+        token_id: int,
+        route: dict[str, Any],
+        amount: Decimal,
+        cost: Decimal,
+        price: Decimal,
+        tx_hash: str
+    ) -> Position:
+        # another buy of the token on the same wallet adds to the open
+        # position at the average price, the stops stay where they were
+        query = select(Position).where(
+            Position.wallet_id == wallet_id,
+            Position.token_id == token_id,
+            Position.status == OrderStatus.OPEN.value
+        ).with_for_update()
+        position = (await self.session.execute(query)).scalar_one_or_none()
+
+        if position is None:
+            position = Position(
+                user_id=user_id,
+                wallet_id=wallet_id,
+                token_id=token_id,
+                route=route,
+                amount=amount,
+                cost=cost,
+                entry_price=price,
+                buy_tx_hash=tx_hash,
+                status=OrderStatus.OPEN.value
+            )
+            self.session.add(position)
+        else:
+            position.entry_price = (position.entry_price * position.amount + price * amount) / (position.amount + amount)
+            position.amount += amount
+            position.cost += cost
+            position.route = route
+            position.buy_tx_hash = tx_hash
+
+        await self.session.flush()
+
+        return position
+
+    async def set_triggers(
+        self,
+        user_id: int,
+        position_id: int,
+        stop_loss: Decimal | None,
+        take_profit: Decimal | None
+    ) -> bool:
+        query = update(Position).where(
+            Position.id == position_id,
+            Position.user_id == user_id,
+            Position.status == OrderStatus.OPEN.value
+        ).values(stop_loss=stop_loss, take_profit=take_profit)
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def get_open(self, user_id: int, position_id: int) -> tuple[Position, Token] | None:
+        query = (
+            select(Position, Token)
+            .join(Token, Token.id == Position.token_id)
+            .where(
+                Position.id == position_id,
+                Position.user_id == user_id,
+                Position.status == OrderStatus.OPEN.value
+            )
+        )
+        result = await self.session.execute(query)
+        return result.first()
+
+    async def close(self, user_id: int, position_id: int) -> bool:
+        # stops watching the position, positions already claimed by the engine stay
+        query = update(Position).where(
+            Position.id == position_id,
+            Position.user_id == user_id,
+            Position.status == OrderStatus.OPEN.value
+        ).values(status=OrderStatus.CANCELLED.value)
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def get_open_by_user(self, user_id: int) -> Sequence[tuple[Position, Token, int, str]]:
+        query = (
+            select(Position, Token, Chain.chain_id, Wallet.name)
+            .join(Token, Token.id == Position.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(Wallet, Wallet.id == Position.wallet_id)
+            .where(Position.user_id == user_id, Position.status == OrderStatus.OPEN.value)
+            .order_by(Position.id)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_armed(self) -> Sequence[tuple[Position, str, int, int, Wallet, UserChainSettings]]:
+        # (position, token address, evm chain id, telegram id, wallet, chain settings)
+        # of open positions with a stop loss or a take profit
+        query = (
+            select(Position, Token.address, Chain.chain_id, User.user_id, Wallet, UserChainSettings)
+            .join(Token, Token.id == Position.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(User, User.id == Position.user_id)
+            .join(Wallet, Wallet.id == Position.wallet_id)
+            .join(
+                UserChainSettings,
+                (UserChainSettings.user_id == Position.user_id) & (UserChainSettings.chain_id == Token.chain_id)
+            )
+            .where(
+                Position.status == OrderStatus.OPEN.value,
+                or_(Position.stop_loss.isnot(None), Position.take_profit.isnot(None)),
+                Chain.is_active.is_(True),
+                User.is_active.is_(True),
+                User.is_blocked.is_(False),
+                User.deleted_at.is_(None),
+                Wallet.is_active.is_(True),
+                Wallet.deleted_at.is_(None)
+            )
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def claim(self, prices: dict[int, Decimal]) -> set[int]:
+        # same contract as LimitOrderRepository.claim, a position is sold once
+        if not prices:
+            return set()
+
+        query = (
+            update(Position)
+            .where(Position.id.in_(prices), Position.status == OrderStatus.OPEN.value)
+            .values(
+                status=OrderStatus.TRIGGERED.value,
+                triggered_at=func.now(),
+                triggered_price=case(prices, value=Position.id)
+            )
+            .returning(Position.id)
+        )
+        result = await self.session.execute(query)
+        return set(result.scalars().all())
+
+    async def set_result(
+        self,
+        position_id: int,
+        status: OrderStatus,
+        tx_hash: str | None = None,
+        error: str | None = None
+    ) -> None:
+        query = update(Position).where(Position.id == position_id).values(
+            status=status.value,
+            sell_tx_hash=tx_hash,
+            error=error
+        )
+        await self.session.execute(query)
+
+    async def release(self, position_id: int, defers: int, error: str) -> None:
+        # a sell that failed for a passing reason keeps the position open
+        query = update(Position).where(
+            Position.id == position_id,
+            Position.status == OrderStatus.TRIGGERED.value
+        ).values(
+            status=OrderStatus.OPEN.value,
+            defers=defers,
+            error=error
+        )
+        await self.session.execute(query)
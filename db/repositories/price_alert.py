@@ -0,0 +1,99 @@
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import Chain, PriceAlert, Token, User
+from db.repositories.base import BaseRepository
+
+
+class PriceAlertRepository(BaseRepository[PriceAlert]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, PriceAlert)
+
+    async def create_alert(
+        self,
+        user_id: int,
+        token_id: int,
+        route: dict[str, Any],
+        base_price: Decimal,
+        upper_price: Decimal | None,
+        lower_price: Decimal | None
+    ) -> PriceAlert:
+        alert = PriceAlert(
+            user_id=user_id,
+            token_id=token_id,
+            route=route,
+            base_price=base_price,
+            upper_price=upper_price,
+            lower_price=lower_price
+        )
+
+        self.session.add(alert)
+        await self.session.flush()
+
+        return alert
+
+    async def cancel(self, user_id: int, alert_id: int) -> bool:
+        query = delete(PriceAlert).where(
+            PriceAlert.id == alert_id,
+            PriceAlert.user_id == user_id,
+            PriceAlert.triggered_at.is_(None)
+        )
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def count_active_by_user(self, user_id: int) -> int:
+        query = select(func.count()).where(
+            PriceAlert.user_id == user_id,
+            PriceAlert.triggered_at.is_(None)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def get_active_by_user(self, user_id: int) -> Sequence[tuple[PriceAlert, Token, int]]:
+        query = (
+            select(PriceAlert, Token, Chain.chain_id)
+            .join(Token, Token.id == PriceAlert.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .where(PriceAlert.user_id == user_id, PriceAlert.triggered_at.is_(None))
+            .order_by(PriceAlert.id)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_active(self) -> Sequence[tuple[PriceAlert, str, int, int]]:
+        # (alert, token address, evm chain id, telegram id) of active users
+        query = (
+            select(PriceAlert, Token.address, Chain.chain_id, User.user_id)
+            .join(Token, Token.id == PriceAlert.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(User, User.id == PriceAlert.user_id)
+            .where(
+                PriceAlert.triggered_at.is_(None),
+                Chain.is_active.is_(True),
+                User.is_active.is_(True),
+                User.is_blocked.is_(False),
+                User.deleted_at.is_(None)
+            )
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def mark_triggered(self, prices: dict[int, Decimal]) -> set[int]:
+        # only alerts that were still active come back, so an alert fires
+        # once even if several processes or restarts see the same crossing
+        if not prices:
+            return set()
+
+        query = (
+            update(PriceAlert)
+            .where(PriceAlert.id.in_(prices), PriceAlert.triggered_at.is_(None))
+            .values(
+                triggered_at=func.now(),
+                triggered_price=case(prices, value=PriceAlert.id)
+            )
+            .returning(PriceAlert.id)
+        )
+        result = await self.session.execute(query)
+        return set(result.scalars().all())
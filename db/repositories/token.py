@@ -1,5 +1,7 @@
 from collections.abc import Sequence
-from sqlalchemy import select
+from typing import Any
+from sqlalchemy import and_, desc, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from db import Token
 from db.chain import Chain
@@ -33,6 +35,33 @@ class TokenRepository(BaseRepository[Token]):
 
         return token
 
+    async def create_many(self, tokens: list[dict[str, Any]]) -> None:
+        if not tokens:
+            return
+
+        query = (
+            insert(Token)
+            .values(tokens)
+            .on_conflict_do_nothing(index_elements=["chain_id", "address"])
+        )
+        await self.session.execute(query)
+
+    async def upsert_many(self, tokens: list[dict[str, Any]]) -> None:
+        if not tokens:
+            return
+
+        query = insert(Token).values(tokens)
+        query = query.on_conflict_do_update(
+            index_elements=["chain_id", "address"],
+            set_={
+                "name": query.excluded.name,
+                "ticker": query.excluded.ticker,
+                "decimals": query.excluded.decimals,
+                "total_supply": query.excluded.total_supply,
+            }
+        )
+        await self.session.execute(query)
+
     async def get_all(
         self,
         chain_id: int | None = None,
@@ -57,6 +86,66 @@ class TokenRepository(BaseRepository[Token]):
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
     
+    async def get_by_addresses(self, addresses: list[str], chain_id: int) -> Sequence[Token]:
+        query = (
+            select(Token)
+            .join(Chain, Token.chain_id == Chain.id)
+            .where(
+                Token.address.in_(addresses),
+                Chain.chain_id == chain_id
+            )
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_by_address_in_chains(
+        self,
+        address: str,
+        chain_ids: list[int]
+    ) -> Sequence[tuple[int, int, Token | None]]:
+        # chains without the token still come back, their ids are needed to
+        # insert it later
+        query = (
+            select(Chain.chain_id, Chain.id, Token)
+            .outerjoin(Token, and_(Token.chain_id == Chain.id, Token.address == address))
+            .where(Chain.chain_id.in_(chain_ids))
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def increment_views(self, address: str, chain_ids: list[int]) -> None:
+        if not chain_ids:
+            return
+
+        query = (
+            update(Token)
+            .where(
+                Token.address == address,
+                Token.chain_id.in_(select(Chain.id).where(Chain.chain_id.in_(chain_ids)))
+            )
+            .values(view_count=Token.view_count + 1)
+        )
+        await self.session.execute(query)
+
+    async def decay_views(self, divisor: int) -> None:
+        query = (
+            update(Token)
+            .where(Token.view_count > 0)
+            .values(view_count=Token.view_count // divisor)
+        )
+        await self.session.execute(query)
+
+    async def get_popular(self, chain_id: int, limit: int) -> Sequence[Token]:
+        query = (
+            select(Token)
+            .join(Chain, Token.chain_id == Chain.id)
+            .where(Chain.chain_id == chain_id, Token.view_count > 0)
+            .order_by(desc(Token.view_count))
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
     async def count(self) -> int:
         return await super().count()
 
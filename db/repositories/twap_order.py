@@ -0,0 +1,137 @@
+from collections.abc import Sequence
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import Chain, Token, TwapOrder, User, UserChainSettings, Wallet
+from db.repositories.base import BaseRepository
+from enums.trade import OrderStatus
+
+
+class TwapOrderRepository(BaseRepository[TwapOrder]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, TwapOrder)
+
+    async def create_order(
+        self,
+        user_id: int,
+        wallet_id: int,
+        token_id: int,
+        route: dict[str, Any],
+        is_buy: bool,
+        total_amount: Decimal,
+        slices: int,
+        interval: int
+    ) -> TwapOrder:
+        order = TwapOrder(
+            user_id=user_id,
+            wallet_id=wallet_id,
+            token_id=token_id,
+            route=route,
+            is_buy=is_buy,
+            total_amount=total_amount,
+            slices=slices,
+            interval=interval,
+            next_run_at=func.now(),
+            status=OrderStatus.OPEN.value
+        )
+
+        self.session.add(order)
+        await self.session.flush()
+
+        return order
+
+    async def cancel(self, user_id: int, order_id: int) -> bool:
+        query = update(TwapOrder).where(
+            TwapOrder.id == order_id,
+            TwapOrder.user_id == user_id,
+            TwapOrder.status == OrderStatus.OPEN.value
+        ).values(status=OrderStatus.CANCELLED.value)
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def count_open_by_user(self, user_id: int) -> int:
+        query = select(func.count()).where(
+            TwapOrder.user_id == user_id,
+            TwapOrder.status == OrderStatus.OPEN.value
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def get_open_by_user(self, user_id: int) -> Sequence[tuple[TwapOrder, Token, int, str]]:
+        query = (
+            select(TwapOrder, Token, Chain.chain_id, Wallet.name)
+            .join(Token, Token.id == TwapOrder.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(Wallet, Wallet.id == TwapOrder.wallet_id)
+            .where(TwapOrder.user_id == user_id, TwapOrder.status == OrderStatus.OPEN.value)
+            .order_by(TwapOrder.id)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def claim_due(
+        self,
+        limit: int,
+        lease: int
+    ) -> Sequence[tuple[TwapOrder, str, int, int, Wallet, UserChainSettings]]:
+        # (order, token address, evm chain id, telegram id, wallet, chain settings)
+        # of due slices. Rows locked by another tick are skipped and the claimed
+        # ones are pushed back by the lease, so a slice runs on one worker even
+        # with several ticks in flight. A worker that dies mid-slice frees the
+        # order when the lease ends.
+        base = (
+            select(TwapOrder.id)
+            .join(Token, Token.id == TwapOrder.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(User, User.id == TwapOrder.user_id)
+            .join(Wallet, Wallet.id == TwapOrder.wallet_id)
+            .where(
+                TwapOrder.status == OrderStatus.OPEN.value,
+                TwapOrder.next_run_at <= func.now(),
+                Chain.is_active.is_(True),
+                User.is_active.is_(True),
+                User.is_blocked.is_(False),
+                User.deleted_at.is_(None),
+                Wallet.is_active.is_(True),
+                Wallet.deleted_at.is_(None)
+            )
+            .order_by(TwapOrder.next_run_at)
+            .limit(limit)
+            .with_for_update(of=TwapOrder, skip_locked=True)
+        )
+
+        claim = (
+            update(TwapOrder)
+            .where(TwapOrder.id.in_(base.scalar_subquery()))
+            .values(next_run_at=func.now() + timedelta(seconds=lease))
+            .returning(TwapOrder.id)
+        )
+        ids = (await self.session.execute(claim)).scalars().all()
+        if not ids:
+            return []
+
+        query = (
+            select(TwapOrder, Token.address, Chain.chain_id, User.user_id, Wallet, UserChainSettings)
+            .join(Token, Token.id == TwapOrder.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(User, User.id == TwapOrder.user_id)
+            .join(Wallet, Wallet.id == TwapOrder.wallet_id)
+            .join(
+                UserChainSettings,
+                (UserChainSettings.user_id == TwapOrder.user_id) & (UserChainSettings.chain_id == Token.chain_id)
+            )
+            .where(TwapOrder.id.in_(ids))
+            .order_by(TwapOrder.id)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def update_progress(self, order_id: int, values: dict[str, Any], delay: float | None = None) -> None:
+        # progress is kept even if the order was cancelled while a slice was in flight
+        if delay is not None:
+            values = {**values, "next_run_at": func.now() + timedelta(seconds=delay)}
+
+        query = update(TwapOrder).where(TwapOrder.id == order_id).values(**values)
+        await self.session.execute(query)
@@ -0,0 +1,74 @@
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import Chain, Token, User, WatchlistItem
+from db.repositories.base import BaseRepository
+
+
+class WatchlistRepository(BaseRepository[WatchlistItem]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, WatchlistItem)
+
+    async def add(self, user_id: int, token_id: int, route: dict[str, Any]) -> None:
+        # watching a token again only refreshes its route
+        query = insert(WatchlistItem).values(user_id=user_id, token_id=token_id, route=route)
+        query = query.on_conflict_do_update(
+            constraint="uq_watchlist_user_token",
+            set_={"route": query.excluded.route}
+        )
+        await self.session.execute(query)
+
+    async def remove(self, user_id: int, item_id: int) -> bool:
+        query = delete(WatchlistItem).where(
+            WatchlistItem.id == item_id,
+            WatchlistItem.user_id == user_id
+        )
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def count_by_user(self, user_id: int) -> int:
+        query = select(func.count()).where(WatchlistItem.user_id == user_id)
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def get_by_user(self, user_id: int) -> Sequence[tuple[WatchlistItem, Token, int]]:
+        query = (
+            select(WatchlistItem, Token, Chain.chain_id)
+            .join(Token, Token.id == WatchlistItem.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .where(WatchlistItem.user_id == user_id)
+            .order_by(WatchlistItem.id)
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_watched(self) -> Sequence[tuple[WatchlistItem, str, int, int]]:
+        # (item, token address, evm chain id, telegram id) of active users
+        query = (
+            select(WatchlistItem, Token.address, Chain.chain_id, User.user_id)
+            .join(Token, Token.id == WatchlistItem.token_id)
+            .join(Chain, Chain.id == Token.chain_id)
+            .join(User, User.id == WatchlistItem.user_id)
+            .where(
+                Chain.is_active.is_(True),
+                User.is_active.is_(True),
+                User.is_blocked.is_(False),
+                User.deleted_at.is_(None)
+            )
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def set_last_prices(self, prices: dict[int, Decimal]) -> None:
+        if not prices:
+            return
+
+        query = (
+            update(WatchlistItem)
+            .where(WatchlistItem.id.in_(prices))
+            .values(last_price=case(prices, value=WatchlistItem.id))
+        )
+        await self.session.execute(query)
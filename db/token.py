@@ -34,6 +34,21 @@ class Token(Base, TimestampMixin):
     view_count = Column(Integer, default=0, nullable=False)
 
     chain = relationship("Chain", back_populates="tokens")
+    watchlist_items = relationship(
+        "WatchlistItem", back_populates="token", cascade="all, delete-orphan"
+    )
+    price_alerts = relationship(
+        "PriceAlert", back_populates="token", cascade="all, delete-orphan"
+    )
+    limit_orders = relationship(
+        "LimitOrder", back_populates="token", cascade="all, delete-orphan"
+    )
+    twap_orders = relationship(
+        "TwapOrder", back_populates="token", cascade="all, delete-orphan"
+    )
+    positions = relationship(
+        "Position", back_populates="token", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (
         Index("idx_token_chain_address", "chain_id", "address", unique=True),
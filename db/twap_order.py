@@ -0,0 +1,76 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Boolean,
+    Numeric,
+    Text,
+    DateTime,
+    ForeignKey,
+    Index,
+    CheckConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+
+from .base import Base
+from .mixins import TimestampMixin
+
+
+class TwapOrder(Base, TimestampMixin):
+    __tablename__ = "twap_orders"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    wallet_id = Column(
+        Integer,
+        ForeignKey("wallets.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    token_id = Column(
+        Integer,
+        ForeignKey("tokens.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    route = Column(JSONB, nullable=False) # pools picked by the last full scan, see LiquidityScanner.route_state
+    is_buy = Column(Boolean, nullable=False)
+    total_amount = Column(Numeric(36, 18), nullable=False) # eth to spend on a buy, tokens to sell on a sell
+    slices = Column(Integer, nullable=False)
+    interval = Column(Integer, nullable=False) # seconds between slices
+
+    slices_done = Column(Integer, default=0, nullable=False) # sent or skipped
+    slices_skipped = Column(Integer, default=0, nullable=False)
+    filled_amount = Column(Numeric(36, 18), default=0, nullable=False) # amount in of the mined slices
+    defers = Column(Integer, default=0, nullable=False) # retries of the current slice
+    next_run_at = Column(DateTime(timezone=True), nullable=False)
+
+    status = Column(String(16), default="open", nullable=False) # see enums.trade.OrderStatus
+    last_tx_hash = Column(String(66), nullable=True)
+    pending_tx_hash = Column(String(66), nullable=True) # signed slice whose receipt is not settled yet
+    pending_amount = Column(Numeric(36, 18), nullable=True) # amount in of the pending slice
+    error = Column(Text, nullable=True)
+
+    user = relationship("User", back_populates="twap_orders")
+    wallet = relationship("Wallet", back_populates="twap_orders")
+    token = relationship("Token", back_populates="twap_orders")
+
+    __table_args__ = (
+        # the scheduler tick only looks at due open orders
+        Index("idx_twap_order_due", "next_run_at", postgresql_where=status == "open"),
+        CheckConstraint("total_amount > 0", name="check_twap_amount"),
+        CheckConstraint("slices >= 2", name="check_twap_slices"),
+        CheckConstraint("interval > 0", name="check_twap_interval"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<TwapOrder(id={self.id}, user_id={self.user_id}, token_id={self.token_id}, "
+            f"is_buy={self.is_buy}, total_amount={self.total_amount}, "
+            f"slices={self.slices_done}/{self.slices}, status={self.status})>"
+        )
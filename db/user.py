@@ -57,6 +57,31 @@ class User(Base, TimestampMixin, SoftDeleteMixin):
         back_populates="user",
         cascade="all, delete-orphan"
     )
+    watchlist = relationship(
+        "WatchlistItem",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+    price_alerts = relationship(
+        "PriceAlert",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+    limit_orders = relationship(
+        "LimitOrder",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+    twap_orders = relationship(
+        "TwapOrder",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+    positions = relationship(
+        "Position",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
 
     __table_args__ = (
         Index('idx_user_active', 'is_active', 'deleted_at'),
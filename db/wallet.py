@@ -46,6 +46,15 @@ class Wallet(Base, TimestampMixin, SoftDeleteMixin):
 
     user = relationship("User", back_populates="wallets")
     chain = relationship("Chain", back_populates="wallets")
+    limit_orders = relationship(
+        "LimitOrder", back_populates="wallet", cascade="all, delete-orphan"
+    )
+    twap_orders = relationship(
+        "TwapOrder", back_populates="wallet", cascade="all, delete-orphan"
+    )
+    positions = relationship(
+        "Position", back_populates="wallet", cascade="all, delete-orphan"
+    )
 
     def __repr__(self) -> str:
         return (
@@ -0,0 +1,54 @@
+from decimal import Decimal
+from sqlalchemy import (
+    Column,
+    Integer,
+    Numeric,
+    ForeignKey,
+    UniqueConstraint,
+    CheckConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+
+from .base import Base
+from .mixins import TimestampMixin
+
+
+class WatchlistItem(Base, TimestampMixin):
+    __tablename__ = "watchlist"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    token_id = Column(
+        Integer,
+        ForeignKey("tokens.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    route = Column(JSONB, nullable=False) # pools picked by the last full scan, see LiquidityScanner.route_state
+    last_price = Column(Numeric(36, 18), nullable=True) # usd price of the last notification
+    notify_change = Column(
+        Numeric(5, 2),
+        default=Decimal("5.00"),
+        nullable=False,
+    ) # price move that triggers a notification (%)
+
+    user = relationship("User", back_populates="watchlist")
+    token = relationship("Token", back_populates="watchlist_items")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "token_id", name="uq_watchlist_user_token"),
+        CheckConstraint("notify_change >= 0.10 AND notify_change <= 1000", name="check_notify_change"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<WatchlistItem(id={self.id}, user_id={self.user_id}, "
+            f"token_id={self.token_id}, last_price={self.last_price})>"
+        )
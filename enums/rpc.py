@@ -0,0 +1,8 @@
+from enum import IntEnum
+
+class RpcClass(IntEnum):
+    # lower values are served first
+    TRADE = 0
+    SCAN = 1
+    WATCH = 2
+    PREWARM = 3
@@ -0,0 +1,17 @@
+from enum import Enum
+
+
+class TradeStatus(Enum):
+    SENT = "sent"
+    FAILED = "failed"
+    PRICE_IMPACT = "price_impact"
+    SLIPPAGE = "slippage"
+
+
+class OrderStatus(str, Enum):
+    OPEN = "open"
+    TRIGGERED = "triggered" # claimed by the engine, the swap is being sent
+    SENT = "sent"
+    FILLED = "filled"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
@@ -3,6 +3,11 @@ from aiogram import Router
 from filters.chat_type import ChatTypeFilter
 from . import start
 from . import address
+from . import watchlist
+from . import alerts
+from . import limit_orders
+from . import twap
+from . import positions
 
 
 def setup_routers() -> Router:
@@ -10,5 +15,10 @@ def setup_routers() -> Router:
     router.message.filter(ChatTypeFilter(["private"]))
     router.include_router(start.router)
     router.include_router(address.router)
+    router.include_router(watchlist.router)
+    router.include_router(alerts.router)
+    router.include_router(limit_orders.router)
+    router.include_router(twap.router)
+    router.include_router(positions.router)
 
     return router
@@ -2,25 +2,39 @@ from datetime import datetime
 from decimal import Decimal
 import logging
 import re
+import time
 
 from aiogram import Router, F
 from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram_dialog import DialogManager, StartMode
 from redis import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from chains import registery
+from chains.dto import ChainConfig
 from clients.evm.scanner import LiquidityScanner, ScanResult
+from clients.evm.dto import AccountState, RoundTripResult
+from clients.evm.scan_cache import SkippedStage
+from clients.evm.scheduler import rpc_scheduler
 from clients.evm.swap import SwapClient
 from clients.evm.wallet import WalletClient
+from config import settings
 from db.repositories.chain import ChainRepository, UserChainRepository
 from db.repositories.user import UserRepository
 from db.repositories.wallet import WalletRepository
 from dialogs.token_menu.handlers import format_number
 from enums.chain import ChainStatus
+from enums.rpc import RpcClass
+from enums.trade import TradeStatus
 from filters.address import AddressFilter
-from keyboards.token_info import token_info_kb
+from handlers.positions import record_position
+from keyboards.positions import position_kb
+from keyboards.token_info import token_info_kb, token_refresh_kb
+from services.honeypot import HoneypotService
+from services.scan_dispatcher import ScanDispatcher
+from services.trading import TradingService
 from services.wallet import WalletService
 from states.dialog_states import TokenSG
 from states.fsm_states import TokenInfo
@@ -52,9 +66,21 @@ async def check_address(
     
     scanner = LiquidityScanner(
         scan_chains,
-        session_factory
+        session_factory,
+        redis,
+        user.id
     )
 
+    # one code+balance batch per chain tells wallets from contracts before
+    # any metadata or pool lookups
+    accounts = await scanner.probe_accounts(address)
+
+    if scanner.is_eoa(scan_chains, accounts):
+        await message.answer(format_wallet_lookup(message.text, scan_chains, accounts))
+        return
+
+    scanner.drop_chains_without_code(accounts)
+
     wallets = await wallet_repo.get_all_with_chain(user.id)
 
     all_user_wallets = {}
@@ -72,42 +98,48 @@ async def check_address(
 
     price = await redis.get("eth:usd")
 
-    data = await scanner.scan_token(address, all_user_wallets, Decimal(price))
-    print(data)
-    if not data:
-        await message.answer(
-            "💳 <b>Wallet address</b>\n\n" +
-            f"<code>{message.text}</code>"
-        )
-        return
+    card = None
+    last_edit = 0.0
+    edit_interval = float(settings.get("CARD_EDIT_INTERVAL", 1.0))
 
-    best_chain = data.best_eth_token_pool.chain \
-                if data.route_type == "direct" else \
-                data.best_stable_token_pool.chain
+    # the card is sent with the first usable pool and edited as better pools
+    # and finally the balances arrive
+    async for data in ScanDispatcher.scan_token_stream(scanner, address, Decimal(price)):
+        if card is not None and not data.complete and time.monotonic() - last_edit < edit_interval:
+            continue
 
-    await state.set_state(TokenInfo.info)
-    await state.update_data(
-        {
-            "token_address": address,
-            "name": data.token_meta.name,
-            "ticker": data.token_meta.ticker,
-            "chain_id": best_chain.chain_id,
-            "_user_id": user.id,
-            "is_multi": False,
-            "is_buy": True
-        }
-    )
+        best_chain = data.display_chain
 
-    await token_info(message, state, redis, data, address)
+        if data.complete:
+            await scanner.load_wallet_balances(data, all_user_wallets)
+            await state.update_data(route=LiquidityScanner.route_state(data))
 
-async def get_token_analysis(
+        if card is None:
+            await state.set_state(TokenInfo.info)
+
+        await state.update_data(
+            {
+                "token_address": address,
+                "name": data.token_meta.name,
+                "ticker": data.token_meta.ticker,
+                "chain_id": best_chain.chain_id,
+                "_user_id": user.id,
+                "is_multi": False,
+                "is_buy": True
+            }
+        )
+
+        card = await token_info(message, state, redis, data, address, card)
+        last_edit = time.monotonic()
+
+    if card is None:
+        await message.answer(format_wallet_lookup(message.text, scan_chains, accounts))
+
+async def get_chain_wallets(
     session: AsyncSession,
-    session_factory: sessionmaker,
-    redis: Redis,
     user_id: int,
-    chain_id: int,
-    token_address: str
-) -> ScanResult:
+    chain_id: int
+) -> dict[str, list[dict]]:
     user_repo = UserRepository(session)
     chains_repo = ChainRepository(session)
     wallet_repo = WalletRepository(session)
@@ -117,8 +149,6 @@ async def get_token_analysis(
 
     wallets = await wallet_repo.get_all_with_chain(user.id, chain.id)
 
-    price = await redis.get("eth:usd")
-
     all_user_wallets = {}
     for wallet in wallets:
         if str(chain_id) not in all_user_wallets:
@@ -130,22 +160,101 @@ async def get_token_analysis(
             "address": wallet.address
         })
 
+    return all_user_wallets
+
+
+async def get_token_analysis(
+    session: AsyncSession,
+    session_factory: sessionmaker,
+    redis: Redis,
+    user_id: int,
+    chain_id: int,
+    token_address: str,
+    rpc_class: RpcClass = RpcClass.SCAN
+) -> ScanResult:
+    all_user_wallets = await get_chain_wallets(session, user_id, chain_id)
+
+    price = await redis.get("eth:usd")
+
     scanner = LiquidityScanner(
         [registery.get(chain_id)],
-        session_factory
+        session_factory,
+        redis,
+        user_id,
+        rpc_class
     )
 
-    data = await scanner.scan_token(token_address, all_user_wallets, Decimal(price))
+    data = await ScanDispatcher.scan_token(scanner, token_address, Decimal(price))
+
+    if data.display_chain:
+        await scanner.load_wallet_balances(data, all_user_wallets)
+
     return data
 
+def format_wallet_lookup(
+    address: str,
+    chain_configs: list[ChainConfig],
+    accounts: dict[int, AccountState]
+) -> str:
+    balances = "\n".join(
+        f"{c.display_name}: {format_amount(accounts[c.chain_id].native_balance)} {c.symbol}"
+        for c in chain_configs
+        if c.chain_id in accounts
+    )
+
+    return (
+        "💳 <b>Wallet address</b>\n\n" +
+        f"<code>{address}</code>" +
+        (f"\n\n{balances}" if balances else "")
+    )
+
+
+def format_skipped(skipped: list[SkippedStage]) -> str:
+    if not skipped:
+        return ""
+
+    stages = {}
+    for item in skipped:
+        stages.setdefault((item.chain_name, item.failed), []).append(
+            f"{item.stage} {item.dex}" if item.dex else item.stage
+        )
+
+    return "".join(
+        f"⚠️ {chain_name} {'failed' if failed else 'timed out'} ({', '.join(chain_stages)})\n"
+        for (chain_name, failed), chain_stages in stages.items()
+    ) + "\n"
+
+
+def format_round_trip(round_trip: RoundTripResult | None) -> str:
+    if round_trip is None:
+        return ""
+
+    if not round_trip.checked:
+        return f"⚠️ Honeypot check not run: {round_trip.error_message}\n\n"
+
+    if not round_trip.buy_success:
+        return f"🚨 Buy reverted: <code>{round_trip.error_message}</code>\n\n"
+
+    if not round_trip.sell_success:
+        return (
+            f"🚨 HONEYPOT: sell reverted <code>{round_trip.error_message}</code> | "
+            f"Buy tax: <b>{round_trip.buy_tax}%</b>\n\n"
+        )
+
+    return (
+        f"🧾 Tax: Buy <b>{round_trip.buy_tax}%</b> | Sell <b>{round_trip.sell_tax}%</b>\n" +
+        f"⛽️ Gas: Buy <b>{round_trip.buy_gas:,}</b> | Sell <b>{round_trip.sell_gas:,}</b>\n\n"
+    )
+
+
 async def token_info(
     message: types.Message,
     state: FSMContext, 
     redis: Redis, 
     data: ScanResult, 
-    token_address: str
-):
-    token_meta = data.token_meta
+    token_address: str,
+    card: types.Message | None = None
+) -> types.Message:
     is_direct = True if data.route_type == "direct" else False
     best_pool = data.best_eth_token_pool if is_direct else data.best_stable_token_pool
     chain = best_pool.chain
@@ -157,7 +266,48 @@ async def token_info(
 
     refresh_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    wallets = data.wallet_balances[chain.chain_id]["wallets"]
+    if not data.complete:
+        text = render_token_card(
+            data,
+            token_address,
+            token_price,
+            market_cap,
+            tvl,
+            format_skipped(data.skipped),
+            refresh_time,
+            "\n⏳ Loading balances..."
+        )
+        return await send_or_edit_card(message, card, text)
+
+    try:
+        user_id = (await state.get_data()).get("_user_id")
+        async with rpc_scheduler.slot(chain, RpcClass.SCAN, user_id):
+            round_trip = await HoneypotService.check(redis, data)
+    except Exception as e:
+        module_logger.warning(f"Round trip check failed for {token_address}: {e}")
+        round_trip = RoundTripResult(
+            buy_success=False,
+            sell_success=False,
+            error_message="the probe call failed",
+            checked=False
+        )
+
+    notes_text = format_skipped(data.skipped) + format_round_trip(round_trip)
+
+    wallets = data.wallet_balances.get(chain.chain_id, {}).get("wallets")
+
+    if wallets is None:
+        text = render_token_card(
+            data,
+            token_address,
+            token_price,
+            market_cap,
+            tvl,
+            notes_text,
+            refresh_time,
+            "\n⚠️ Balances are unavailable, try Update"
+        )
+        return await send_or_edit_card(message, card, text, token_refresh_kb().as_markup())
 
     await state.update_data(
         wallets=[
@@ -182,7 +332,34 @@ async def token_info(
 
     kb = token_info_kb(state_data["wallets"], current_wallet_idx, state_data.get("is_multi", False), state_data["is_buy"])
 
-    await message.answer(
+    text = render_token_card(
+        data,
+        token_address,
+        token_price,
+        market_cap,
+        tvl,
+        notes_text,
+        refresh_time,
+        balances_text
+    )
+    return await send_or_edit_card(message, card, text, kb.as_markup())
+
+
+def render_token_card(
+    data: ScanResult,
+    token_address: str,
+    token_price: str,
+    market_cap: str,
+    tvl: str,
+    notes_text: str,
+    refresh_time: str,
+    balances_text: str
+) -> str:
+    token_meta = data.token_meta
+    best_pool = data.best_eth_token_pool if data.route_type == "direct" else data.best_stable_token_pool
+    chain = best_pool.chain
+
+    return (
         f"🪙 <b><a href='{chain.explorer}address/{token_address}'>{token_meta.name}</a></b> " +
         f"(<code>{token_meta.ticker}</code>) | {best_pool.version.title()} " +
         f"<a href='{chain.explorer}address/{best_pool.pool.pool}'>Pool</a> | {chain.name}\n\n" +
@@ -191,33 +368,87 @@ async def token_info(
         f"💵 Price: <b>${token_price}</b>\n" +
         f"🧢 MC: <b>${market_cap}</b>\n" +
         f"💧 TVL: <b>${tvl}</b>\n\n" +
+        notes_text +
         f"🕓 Refresh | <b>{refresh_time} (UTC+0)</b>\n\n" +
         "<blockquote expandable>💰 <b>Balance • Click to Expand</b>\n" +
         f"<code>Wallet | {token_meta.ticker} | {chain.symbol}" +
         balances_text +
-        "</code></blockquote>",
-        reply_markup=kb.as_markup(),
-        disable_web_page_preview=True
+        "</code></blockquote>"
     )
 
 
+async def send_or_edit_card(
+    message: types.Message,
+    card: types.Message | None,
+    text: str,
+    reply_markup: types.InlineKeyboardMarkup | None = None
+) -> types.Message:
+    if card is None:
+        return await message.answer(
+            text,
+            reply_markup=reply_markup,
+            disable_web_page_preview=True
+        )
+
+    try:
+        await card.edit_text(
+            text,
+            reply_markup=reply_markup,
+            disable_web_page_preview=True
+        )
+    except TelegramBadRequest as e:
+        # same pools as the previous render
+        if "message is not modified" not in str(e):
+            raise
+
+    return card
+
+
 async def refresh_data(
     user_id: int,
     chain_id: int,
     token_address: str,
     session: AsyncSession,
     session_factory: sessionmaker,
-    redis: Redis
+    redis: Redis,
+    state: FSMContext | None = None,
+    rpc_class: RpcClass = RpcClass.SCAN
 ):
+    route = (await state.get_data()).get("route") if state else None
+    full_every = int(settings.get("REFRESH_FULL_EVERY", 5))
+
+    # the pools picked by the last full scan are re-read on their own until
+    # they degrade or a full rescan is due
+    if route and route["chain_id"] == chain_id and route["refreshes"] < full_every:
+        scanner = LiquidityScanner([registery.get(chain_id)], session_factory, redis, user_id, rpc_class)
+        wallets = await get_chain_wallets(session, user_id, chain_id)
+        price = await redis.get("eth:usd")
+
+        try:
+            scan_data = await scanner.refresh_route(route, Decimal(price), wallets)
+        except Exception as e:
+            module_logger.warning(f"Incremental refresh failed for {token_address}: {e}")
+            scan_data = None
+
+        if scan_data:
+            await state.update_data(
+                route=LiquidityScanner.route_state(scan_data, route["refreshes"] + 1)
+            )
+            return scan_data
+
     scan_data = await get_token_analysis(
         session, 
         session_factory,
         redis,
         user_id,
         chain_id,
-        token_address
+        token_address,
+        rpc_class
     )
 
+    if state and scan_data.display_chain:
+        await state.update_data(route=LiquidityScanner.route_state(scan_data))
+
     return scan_data
 
 
@@ -237,7 +468,7 @@ async def update_token_info(
     is_buy = data["is_buy"]
 
     scan_data = await refresh_data(
-        user_id, chain_id, token_address, session, session_factory, redis
+        user_id, chain_id, token_address, session, session_factory, redis, state
     )
 
     if not scan_data:
@@ -274,7 +505,7 @@ async def next_wallet(
     await state.update_data(idx=current_idx)
 
     scan_data = await refresh_data(
-        user_id, chain_id, token_address, session, session_factory, redis
+        user_id, chain_id, token_address, session, session_factory, redis, state
     )
 
     if not scan_data:
@@ -405,20 +636,22 @@ async def handle_allowance(
         return
     
     async with SwapClient(chain_config) as swap_client:
-        approve_tx = await swap_client.approve(
-            user_wallet.address,
-            token_address,
-            chain_settings.max_gas_price,
-            chain_settings.max_gas_limit,
-            chain_settings.approve_gas_delta,
-            target_allowance
-        )
+        async with rpc_scheduler.slot(chain_config, RpcClass.TRADE, user_id):
+            approve_tx = await swap_client.approve(
+                user_wallet.address,
+                token_address,
+                chain_settings.max_gas_price,
+                chain_settings.max_gas_limit,
+                chain_settings.approve_gas_delta,
+                target_allowance
+            )
 
     wallet_service = WalletService()
     pk = user_wallet.decrypt_private_key(wallet_service.get_cipher())
 
     async with WalletClient(chain_config, pk) as wallet_client:
-        tx_hash = await wallet_client.execute_transaction(approve_tx)
+        async with rpc_scheduler.slot(chain_config, RpcClass.TRADE, user_id):
+            tx_hash = await wallet_client.execute_transaction(approve_tx)
 
         approve_message = await callback.message.answer(
             f"🪙 <b><a href='{chain_config.explorer}token/{token_address}'>{data['name']}</a></b> <code>(${data['ticker']})</code>\n\n" + 
@@ -465,18 +698,31 @@ async def execute_swap(
     user_wallet = await wallet_repo.get_by_id(selected_wallet["id"])
 
     scan_data = await refresh_data(
-        user_id, chain_id, token_address, session, session_factory, redis
+        user_id, chain_id, token_address, session, session_factory, redis, state, RpcClass.TRADE
     )
 
-    # print(scan_data)
-    
-    wallets = scan_data.wallet_balances[chain_config.chain_id]["wallets"]
+    wallets = scan_data.wallet_balances.get(chain_config.chain_id, {}).get("wallets")
+
+    # the balances stage may have been skipped or timed out, it is read once more
+    if wallets is None:
+        scanner = LiquidityScanner([chain_config], session_factory, redis, user_id, RpcClass.TRADE)
+        await scanner.load_wallet_balances(scan_data, await get_chain_wallets(session, user_id, chain_id))
+        wallets = scan_data.wallet_balances.get(chain_config.chain_id, {}).get("wallets")
 
     current_wallet = next(
-        (w for w in wallets if w["id"] == selected_wallet["id"]), 
+        (w for w in wallets or [] if w["id"] == selected_wallet["id"]), 
         None
     )
 
+    # a buy spends eth and needs no token balance
+    if current_wallet is None and not is_buy:
+        await message.answer(
+            f"⚠️ Balances are unavailable, please try again | 💳 {selected_wallet['name']}"
+        )
+        return
+
+    wallet_name = current_wallet["wallet_name"] if current_wallet else selected_wallet["name"]
+
     amount_raw = int(Decimal(amount) * (10 ** 18)) \
                 if is_buy else \
                 int(
@@ -485,8 +731,7 @@ async def execute_swap(
                 )
     
     action_name = "Buy" if is_buy else "Sell"
-    price_impact_limit = chain_settings.buy_price_impact if is_buy else chain_settings.sell_price_impact
-    slippage_limit = chain_settings.buy_slippage if is_buy else chain_settings.sell_slippage
+    price_impact_limit, slippage_limit, _ = TradingService.limits(chain_settings, is_buy)
 
     base_message = (
         f"🪙 <b><a href='{chain_config.explorer}token/{token_address}'>{data["name"]}</a></b> "
@@ -494,78 +739,92 @@ async def execute_swap(
         f"📝 <code>{token_address}</code>\n\n"
     )
 
-    async with SwapClient(chain_config) as swap_client:
-        simulation = await swap_client.simulate_swap(
-            scan_data,
-            current_wallet["address"],
-            amount_raw,
-            is_buy
-        )
-        # print(simulation)
-
-    if not simulation.success:
-        await message.answer(
-            base_message +
-            f"🟥 {action_name} failed | 💳 {current_wallet['wallet_name']}\n\n"
-            f"<blockquote>ℹ️ Error: {simulation.error}</blockquote>",
-            disable_web_page_preview=True
-        )
-        return
-    
-    if simulation.price_impact > price_impact_limit:
-        await message.answer(
-            base_message +
-            f"⚠️ PRICE IMPACT WARNING {simulation.price_impact} > {price_impact_limit} | "
-            f"💳 {current_wallet['wallet_name']}",
-            disable_web_page_preview=True
-        )
-        return
-
-    if simulation.slippage > slippage_limit:
-        await message.answer(
-            base_message +
-            f"⚠️ SLIPPAGE WARNING {simulation.slippage} > {slippage_limit} | "
-            f"💳 {current_wallet['wallet_name']}",
-            disable_web_page_preview=True
-        )
-        return
+    wallet_service = WalletService()
+    pk = user_wallet.decrypt_private_key(wallet_service.get_cipher())
 
-    gas_delta = chain_settings.buy_gas_delta if is_buy else chain_settings.sell_gas_delta
-    async with SwapClient(chain_config) as swap_client:
-        swap_tx = await swap_client.make_swap(
+    async with SwapClient(chain_config) as swap_client, WalletClient(chain_config, pk) as wallet_client:
+        trade = await TradingService.swap(
+            swap_client,
+            wallet_client,
+            chain_settings,
+            user_id,
             scan_data,
-            current_wallet["address"],
-            simulation.amount_in,
-            simulation.amount_out,
-            slippage_limit,
-            chain_settings.max_gas_price,
-            chain_settings.max_gas_limit,
-            gas_delta,
+            amount_raw,
             is_buy
         )
+        simulation = trade.simulation
+
+        if trade.status == TradeStatus.FAILED:
+            await message.answer(
+                base_message +
+                f"🟥 {action_name} failed | 💳 {wallet_name}\n\n"
+                f"<blockquote>ℹ️ Error: {simulation.error}</blockquote>",
+                disable_web_page_preview=True
+            )
+            return
+        
+        if trade.status == TradeStatus.PRICE_IMPACT:
+            await message.answer(
+                base_message +
+                f"⚠️ PRICE IMPACT WARNING {simulation.price_impact} > {price_impact_limit} | "
+                f"💳 {wallet_name}",
+                disable_web_page_preview=True
+            )
+            return
+
+        if trade.status == TradeStatus.SLIPPAGE:
+            await message.answer(
+                base_message +
+                f"⚠️ SLIPPAGE WARNING {simulation.slippage} > {slippage_limit} | "
+                f"💳 {wallet_name}",
+                disable_web_page_preview=True
+            )
+            return
+
+        if trade.approve_hash:
+            await message.answer(
+                base_message +
+                f"⚪️ <a href='{chain_config.explorer}tx/0x{trade.approve_hash}'>Approve</a> of spender allowance is pending | "
+                f"💳 {wallet_name}",
+                disable_web_page_preview=True
+            )
 
-    wallet_service = WalletService()
-    pk = user_wallet.decrypt_private_key(wallet_service.get_cipher())
-
-    async with WalletClient(chain_config, pk) as wallet_client:
-        tx_hash = await wallet_client.execute_transaction(swap_tx)
+        tx_hash = trade.tx_hash
         
         pending_message = await message.answer(
             base_message +
             f"⚪️ <a href='{chain_config.explorer}tx/0x{tx_hash}'>{action_name}</a> tokens is pending | "
-            f"💳 {current_wallet['wallet_name']}",
+            f"💳 {wallet_name}",
             disable_web_page_preview=True
         )
         
         receipt = await wallet_client.wait_transaction(tx_hash)
-        
-        await pending_message.edit_text(
-            base_message +
-            f"🟢 <a href='{chain_config.explorer}tx/0x{tx_hash}'>{action_name}</a> succeeded | "
-            f"💳 {current_wallet['wallet_name']}",
-            disable_web_page_preview=True
+
+    # a bought position can get a stop loss and a take profit
+    position = None
+    if is_buy:
+        position = await record_position(
+            session,
+            redis,
+            user_id,
+            user_wallet.id,
+            user_wallet.address,
+            token_address,
+            scan_data,
+            (await state.get_data()).get("route"),
+            Decimal(amount),
+            receipt,
+            tx_hash
         )
 
+    await pending_message.edit_text(
+        base_message +
+        f"🟢 <a href='{chain_config.explorer}tx/0x{tx_hash}'>{action_name}</a> succeeded | "
+        f"💳 {wallet_name}",
+        reply_markup=position_kb(position.id).as_markup() if position else None,
+        disable_web_page_preview=True
+    )
+
 @router.callback_query(F.data.startswith("buy_token:"), TokenInfo.info)
 async def buy_token(
     callback: types.CallbackQuery, 
@@ -0,0 +1,156 @@
+from decimal import Decimal
+import logging
+
+from aiogram import Router, F
+from aiogram import types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from redis import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from chains import registery
+from config import settings
+from db.repositories.price_alert import PriceAlertRepository
+from db.repositories.token import TokenRepository
+from db.repositories.user import UserRepository
+from handlers.address import refresh_data
+from keyboards.alerts import alerts_kb
+from services.alerts import parse_alert_input
+from services.watch_engine import watch_engine
+from states.fsm_states import TokenInfo
+from utils.utils import convert_price
+
+router = Router()
+
+module_logger = logging.getLogger(__name__)
+
+
+def format_threshold(upper: Decimal | None, lower: Decimal | None) -> str:
+    return " | ".join(
+        text for text in (
+            f"⬆️ ${convert_price(upper, Decimal(1))}" if upper is not None else "",
+            f"⬇️ ${convert_price(lower, Decimal(1))}" if lower is not None else "",
+        )
+        if text
+    )
+
+
+async def render_alerts(session: AsyncSession, user_id: int) -> tuple[str, types.InlineKeyboardMarkup | None]:
+    rows = await PriceAlertRepository(session).get_active_by_user(user_id)
+
+    if not rows:
+        return "🔔 No active alerts. Open a token and press 🔔 Alert.", None
+
+    lines = []
+    for alert, token, chain_id in rows:
+        chain_config = registery.get(chain_id)
+
+        lines.append(
+            f"#{alert.id} 🪙 <b>{token.name}</b> <code>(${token.ticker})</code> | "
+            f"{chain_config.name if chain_config else chain_id}\n"
+            f"{format_threshold(alert.upper_price, alert.lower_price)} "
+            f"(set at ${convert_price(alert.base_price, Decimal(1))})"
+        )
+
+    kb = alerts_kb([(alert.id, token.ticker) for alert, token, _ in rows])
+    return "🔔 <b>Price alerts</b>\n\n" + "\n\n".join(lines), kb.as_markup()
+
+
+@router.callback_query(F.data == "set_alert", TokenInfo.info)
+async def set_alert(callback: types.CallbackQuery, state: FSMContext):
+    route = (await state.get_data()).get("route")
+
+    if not route or not any(p["category"] == "eth_token" for p in route["pools"]):
+        await callback.answer("⚠️ Alerts need a token with an ETH pool", show_alert=True)
+        return
+
+    await callback.message.answer(
+        "Reply to this message with the alert price.\n\n" +
+        "<code>0.05</code> or <code>$0.05</code> — when the price crosses $0.05\n" +
+        "<code>10%</code> — when the price moves 10% either way\n" +
+        "<code>+10%</code> / <code>-10%</code> — only up / only down"
+    )
+    await state.set_state(TokenInfo.alert)
+    await callback.answer()
+
+
+@router.message(F.text, TokenInfo.alert)
+async def get_alert_price(
+    message: types.Message,
+    state: FSMContext,
+    session: AsyncSession,
+    session_factory: sessionmaker,
+    redis: Redis,
+) -> None:
+    data = await state.get_data()
+    user_id = data["_user_id"]
+    chain_id = data["chain_id"]
+    token_address = data["token_address"]
+
+    alerts_repo = PriceAlertRepository(session)
+    token_repo = TokenRepository(session)
+
+    if await alerts_repo.count_active_by_user(user_id) >= int(settings.get("ALERTS_MAX_PER_USER", 20)):
+        await message.answer("⚠️ Too many active alerts, cancel some with /alerts")
+        await state.set_state(TokenInfo.info)
+        return
+
+    scan_data = await refresh_data(user_id, chain_id, token_address, session, session_factory, redis, state)
+    route = (await state.get_data()).get("route")
+
+    if not scan_data.display_chain or not route or not any(p["category"] == "eth_token" for p in route["pools"]):
+        await message.answer("⚠️ Alerts need a token with an ETH pool")
+        await state.set_state(TokenInfo.info)
+        return
+
+    price = scan_data.token_price * Decimal(await redis.get("eth:usd"))
+
+    try:
+        upper, lower = parse_alert_input(message.text, price)
+    except (ValueError, ArithmeticError):
+        await message.answer("❌ Use a price like <code>0.05</code> or a move like <code>10%</code>. Please try again.")
+        return
+
+    rows = await token_repo.get_by_address_in_chains(token_address, [route["chain_id"]])
+    token = rows[0][2] if rows else None
+
+    if token is None:
+        await message.answer("⚠️ Token is not stored yet, try again after Update")
+        await state.set_state(TokenInfo.info)
+        return
+
+    alert = await alerts_repo.create_alert(user_id, token.id, route, price, upper, lower)
+    await session.commit()
+
+    watch_engine.request_reload()
+    await state.set_state(TokenInfo.info)
+
+    await message.answer(
+        f"🔔 Alert #{alert.id} set for <b>{token.name}</b> <code>(${token.ticker})</code>\n\n"
+        f"{format_threshold(upper, lower)}\n"
+        f"💵 Now: <b>${convert_price(price, Decimal(1))}</b>"
+    )
+
+
+@router.message(Command("alerts"))
+async def show_alerts(message: types.Message, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(message.from_user.id)
+    if user is None:
+        return
+
+    text, reply_markup = await render_alerts(session, user.id)
+    await message.answer(text, reply_markup=reply_markup, disable_web_page_preview=True)
+
+
+@router.callback_query(F.data.startswith("cancel_alert:"))
+async def cancel_alert(callback: types.CallbackQuery, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    alert_id = int(callback.data.split(":")[-1])
+
+    if await PriceAlertRepository(session).cancel(user.id, alert_id):
+        await session.commit()
+        watch_engine.request_reload()
+
+    text, reply_markup = await render_alerts(session, user.id)
+    await callback.message.edit_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
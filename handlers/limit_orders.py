@@ -0,0 +1,209 @@
+from decimal import Decimal
+import logging
+
+from aiogram import Router, F
+from aiogram import types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from redis import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from chains import registery
+from config import settings
+from db.repositories.limit_order import LimitOrderRepository
+from db.repositories.token import TokenRepository
+from db.repositories.twap_order import TwapOrderRepository
+from db.repositories.user import UserRepository
+from handlers.address import refresh_data
+from handlers.twap import format_interval
+from keyboards.limit_orders import orders_kb
+from services.limit_orders import parse_limit_input
+from services.watch_engine import watch_engine
+from states.fsm_states import TokenInfo
+from utils.utils import convert_price, format_amount
+
+router = Router()
+
+module_logger = logging.getLogger(__name__)
+
+
+async def render_orders(session: AsyncSession, user_id: int) -> tuple[str, types.InlineKeyboardMarkup | None]:
+    rows = await LimitOrderRepository(session).get_open_by_user(user_id)
+    twap_rows = await TwapOrderRepository(session).get_open_by_user(user_id)
+
+    if not rows and not twap_rows:
+        return "📌 No open orders. Open a token and press 📌 Limit or ⏱ TWAP.", None
+
+    lines = []
+    for order, token, chain_id, wallet_name in rows:
+        chain_config = registery.get(chain_id)
+        symbol = chain_config.symbol if chain_config else "ETH"
+
+        lines.append(
+            f"#{order.id} {'🟩 Buy' if order.is_buy else '🟥 Sell'} <b>{token.name}</b> <code>(${token.ticker})</code> | "
+            f"{chain_config.name if chain_config else chain_id}\n"
+            f"💰 {format_amount(order.amount)} {symbol if order.is_buy else token.ticker} "
+            f"at <b>${convert_price(order.limit_price, Decimal(1))}</b> | 💳 {wallet_name}"
+        )
+
+    for order, token, chain_id, wallet_name in twap_rows:
+        chain_config = registery.get(chain_id)
+        unit = (chain_config.symbol if chain_config else "ETH") if order.is_buy else token.ticker
+
+        lines.append(
+            f"⏱{order.id} {'🟩 TWAP buy' if order.is_buy else '🟥 TWAP sell'} <b>{token.name}</b> "
+            f"<code>(${token.ticker})</code> | {chain_config.name if chain_config else chain_id}\n"
+            f"💰 {format_amount(order.filled_amount)} of {format_amount(order.total_amount)} {unit} | "
+            f"slice {order.slices_done}/{order.slices} every {format_interval(order.interval)} | 💳 {wallet_name}"
+        )
+
+    kb = orders_kb(
+        [(order.id, token.ticker) for order, token, _, _ in rows],
+        [(order.id, token.ticker) for order, token, _, _ in twap_rows]
+    )
+    return "📌 <b>Orders</b>\n\n" + "\n\n".join(lines), kb.as_markup()
+
+
+@router.callback_query(F.data == "set_limit", TokenInfo.info)
+async def set_limit(callback: types.CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    route = data.get("route")
+
+    if not route or not any(p["category"] == "eth_token" for p in route["pools"]):
+        await callback.answer("⚠️ Limit orders need a token with an ETH pool", show_alert=True)
+        return
+
+    if data["is_buy"]:
+        text = (
+            "Reply to this message with the amount in ETH and the buy price.\n\n" +
+            "<code>0.1 0.05</code> or <code>0.1 $0.05</code> — buy for 0.1 ETH at $0.05\n" +
+            "<code>0.1 -20%</code> — buy for 0.1 ETH when the price drops 20%"
+        )
+    else:
+        text = (
+            "Reply to this message with the share of the balance and the sell price.\n\n" +
+            "<code>50% 0.08</code> or <code>50% $0.08</code> — sell half at $0.08\n" +
+            "<code>100% +50%</code> — sell everything when the price rises 50%"
+        )
+
+    await callback.message.answer(text)
+    await state.set_state(TokenInfo.limit)
+    await callback.answer()
+
+
+@router.message(F.text, TokenInfo.limit)
+async def get_limit_order(
+    message: types.Message,
+    state: FSMContext,
+    session: AsyncSession,
+    session_factory: sessionmaker,
+    redis: Redis,
+) -> None:
+    data = await state.get_data()
+    user_id = data["_user_id"]
+    chain_id = data["chain_id"]
+    token_address = data["token_address"]
+    is_buy = data["is_buy"]
+    selected_wallet = data["wallets"][data.get("idx", 0)]
+
+    orders_repo = LimitOrderRepository(session)
+    token_repo = TokenRepository(session)
+
+    if await orders_repo.count_open_by_user(user_id) >= int(settings.get("LIMIT_ORDERS_MAX_PER_USER", 20)):
+        await message.answer("⚠️ Too many open limit orders, cancel some with /orders")
+        await state.set_state(TokenInfo.info)
+        return
+
+    scan_data = await refresh_data(user_id, chain_id, token_address, session, session_factory, redis, state)
+    route = (await state.get_data()).get("route")
+
+    if not scan_data.display_chain or not route or not any(p["category"] == "eth_token" for p in route["pools"]):
+        await message.answer("⚠️ Limit orders need a token with an ETH pool")
+        await state.set_state(TokenInfo.info)
+        return
+
+    price = scan_data.token_price * Decimal(await redis.get("eth:usd"))
+
+    try:
+        amount, limit_price = parse_limit_input(message.text, price, is_buy)
+    except (ValueError, ArithmeticError):
+        example = "<code>0.1 -20%</code>" if is_buy else "<code>50% +50%</code>"
+        await message.answer(
+            f"❌ Use an amount and a price {'below' if is_buy else 'above'} the current one, like {example}. "
+            "Please try again."
+        )
+        return
+
+    if not is_buy:
+        wallets = scan_data.wallet_balances.get(chain_id, {}).get("wallets", [])
+        current_wallet = next((w for w in wallets if w["id"] == selected_wallet["id"]), None)
+        amount = amount * current_wallet["token_balance"] if current_wallet else Decimal(0)
+
+        if amount <= 0:
+            await message.answer(f"⚠️ No {scan_data.token_meta.ticker} balance on 💳 {selected_wallet['name']}")
+            await state.set_state(TokenInfo.info)
+            return
+
+    rows = await token_repo.get_by_address_in_chains(token_address, [route["chain_id"]])
+    token = rows[0][2] if rows else None
+
+    if token is None:
+        await message.answer("⚠️ Token is not stored yet, try again after Update")
+        await state.set_state(TokenInfo.info)
+        return
+
+    order = await orders_repo.create_order(
+        user_id, selected_wallet["id"], token.id, route, is_buy, amount, limit_price, price
+    )
+    await session.commit()
+
+    watch_engine.request_reload()
+    await state.set_state(TokenInfo.info)
+
+    chain_config = registery.get(chain_id)
+    await message.answer(
+        f"📌 Limit {'buy' if is_buy else 'sell'} #{order.id} placed for <b>{token.name}</b> <code>(${token.ticker})</code>\n\n"
+        f"💰 {format_amount(amount)} {chain_config.symbol if is_buy else token.ticker} "
+        f"at <b>${convert_price(limit_price, Decimal(1))}</b> | 💳 {selected_wallet['name']}\n"
+        f"💵 Now: <b>${convert_price(price, Decimal(1))}</b>"
+    )
+
+
+@router.message(Command("orders"))
+async def show_orders(message: types.Message, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(message.from_user.id)
+    if user is None:
+        return
+
+    text, reply_markup = await render_orders(session, user.id)
+    await message.answer(text, reply_markup=reply_markup, disable_web_page_preview=True)
+
+
+@router.callback_query(F.data.startswith("cancel_order:"))
+async def cancel_order(callback: types.CallbackQuery, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    order_id = int(callback.data.split(":")[-1])
+
+    if await LimitOrderRepository(session).cancel(user.id, order_id):
+        await session.commit()
+        watch_engine.request_reload()
+    else:
+        await callback.answer("⚠️ The order is already being filled", show_alert=True)
+
+    text, reply_markup = await render_orders(session, user.id)
+    await callback.message.edit_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
+
+
+@router.callback_query(F.data.startswith("cancel_twap:"))
+async def cancel_twap(callback: types.CallbackQuery, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    order_id = int(callback.data.split(":")[-1])
+
+    if await TwapOrderRepository(session).cancel(user.id, order_id):
+        await session.commit()
+    else:
+        await callback.answer("⚠️ The order has already finished", show_alert=True)
+
+    text, reply_markup = await render_orders(session, user.id)
+    await callback.message.edit_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
@@ -0,0 +1,215 @@
+from decimal import Decimal
+import logging
+from typing import Any
+
+from aiogram import Router, F
+from aiogram import types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from redis import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from chains import registery
+from chains.dto import ChainConfig
+from clients.evm.scanner import LiquidityScanner, ScanResult
+from db import Position
+from db.repositories.position import PositionRepository
+from db.repositories.token import TokenRepository
+from db.repositories.user import UserRepository
+from enums.rpc import RpcClass
+from keyboards.positions import positions_kb
+from services.positions import parse_sltp_input
+from services.trading import TradingService
+from services.watch_engine import watch_engine
+from states.fsm_states import TokenInfo
+from utils.utils import convert_price, format_amount
+
+router = Router()
+
+module_logger = logging.getLogger(__name__)
+
+
+async def record_position(
+    session: AsyncSession,
+    redis: Redis,
+    user_id: int,
+    wallet_id: int,
+    wallet_address: str,
+    token_address: str,
+    scan_data: ScanResult,
+    route: dict[str, Any] | None,
+    cost: Decimal,
+    receipt: dict,
+    tx_hash: str
+) -> Position | None:
+    # the entry is what the buy really paid per token received
+    if not route or receipt["status"] != 1:
+        return None
+
+    token_meta = scan_data.token_meta
+    received = TradingService.received_amount(receipt, token_meta.address, wallet_address)
+    if received <= 0:
+        return None
+
+    rows = await TokenRepository(session).get_by_address_in_chains(token_address, [route["chain_id"]])
+    token = rows[0][2] if rows else None
+    if token is None:
+        return None
+
+    amount = Decimal(received) / Decimal(10 ** token_meta.decimals)
+    price = cost / amount * Decimal(await redis.get("eth:usd"))
+
+    position = await PositionRepository(session).add_buy(
+        user_id, wallet_id, token.id, route, amount, cost, price, tx_hash
+    )
+    await session.commit()
+
+    # an armed position grew, the engine sells the new amount
+    if position.stop_loss is not None or position.take_profit is not None:
+        watch_engine.request_reload()
+
+    return position
+
+
+async def current_price(
+    session_factory: sessionmaker,
+    redis: Redis,
+    user_id: int,
+    chain_config: ChainConfig,
+    position: Position,
+    address: str
+) -> Decimal | None:
+    eth_price = await redis.get("eth:usd")
+    if eth_price is None:
+        return None
+
+    eth_price = Decimal(eth_price)
+    scanner = LiquidityScanner([chain_config], session_factory, redis, user_id, RpcClass.SCAN)
+
+    try:
+        scan_data = await scanner.refresh_route(position.route, eth_price, {})
+
+        # a route without pools or a drained pool is priced by a full scan
+        if scan_data is None:
+            scan_data = await scanner.scan_token(address, eth_price)
+            if scan_data.display_chain is None or scan_data.display_chain.chain_id != chain_config.chain_id:
+                return None
+    except Exception as e:
+        module_logger.warning(f"Position {position.id} refresh failed: {e}")
+        return None
+
+    return scan_data.token_price * eth_price
+
+
+async def render_positions(session: AsyncSession, user_id: int) -> tuple[str, types.InlineKeyboardMarkup | None]:
+    rows = await PositionRepository(session).get_open_by_user(user_id)
+
+    if not rows:
+        return "🛡 No open positions. Buys made from a token card show up here.", None
+
+    lines = []
+    for position, token, chain_id, wallet_name in rows:
+        chain_config = registery.get(chain_id)
+        stop_loss = f"${convert_price(position.stop_loss, Decimal(1))}" if position.stop_loss else "—"
+        take_profit = f"${convert_price(position.take_profit, Decimal(1))}" if position.take_profit else "—"
+
+        lines.append(
+            f"#{position.id} <b>{token.name}</b> <code>(${token.ticker})</code> | "
+            f"{chain_config.name if chain_config else chain_id}\n"
+            f"💰 {format_amount(position.amount)} {token.ticker} at "
+            f"<b>${convert_price(position.entry_price, Decimal(1))}</b> | 💳 {wallet_name}\n"
+            f"🔻 SL {stop_loss} | 🔺 TP {take_profit}"
+        )
+
+    kb = positions_kb([(position.id, token.ticker) for position, token, _, _ in rows])
+    return "🛡 <b>Positions</b>\n\n" + "\n\n".join(lines), kb.as_markup()
+
+
+@router.callback_query(F.data.startswith("set_sltp:"))
+async def set_sltp(callback: types.CallbackQuery, state: FSMContext):
+    await state.update_data(sltp_position=int(callback.data.split(":")[-1]))
+
+    await callback.message.answer(
+        "Reply to this message with the stop loss and the take profit.\n\n" +
+        "<code>-20% +100%</code> — sell everything 20% below or 100% above the entry\n" +
+        "<code>$0.01 $0.05</code> — sell at $0.01 or at $0.05\n" +
+        "<code>-30% -</code> — stop loss only, <code>- -</code> removes both"
+    )
+    await state.set_state(TokenInfo.sltp)
+    await callback.answer()
+
+
+@router.message(F.text, TokenInfo.sltp)
+async def get_sltp(
+    message: types.Message,
+    state: FSMContext,
+    session: AsyncSession,
+    session_factory: sessionmaker,
+    redis: Redis,
+) -> None:
+    data = await state.get_data()
+    user = await UserRepository(session).get_by_telegram_id(message.from_user.id)
+    positions_repo = PositionRepository(session)
+
+    row = await positions_repo.get_open(user.id, data.get("sltp_position", 0))
+    if row is None:
+        await message.answer("⚠️ The position is already closed")
+        await state.set_state(TokenInfo.info)
+        return
+
+    position, token = row
+    chain_config = registery.get(position.route["chain_id"])
+    price = await current_price(session_factory, redis, user.id, chain_config, position, token.address)
+
+    if price is None:
+        await message.answer("⚠️ The pool of the position can not be read, please try again")
+        return
+
+    try:
+        stop_loss, take_profit = parse_sltp_input(message.text, position.entry_price, price)
+    except (ValueError, ArithmeticError):
+        await message.answer(
+            "❌ Use a stop loss below and a take profit above the current price, like <code>-20% +100%</code>. "
+            "Please try again."
+        )
+        return
+
+    await positions_repo.set_triggers(user.id, position.id, stop_loss, take_profit)
+    await session.commit()
+
+    watch_engine.request_reload()
+    await state.set_state(TokenInfo.info)
+
+    await message.answer(
+        f"🛡 Position #{position.id} <b>{token.name}</b> <code>(${token.ticker})</code>\n\n"
+        f"💰 {format_amount(position.amount)} {token.ticker} at <b>${convert_price(position.entry_price, Decimal(1))}</b>\n"
+        f"🔻 SL {f'${convert_price(stop_loss, Decimal(1))}' if stop_loss else '—'} | "
+        f"🔺 TP {f'${convert_price(take_profit, Decimal(1))}' if take_profit else '—'}\n"
+        f"💵 Now: <b>${convert_price(price, Decimal(1))}</b>"
+    )
+
+
+@router.message(Command("positions"))
+async def show_positions(message: types.Message, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(message.from_user.id)
+    if user is None:
+        return
+
+    text, reply_markup = await render_positions(session, user.id)
+    await message.answer(text, reply_markup=reply_markup, disable_web_page_preview=True)
+
+
+@router.callback_query(F.data.startswith("close_position:"))
+async def close_position(callback: types.CallbackQuery, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    position_id = int(callback.data.split(":")[-1])
+
+    if await PositionRepository(session).close(user.id, position_id):
+        await session.commit()
+        watch_engine.request_reload()
+    else:
+        await callback.answer("⚠️ The position is already being sold", show_alert=True)
+
+    text, reply_markup = await render_positions(session, user.id)
+    await callback.message.edit_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
@@ -0,0 +1,120 @@
+from decimal import Decimal
+import logging
+
+from aiogram import Router, F
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from chains import registery
+from config import settings
+from db.repositories.token import TokenRepository
+from db.repositories.twap_order import TwapOrderRepository
+from services.twap import parse_twap_input
+from states.fsm_states import TokenInfo
+from utils.utils import format_amount
+
+router = Router()
+
+module_logger = logging.getLogger(__name__)
+
+
+def format_interval(seconds: int) -> str:
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}".rstrip("0").rstrip(".") + "h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}".rstrip("0").rstrip(".") + "m"
+    return f"{seconds}s"
+
+
+@router.callback_query(F.data == "set_twap", TokenInfo.info)
+async def set_twap(callback: types.CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+
+    if not data.get("route"):
+        await callback.answer("⚠️ Press Update before starting a TWAP", show_alert=True)
+        return
+
+    if data["is_buy"]:
+        text = (
+            "Reply to this message with the amount in ETH, the number of slices and the duration.\n\n" +
+            "<code>1 10 30m</code> — buy for 1 ETH in 10 slices over 30 minutes\n" +
+            "Durations: <code>90s</code>, <code>30m</code>, <code>2h</code>, <code>1d</code>"
+        )
+    else:
+        text = (
+            "Reply to this message with the share of the balance, the number of slices and the duration.\n\n" +
+            "<code>50% 5 1h</code> — sell half in 5 slices over an hour\n" +
+            "Durations: <code>90s</code>, <code>30m</code>, <code>2h</code>, <code>1d</code>"
+        )
+
+    await callback.message.answer(text)
+    await state.set_state(TokenInfo.twap)
+    await callback.answer()
+
+
+@router.message(F.text, TokenInfo.twap)
+async def get_twap_order(message: types.Message, state: FSMContext, session: AsyncSession) -> None:
+    data = await state.get_data()
+    user_id = data["_user_id"]
+    chain_id = data["chain_id"]
+    is_buy = data["is_buy"]
+    route = data.get("route")
+    selected_wallet = data["wallets"][data.get("idx", 0)]
+
+    twap_repo = TwapOrderRepository(session)
+    token_repo = TokenRepository(session)
+
+    if not route:
+        await message.answer("⚠️ Press Update before starting a TWAP")
+        await state.set_state(TokenInfo.info)
+        return
+
+    if await twap_repo.count_open_by_user(user_id) >= int(settings.get("TWAP_MAX_PER_USER", 5)):
+        await message.answer("⚠️ Too many running TWAP orders, cancel some with /orders")
+        await state.set_state(TokenInfo.info)
+        return
+
+    try:
+        amount, slices, interval = parse_twap_input(message.text, is_buy)
+    except (ValueError, ArithmeticError):
+        example = "<code>1 10 30m</code>" if is_buy else "<code>50% 5 1h</code>"
+        await message.answer(
+            f"❌ Use an amount, 2-{settings.get('TWAP_MAX_SLICES', 100)} slices and a duration with "
+            f"at least {settings.get('TWAP_MIN_INTERVAL', 30)}s per slice, like {example}. Please try again."
+        )
+        return
+
+    if not is_buy:
+        # the share is taken from the balance on the card, every slice is
+        # capped by the live balance anyway
+        amount = amount * Decimal(selected_wallet["token_balance"])
+
+        if amount <= 0:
+            await message.answer(f"⚠️ No {data['ticker']} balance on 💳 {selected_wallet['name']}")
+            await state.set_state(TokenInfo.info)
+            return
+
+    rows = await token_repo.get_by_address_in_chains(data["token_address"], [route["chain_id"]])
+    token = rows[0][2] if rows else None
+
+    if token is None:
+        await message.answer("⚠️ Token is not stored yet, try again after Update")
+        await state.set_state(TokenInfo.info)
+        return
+
+    order = await twap_repo.create_order(
+        user_id, selected_wallet["id"], token.id, route, is_buy, amount, slices, interval
+    )
+    await session.commit()
+
+    await state.set_state(TokenInfo.info)
+
+    chain_config = registery.get(chain_id)
+    unit = chain_config.symbol if is_buy else token.ticker
+
+    await message.answer(
+        f"⏱ TWAP {'buy' if is_buy else 'sell'} #{order.id} started for <b>{token.name}</b> <code>(${token.ticker})</code>\n\n"
+        f"💰 {format_amount(amount)} {unit} in {slices} slices of {format_amount(amount / slices)} {unit}, "
+        f"one every {format_interval(interval)} | 💳 {selected_wallet['name']}"
+    )
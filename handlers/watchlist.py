@@ -0,0 +1,98 @@
+from decimal import Decimal
+import logging
+
+from aiogram import Router, F
+from aiogram import types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from chains import registery
+from config import settings
+from db.repositories.token import TokenRepository
+from db.repositories.user import UserRepository
+from db.repositories.watchlist import WatchlistRepository
+from keyboards.watchlist import watchlist_kb
+from services.watch_engine import watch_engine
+from states.fsm_states import TokenInfo
+from utils.utils import convert_price
+
+router = Router()
+
+module_logger = logging.getLogger(__name__)
+
+
+async def render_watchlist(session: AsyncSession, user_id: int) -> tuple[str, types.InlineKeyboardMarkup | None]:
+    rows = await WatchlistRepository(session).get_by_user(user_id)
+
+    if not rows:
+        return "⭐ Your watchlist is empty. Open a token and press ⭐ Watch.", None
+
+    lines = []
+    for item, token, chain_id in rows:
+        chain_config = registery.get(chain_id)
+        price = f"${convert_price(item.last_price, Decimal(1))}" if item.last_price else "—"
+
+        lines.append(
+            f"🪙 <b>{token.name}</b> <code>(${token.ticker})</code> | {chain_config.name if chain_config else chain_id}\n"
+            f"💵 {price} | 🔔 ±{item.notify_change}%\n"
+            f"📝 <code>{token.address}</code>"
+        )
+
+    kb = watchlist_kb([(item.id, token.ticker) for item, token, _ in rows])
+    return "⭐ <b>Watchlist</b>\n\n" + "\n\n".join(lines), kb.as_markup()
+
+
+@router.callback_query(F.data == "watch_token", TokenInfo.info)
+async def watch_token(callback: types.CallbackQuery, state: FSMContext, session: AsyncSession):
+    data = await state.get_data()
+
+    user_id = data["_user_id"]
+    route = data.get("route")
+
+    if not route or not any(p["category"] == "eth_token" for p in route["pools"]):
+        await callback.answer("⚠️ Only tokens with an ETH pool can be watched", show_alert=True)
+        return
+
+    watchlist_repo = WatchlistRepository(session)
+    token_repo = TokenRepository(session)
+
+    rows = await token_repo.get_by_address_in_chains(data["token_address"], [route["chain_id"]])
+    token = rows[0][2] if rows else None
+
+    if token is None:
+        await callback.answer("⚠️ Token is not stored yet, try again after Update", show_alert=True)
+        return
+
+    if await watchlist_repo.count_by_user(user_id) >= int(settings.get("WATCHLIST_MAX_ITEMS", 50)):
+        await callback.answer("⚠️ Watchlist is full, remove a token with /watchlist", show_alert=True)
+        return
+
+    await watchlist_repo.add(user_id, token.id, {**route, "refreshes": 0})
+    await session.commit()
+
+    watch_engine.request_reload()
+    await callback.answer(f"⭐ {token.ticker} added to watchlist")
+
+
+@router.message(Command("watchlist"))
+async def show_watchlist(message: types.Message, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(message.from_user.id)
+    if user is None:
+        return
+
+    text, reply_markup = await render_watchlist(session, user.id)
+    await message.answer(text, reply_markup=reply_markup, disable_web_page_preview=True)
+
+
+@router.callback_query(F.data.startswith("unwatch:"))
+async def unwatch_token(callback: types.CallbackQuery, session: AsyncSession):
+    user = await UserRepository(session).get_by_telegram_id(callback.from_user.id)
+    item_id = int(callback.data.split(":")[-1])
+
+    if await WatchlistRepository(session).remove(user.id, item_id):
+        await session.commit()
+        watch_engine.request_reload()
+
+    text, reply_markup = await render_watchlist(session, user.id)
+    await callback.message.edit_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
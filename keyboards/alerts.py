@@ -0,0 +1,16 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram import types
+
+
+def alerts_kb(items: list[tuple[int, str]]):
+    builder = InlineKeyboardBuilder()
+
+    builder.row(
+        *[
+            types.InlineKeyboardButton(text=f"❌ #{alert_id} {ticker}", callback_data=f"cancel_alert:{alert_id}")
+            for alert_id, ticker in items
+        ],
+        width=3
+    )
+
+    return builder
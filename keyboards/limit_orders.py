@@ -0,0 +1,20 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram import types
+
+
+def orders_kb(items: list[tuple[int, str]], twap_items: list[tuple[int, str]] | None = None):
+    builder = InlineKeyboardBuilder()
+
+    builder.row(
+        *[
+            types.InlineKeyboardButton(text=f"❌ #{order_id} {ticker}", callback_data=f"cancel_order:{order_id}")
+            for order_id, ticker in items
+        ],
+        *[
+            types.InlineKeyboardButton(text=f"❌ ⏱{order_id} {ticker}", callback_data=f"cancel_twap:{order_id}")
+            for order_id, ticker in twap_items or []
+        ],
+        width=3
+    )
+
+    return builder
@@ -0,0 +1,24 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram import types
+
+
+def position_kb(position_id: int):
+    builder = InlineKeyboardBuilder()
+
+    builder.row(
+        types.InlineKeyboardButton(text="🛡 SL/TP", callback_data=f"set_sltp:{position_id}")
+    )
+
+    return builder
+
+
+def positions_kb(items: list[tuple[int, str]]):
+    builder = InlineKeyboardBuilder()
+
+    for position_id, ticker in items:
+        builder.row(
+            types.InlineKeyboardButton(text=f"🛡 #{position_id} {ticker}", callback_data=f"set_sltp:{position_id}"),
+            types.InlineKeyboardButton(text=f"❌ #{position_id}", callback_data=f"close_position:{position_id}")
+        )
+
+    return builder
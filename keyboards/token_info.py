@@ -13,6 +13,12 @@ def token_info_kb(wallets: list, idx: int, is_multi: bool = True, is_buy: bool =
 
     builder.row(
         types.InlineKeyboardButton(text="🔄 Update", callback_data="update_token_info"),
+        types.InlineKeyboardButton(text="⭐ Watch", callback_data="watch_token"),
+        types.InlineKeyboardButton(text="🔔 Alert", callback_data="set_alert"),
+        types.InlineKeyboardButton(text="📌 Limit", callback_data="set_limit"),
+    )
+    builder.row(
+        types.InlineKeyboardButton(text="⏱ TWAP", callback_data="set_twap"),
     )
     if not is_multi:
         if not is_buy and len(wallets_with_balance) == 0:
@@ -89,3 +95,13 @@ def token_info_kb(wallets: list, idx: int, is_multi: bool = True, is_buy: bool =
         types.InlineKeyboardButton(text=f"{emoji} Gas | Gwei", callback_data="gas"),
     )
     return builder
+
+
+def token_refresh_kb():
+    builder = InlineKeyboardBuilder()
+
+    builder.row(
+        types.InlineKeyboardButton(text="🔄 Update", callback_data="update_token_info"),
+    )
+
+    return builder
@@ -0,0 +1,16 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram import types
+
+
+def watchlist_kb(items: list[tuple[int, str]]):
+    builder = InlineKeyboardBuilder()
+
+    builder.row(
+        *[
+            types.InlineKeyboardButton(text=f"❌ {ticker}", callback_data=f"unwatch:{item_id}")
+            for item_id, ticker in items
+        ],
+        width=3
+    )
+
+    return builder
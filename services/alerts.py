@@ -0,0 +1,137 @@
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.orm import sessionmaker
+
+from chains.dto import ChainConfig
+from db.repositories.price_alert import PriceAlertRepository
+from services.dto import PoolUpdate
+from services.notifier import notifier
+from services.watch_engine import WatchConsumer
+from utils.threshold_book import ThresholdBook
+from utils.utils import convert_price
+
+module_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Alert:
+    alert_id: int
+    telegram_id: int
+    base_price: Decimal
+    upper_price: Decimal | None
+    lower_price: Decimal | None
+
+
+@dataclass
+class _TokenBooks:
+    # upper thresholds fire on the way up, lower ones on the way down
+    upper: ThresholdBook
+    lower: ThresholdBook
+
+
+class AlertEngine(WatchConsumer):
+    def __init__(self):
+        self.session_factory: sessionmaker | None = None
+        # (chain_id, token address) -> books of the token's active alerts
+        self._books: dict[tuple[int, str], _TokenBooks] = {}
+        # an alert with both thresholds sits in both books, the side that
+        # did not fire is skipped lazily
+        self._fired: set[int] = set()
+
+    async def load(self, session_factory: sessionmaker) -> list[dict[str, Any]]:
+        self.session_factory = session_factory
+
+        async with session_factory() as session:
+            rows = await PriceAlertRepository(session).get_active()
+
+        books, routes = {}, {}
+        for alert, address, chain_id, telegram_id in sorted(rows, key=lambda row: row[0].id):
+            key = (chain_id, address.lower())
+            token_books = books.setdefault(key, _TokenBooks(ThresholdBook(), ThresholdBook()))
+
+            item = _Alert(alert.id, telegram_id, alert.base_price, alert.upper_price, alert.lower_price)
+            if alert.upper_price is not None:
+                token_books.upper.add(alert.upper_price, item)
+            if alert.lower_price is not None:
+                token_books.lower.add(alert.lower_price, item)
+
+            routes[key] = alert.route
+
+        # alerts fired since the query started are still in the rows, the
+        # conditional update in mark_triggered keeps them from firing twice
+        self._books = books
+        self._fired = set()
+        return list(routes.values())
+
+    @staticmethod
+    def _format(chain_config: ChainConfig, update: PoolUpdate, alert: _Alert) -> str:
+        token_meta = update.result.token_meta
+        change = (update.price_usd / alert.base_price - 1) * 100 if alert.base_price else Decimal(0)
+        crossed = alert.upper_price if alert.upper_price is not None and update.price_usd >= alert.upper_price else alert.lower_price
+
+        return (
+            f"🔔 <b><a href='{chain_config.explorer}token/{update.token_address}'>{token_meta.name}</a></b> "
+            f"<code>(${token_meta.ticker})</code> | {chain_config.name}\n\n"
+            f"Price crossed <b>${convert_price(crossed, Decimal(1))}</b>\n"
+            f"💵 Price: <b>${convert_price(update.price_usd, Decimal(1))}</b> ({change:+.2f}% since set)\n\n"
+            f"📝 <code>{update.token_address}</code>"
+        )
+
+    async def on_updates(self, chain_config: ChainConfig, updates: list[PoolUpdate]):
+        crossed: dict[int, tuple[_Alert, PoolUpdate]] = {}
+
+        for update in updates:
+            token_books = self._books.get((update.chain_id, update.token_address.lower()))
+            if token_books is None:
+                continue
+
+            # O(log n + k) per token and side
+            for alert in token_books.upper.pop_at_or_below(update.price_usd) + \
+                         token_books.lower.pop_at_or_above(update.price_usd):
+                if alert.alert_id not in self._fired:
+                    crossed[alert.alert_id] = (alert, update)
+
+        if not crossed:
+            return
+
+        self._fired.update(crossed)
+
+        async with self.session_factory() as session:
+            triggered = await PriceAlertRepository(session).mark_triggered(
+                {alert_id: update.price_usd for alert_id, (_, update) in crossed.items()}
+            )
+            await session.commit()
+
+        for alert_id in triggered:
+            alert, update = crossed[alert_id]
+            notifier.send(alert.telegram_id, self._format(chain_config, update, alert))
+
+        module_logger.info(f"{len(triggered)} price alerts fired on {chain_config.name}")
+
+
+def parse_alert_input(text: str, price: Decimal) -> tuple[Decimal | None, Decimal | None]:
+    # "$0.05" / "0.05" crosses a price, "10%" both ways, "+10%" / "-10%" one way
+    text = text.strip().replace(",", ".").replace(" ", "")
+
+    if text.endswith("%"):
+        sign = text[0] if text[0] in "+-" else ""
+        percent = Decimal(text.lstrip("+-").rstrip("%")) / 100
+
+        if not 0 < percent < 100:
+            raise ValueError("percent out of range")
+
+        upper = price * (1 + percent) if sign in ("", "+") else None
+        lower = price * (1 - percent) if sign in ("", "-") and percent < 1 else None
+
+        if upper is None and lower is None:
+            raise ValueError("percent out of range")
+        return upper, lower
+
+    target = Decimal(text.lstrip("$"))
+    if target <= 0 or target == price:
+        raise ValueError("target must differ from the current price")
+
+    return (target, None) if target > price else (None, target)
@@ -1,4 +1,9 @@
 from dataclasses import dataclass
+from decimal import Decimal
+
+from clients.evm.scanner import ScanResult
+from clients.evm.swap import SwapSimulation
+from enums.trade import TradeStatus
 
 
 @dataclass
@@ -6,3 +11,26 @@ class WalletData:
     private_key: bytes
     address: str
     mnemonic: str | None = None
+
+
+@dataclass
+class PoolUpdate:
+    # one watched token re-priced at a block
+    chain_id: int
+    token_address: str
+    block_number: int
+    result: ScanResult
+    price_usd: Decimal
+
+
+@dataclass
+class TradeResult:
+    status: TradeStatus
+    simulation: SwapSimulation
+    tx: dict | None = None
+    tx_hash: str | None = None
+    approve_hash: str | None = None
+
+    @property
+    def next_nonce(self) -> int | None:
+        return self.tx["nonce"] + 1 if self.tx else None
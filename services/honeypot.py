@@ -0,0 +1,70 @@
+import json
+import time
+from dataclasses import asdict
+from decimal import Decimal
+
+from redis.asyncio import Redis
+
+from chains.dto import ChainConfig
+from clients.evm.dto import RoundTripResult
+from clients.evm.scanner import ScanResult
+from clients.evm.swap import SwapClient
+from config import settings
+
+
+class HoneypotService:
+    KEY_PREFIX = "round_trip"
+
+    @staticmethod
+    def _cache_blocks() -> int:
+        return max(1, int(settings.get("ROUND_TRIP_CACHE_BLOCKS", 25)))
+
+    @classmethod
+    def _cache_ttl(cls, chain_config: ChainConfig) -> int:
+        return max(1, int(cls._cache_blocks() * chain_config.block_time))
+
+    @classmethod
+    def _cache_key(cls, chain_config: ChainConfig, token_address: str) -> str:
+        # one entry per window of ROUND_TRIP_CACHE_BLOCKS block times, so a
+        # card render needs no block number to find it
+        window = int(time.time() // cls._cache_ttl(chain_config))
+        return f"{cls.KEY_PREFIX}:{chain_config.chain_id}:{token_address.lower()}:{window}"
+
+    @staticmethod
+    def _dump(result: RoundTripResult) -> str:
+        return json.dumps(asdict(result), default=str)
+
+    @staticmethod
+    def _load(raw: str | bytes) -> RoundTripResult:
+        data = json.loads(raw)
+        data["buy_tax"] = Decimal(data["buy_tax"])
+        data["sell_tax"] = Decimal(data["sell_tax"])
+        return RoundTripResult(**data)
+
+    @classmethod
+    async def check(cls, redis: Redis, scan_result: ScanResult) -> RoundTripResult | None:
+        best_pool = scan_result.best_eth_token_pool \
+                    if scan_result.route_type == "direct" else \
+                    scan_result.best_stable_token_pool
+        chain = best_pool.chain
+
+        if chain.name not in SwapClient.ROUTER_ADDRESS:
+            return RoundTripResult(
+                buy_success=False,
+                sell_success=False,
+                error_message=f"no router on {chain.display_name}",
+                checked=False
+            )
+
+        amount_in = int(Decimal(str(settings.get("ROUND_TRIP_AMOUNT", "0.001"))) * (10 ** 18))
+
+        key = cls._cache_key(chain, scan_result.token_meta.address)
+        cached = await redis.get(key)
+        if cached:
+            return cls._load(cached)
+
+        async with SwapClient(chain) as swap_client:
+            result = await swap_client.check_round_trip(scan_result, amount_in)
+
+        await redis.set(key, cls._dump(result), ex=cls._cache_ttl(chain))
+        return result
@@ -0,0 +1,89 @@
+import logging
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from chains.dto import ChainConfig
+from db.repositories.limit_order import LimitOrderRepository
+from enums.trade import OrderStatus
+from services.dto import PoolUpdate
+from services.triggers import Trigger, TriggerEngine
+from utils.utils import convert_price, format_amount
+
+module_logger = logging.getLogger(__name__)
+
+
+class LimitOrderEngine(TriggerEngine):
+    LABEL = "Limit order"
+
+    async def _load(self, session: AsyncSession) -> list[tuple[int, str, dict[str, Any], Trigger]]:
+        rows = await LimitOrderRepository(session).get_open()
+
+        items = []
+        for order, address, chain_id, telegram_id, wallet, chain_settings in rows:
+            # buys fill when the price falls to the limit, sells when it rises to it
+            trigger = Trigger(
+                order.id, order.user_id, telegram_id, wallet, chain_settings, order.is_buy, order.amount,
+                falling=order.limit_price if order.is_buy else None,
+                rising=None if order.is_buy else order.limit_price,
+                defers=order.defers
+            )
+            items.append((chain_id, address, order.route, trigger))
+        return items
+
+    def _repository(self, session: AsyncSession) -> LimitOrderRepository:
+        return LimitOrderRepository(session)
+
+    def _format(
+        self,
+        chain_config: ChainConfig,
+        trigger: Trigger,
+        update: PoolUpdate,
+        status: OrderStatus,
+        tx_hash: str | None = None,
+        error: str | None = None
+    ) -> str:
+        token_meta = update.result.token_meta
+        action = "buy" if trigger.is_buy else "sell"
+        emoji = {OrderStatus.SENT: "⚪️", OrderStatus.FILLED: "🟢"}.get(status, "🟥")
+        amount = f"{format_amount(trigger.amount)} {chain_config.symbol if trigger.is_buy else token_meta.ticker}"
+        limit_price = trigger.falling if trigger.is_buy else trigger.rising
+        tx = f"<a href='{chain_config.explorer}tx/0x{tx_hash}'>{status.value}</a>" if tx_hash else status.value
+
+        text = (
+            f"📌 <b><a href='{chain_config.explorer}token/{update.token_address}'>{token_meta.name}</a></b> "
+            f"<code>(${token_meta.ticker})</code> | {chain_config.name}\n\n"
+            f"{emoji} Limit {action} #{trigger.item_id} {tx} | 💳 {trigger.wallet.name}\n"
+            f"💰 {amount} at <b>${convert_price(limit_price, Decimal(1))}</b> "
+            f"(now ${convert_price(update.price_usd, Decimal(1))})"
+        )
+        if error:
+            text += f"\n\n<blockquote>ℹ️ Error: {error}</blockquote>"
+        return text
+
+
+def parse_limit_input(text: str, price: Decimal, is_buy: bool) -> tuple[Decimal, Decimal]:
+    # "<amount> <price>": buys spend eth, sells a share of the balance ("50%"),
+    # the price is "$0.05" / "0.05" or a move from now like "-20%" / "+50%"
+    amount_text, price_text = text.strip().replace(",", ".").split()
+
+    if is_buy:
+        amount = Decimal(amount_text)
+        if not Decimal("0.0001") <= amount <= 100:
+            raise ValueError("amount out of range")
+    else:
+        amount = Decimal(amount_text.rstrip("%")) / 100
+        if not 0 < amount <= 1:
+            raise ValueError("share out of range")
+
+    if price_text.endswith("%"):
+        limit_price = price * (1 + Decimal(price_text.rstrip("%")) / 100)
+    else:
+        limit_price = Decimal(price_text.lstrip("$"))
+
+    # an order that would fill right away belongs to the swap buttons
+    if limit_price <= 0 or (limit_price >= price if is_buy else limit_price <= price):
+        raise ValueError("limit price is on the wrong side of the current price")
+
+    return amount, limit_price
@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from redis.asyncio import Redis
+
+from config import settings
+
+module_logger = logging.getLogger(__name__)
+
+
+class Notifier:
+    # background messages (alerts, fills, watchlist moves) share one sender
+    # that keeps under the Telegram global and per-chat limits
+    OUTBOX_KEY = "notify:outbox"
+
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._heap: list[tuple[float, int, int, str]] = []
+        self._seq = itertools.count()
+        # chat_id -> monotonic time the chat may receive the next message
+        self._chat_free: dict[int, float] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.bot: Bot | None = None
+
+    def start(self, bot: Bot, redis: Redis | None = None):
+        self.bot = bot
+        self._queue = asyncio.Queue(maxsize=int(settings.get("NOTIFY_QUEUE_SIZE", 10000)))
+        self._tasks = [asyncio.create_task(self._run())]
+
+        if redis is not None:
+            self._tasks.append(asyncio.create_task(self._drain_outbox(redis)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @classmethod
+    async def publish(cls, redis: Redis, chat_id: int, text: str):
+        # taskiq workers have no bot, their messages go out through the
+        # sender of the bot process
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(cls.OUTBOX_KEY, json.dumps([chat_id, text]))
+            pipe.ltrim(cls.OUTBOX_KEY, -int(settings.get("NOTIFY_QUEUE_SIZE", 10000)), -1)
+            await pipe.execute()
+
+    async def _drain_outbox(self, redis: Redis):
+        while True:
+            try:
+                item = await redis.blpop(self.OUTBOX_KEY, timeout=5)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                module_logger.warning(f"Notification outbox read failed: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            if item:
+                chat_id, text = json.loads(item[1])
+                self.send(chat_id, text)
+
+    def send(self, chat_id: int, text: str) -> bool:
+        if self._queue is None:
+            return False
+
+        try:
+            self._queue.put_nowait((chat_id, text))
+        except asyncio.QueueFull:
+            module_logger.warning(f"Notification queue is full, dropped message to {chat_id}")
+            return False
+        return True
+
+    def _push(self, ready_at: float, chat_id: int, text: str):
+        heapq.heappush(self._heap, (ready_at, next(self._seq), chat_id, text))
+
+    async def _run(self):
+        interval = 1 / float(settings.get("NOTIFY_RATE", 25))
+        chat_interval = float(settings.get("NOTIFY_CHAT_INTERVAL", 1.0))
+
+        while True:
+            if not self._heap:
+                chat_id, text = await self._queue.get()
+                self._push(time.monotonic(), chat_id, text)
+
+            while not self._queue.empty():
+                chat_id, text = self._queue.get_nowait()
+                self._push(time.monotonic(), chat_id, text)
+
+            ready_at, _, chat_id, text = self._heap[0]
+            now = time.monotonic()
+
+            if ready_at > now:
+                try:
+                    chat_id, text = await asyncio.wait_for(self._queue.get(), ready_at - now)
+                    self._push(time.monotonic(), chat_id, text)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+
+            # a chat over its limit waits without holding up the other chats
+            free_at = self._chat_free.get(chat_id, 0.0)
+            if free_at > now:
+                self._push(free_at, chat_id, text)
+                continue
+
+            await self._deliver(chat_id, text)
+            self._chat_free[chat_id] = time.monotonic() + chat_interval
+
+            if len(self._chat_free) > 10000:
+                now = time.monotonic()
+                self._chat_free = {k: v for k, v in self._chat_free.items() if v > now}
+
+            await asyncio.sleep(interval)
+
+    async def _deliver(self, chat_id: int, text: str):
+        for _ in range(2):
+            try:
+                await self.bot.send_message(chat_id, text, disable_web_page_preview=True)
+                return
+            except TelegramRetryAfter as e:
+                module_logger.warning(f"Telegram flood limit, pausing notifications for {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                module_logger.info(f"Notification to {chat_id} dropped, the bot is blocked")
+                return
+            except Exception as e:
+                module_logger.warning(f"Notification to {chat_id} failed: {e}")
+                return
+
+
+notifier = Notifier()
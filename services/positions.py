@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from chains.dto import ChainConfig
+from clients.evm.scheduler import rpc_scheduler
+from clients.evm.swap import SwapClient
+from clients.evm.wallet import WalletClient
+from db.repositories.position import PositionRepository
+from enums.rpc import RpcClass
+from enums.trade import OrderStatus
+from services.dto import PoolUpdate
+from services.triggers import Trigger, TriggerEngine
+from utils.utils import convert_price, format_amount
+
+module_logger = logging.getLogger(__name__)
+
+
+class PositionEngine(TriggerEngine):
+    # stop losses and take profits of bought positions, both sell the
+    # whole position through the limit order path
+    LABEL = "Position"
+
+    async def _load(self, session: AsyncSession) -> list[tuple[int, str, dict[str, Any], Trigger]]:
+        rows = await PositionRepository(session).get_armed()
+
+        items = []
+        for position, address, chain_id, telegram_id, wallet, chain_settings in rows:
+            trigger = Trigger(
+                position.id, position.user_id, telegram_id, wallet, chain_settings, False, position.amount,
+                falling=position.stop_loss,
+                rising=position.take_profit,
+                defers=position.defers
+            )
+            items.append((chain_id, address, position.route, trigger))
+        return items
+
+    def _repository(self, session: AsyncSession) -> PositionRepository:
+        return PositionRepository(session)
+
+    async def _prepare(self, chain_config: ChainConfig, swap_client: SwapClient, items: list[tuple[Trigger, PoolUpdate]]):
+        # a position sold by hand in the meantime is sold down to what is
+        # left, the balances of every triggered wallet are read with one
+        # multicall per token
+        by_token = defaultdict(list)
+        for trigger, update in items:
+            by_token[update.token_address].append((trigger, update))
+
+        wallet_client = WalletClient(chain_config, None, swap_client.w3)
+
+        async def cap(token_items: list[tuple[Trigger, PoolUpdate]]):
+            update = token_items[0][1]
+            addresses = list({trigger.wallet.address for trigger, _ in token_items})
+
+            async with rpc_scheduler.slot(chain_config, RpcClass.TRADE):
+                balances = await wallet_client.get_balances(
+                    update.token_address, addresses, update.result.token_meta.decimals, update.block_number
+                )
+
+            for trigger, _ in token_items:
+                trigger.amount = min(trigger.amount, balances[trigger.wallet.address][1])
+
+        results = await asyncio.gather(*[cap(token_items) for token_items in by_token.values()], return_exceptions=True)
+
+        # without a balance the swap simulation still refuses to oversell
+        for result in results:
+            if isinstance(result, Exception):
+                module_logger.warning(f"Position balances on {chain_config.name} failed: {result}")
+
+    def _format(
+        self,
+        chain_config: ChainConfig,
+        trigger: Trigger,
+        update: PoolUpdate,
+        status: OrderStatus,
+        tx_hash: str | None = None,
+        error: str | None = None
+    ) -> str:
+        token_meta = update.result.token_meta
+        emoji = {OrderStatus.SENT: "⚪️", OrderStatus.FILLED: "🟢"}.get(status, "🟥")
+        stop = trigger.falling is not None and update.price_usd <= trigger.falling
+        level = trigger.falling if stop else trigger.rising
+        tx = f"<a href='{chain_config.explorer}tx/0x{tx_hash}'>{status.value}</a>" if tx_hash else status.value
+
+        text = (
+            f"🛡 <b><a href='{chain_config.explorer}token/{update.token_address}'>{token_meta.name}</a></b> "
+            f"<code>(${token_meta.ticker})</code> | {chain_config.name}\n\n"
+            f"{emoji} {'Stop loss' if stop else 'Take profit'} #{trigger.item_id} {tx} | 💳 {trigger.wallet.name}\n"
+            f"💰 {format_amount(trigger.amount)} {token_meta.ticker} at <b>${convert_price(level, Decimal(1))}</b> "
+            f"(now ${convert_price(update.price_usd, Decimal(1))})"
+        )
+        if error:
+            text += f"\n\n<blockquote>ℹ️ Error: {error}</blockquote>"
+        return text
+
+
+def parse_sltp_input(text: str, entry_price: Decimal, price: Decimal) -> tuple[Decimal | None, Decimal | None]:
+    # "<stop loss> <take profit>": "$0.01" / "0.01" or a move from the entry
+    # like "-20%" / "+100%", "-" leaves a side unset
+    def level(value: str) -> Decimal | None:
+        if value == "-":
+            return None
+        if value.endswith("%"):
+            return entry_price * (1 + Decimal(value.rstrip("%")) / 100)
+        return Decimal(value.lstrip("$"))
+
+    stop_text, take_text = text.strip().replace(",", ".").split()
+    stop_loss, take_profit = level(stop_text), level(take_text)
+
+    # a level the price has already passed would sell right away
+    if stop_loss is not None and not 0 < stop_loss < price:
+        raise ValueError("stop loss is not below the current price")
+    if take_profit is not None and take_profit <= price:
+        raise ValueError("take profit is not above the current price")
+
+    return stop_loss, take_profit
@@ -0,0 +1,75 @@
+import logging
+from decimal import Decimal
+from typing import AsyncIterator
+
+from clients.evm.codec import loads_text
+from clients.evm.scanner import LiquidityScanner, ScanResult
+from config import settings
+from taskiq_app.tasks.scan import scan_token_task
+
+module_logger = logging.getLogger(__name__)
+
+
+class ScanDispatcher:
+    @staticmethod
+    def remote_enabled() -> bool:
+        return settings.get("SCAN_DISPATCH", "local") == "worker"
+
+    @staticmethod
+    async def _scan_remote(
+        scanner: LiquidityScanner,
+        token_address: str,
+        price: Decimal
+    ) -> ScanResult | None:
+        timeout = float(settings.get("SCAN_TOTAL_TIMEOUT", 8)) + float(settings.get("SCAN_DISPATCH_GRACE", 2))
+
+        try:
+            task = await scan_token_task.kiq(
+                token_address,
+                [c.chain_id for c in scanner.chain_configs],
+                str(price),
+                scanner.user_id
+            )
+            result = await task.wait_result(check_interval=0.05, timeout=timeout)
+        except Exception as e:
+            module_logger.warning(f"Remote scan of {token_address} failed, scanning locally: {e}")
+            return None
+
+        if result.is_err:
+            module_logger.warning(f"Remote scan of {token_address} failed, scanning locally: {result.error}")
+            return None
+
+        return loads_text(result.return_value)
+
+    @classmethod
+    async def scan_token(
+        cls,
+        scanner: LiquidityScanner,
+        token_address: str,
+        price: Decimal
+    ) -> ScanResult:
+        if cls.remote_enabled():
+            result = await cls._scan_remote(scanner, token_address, price)
+            if result is not None:
+                return result
+
+        return await scanner.scan_token(token_address, price)
+
+    @classmethod
+    async def scan_token_stream(
+        cls,
+        scanner: LiquidityScanner,
+        token_address: str,
+        price: Decimal
+    ) -> AsyncIterator[ScanResult]:
+        # workers return the complete result only, partial cards are a
+        # local scan feature
+        if cls.remote_enabled():
+            result = await cls._scan_remote(scanner, token_address, price)
+            if result is not None:
+                if result.route_type is not None:
+                    yield result
+                return
+
+        async for result in scanner.scan_token_stream(token_address, price):
+            yield result
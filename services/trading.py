@@ -0,0 +1,112 @@
+from collections.abc import Awaitable, Callable
+from decimal import Decimal
+
+from web3 import AsyncWeb3
+
+from clients.evm.scanner import ScanResult
+from clients.evm.scheduler import rpc_scheduler
+from clients.evm.swap import SwapClient
+from clients.evm.wallet import WalletClient
+from db import UserChainSettings
+from enums.rpc import RpcClass
+from enums.trade import TradeStatus
+from services.dto import TradeResult
+
+TRANSFER_TOPIC = "ddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+class TradingService:
+    # simulate -> approve -> sign -> send, shared by the swap buttons and the
+    # order engines
+
+    @staticmethod
+    def limits(chain_settings: UserChainSettings, is_buy: bool) -> tuple[Decimal, Decimal, float]:
+        if is_buy:
+            return chain_settings.buy_price_impact, chain_settings.buy_slippage, chain_settings.buy_gas_delta
+        return chain_settings.sell_price_impact, chain_settings.sell_slippage, chain_settings.sell_gas_delta
+
+    @staticmethod
+    def received_amount(receipt: dict, token_address: str, wallet_address: str) -> int:
+        # raw tokens that reached the wallet, read from the Transfer logs so
+        # transfer taxes and the real fill are counted instead of the quote
+        token_address, wallet_address = token_address.lower(), wallet_address.lower()
+
+        amount = 0
+        for log in receipt.get("logs", []):
+            topics = [bytes(topic).hex().removeprefix("0x") for topic in log["topics"]]
+            if len(topics) != 3 or topics[0] != TRANSFER_TOPIC or log["address"].lower() != token_address:
+                continue
+            if "0x" + topics[2][-40:] == wallet_address:
+                amount += int.from_bytes(bytes(log["data"]), "big")
+
+        return amount
+
+    @classmethod
+    async def swap(
+        cls,
+        swap_client: SwapClient,
+        wallet_client: WalletClient,
+        chain_settings: UserChainSettings,
+        user_id: int,
+        scan_result: ScanResult,
+        amount_raw: int,
+        is_buy: bool = True,
+        nonce: int | None = None,
+        before_send: Callable[[str], Awaitable[None]] | None = None
+    ) -> TradeResult:
+        chain_config = swap_client.chain_config
+        price_impact_limit, slippage_limit, gas_delta = cls.limits(chain_settings, is_buy)
+
+        async with rpc_scheduler.slot(chain_config, RpcClass.TRADE, user_id):
+            prepared = await swap_client.prepare_swap(
+                scan_result,
+                wallet_client.address,
+                amount_raw,
+                slippage_limit,
+                chain_settings.max_gas_price,
+                chain_settings.max_gas_limit,
+                gas_delta,
+                is_buy
+            )
+        simulation = prepared.simulation
+
+        if not simulation.success:
+            return TradeResult(TradeStatus.FAILED, simulation)
+
+        if simulation.price_impact > price_impact_limit:
+            return TradeResult(TradeStatus.PRICE_IMPACT, simulation)
+
+        if simulation.slippage > slippage_limit:
+            return TradeResult(TradeStatus.SLIPPAGE, simulation)
+
+        # a wallet sending several swaps in one block knows its next nonce,
+        # the rpc only counts mined transactions
+        if nonce is not None:
+            prepared.tx["nonce"] = nonce
+
+        approve_hash = None
+        if simulation.needs_approve:
+            async with rpc_scheduler.slot(chain_config, RpcClass.TRADE, user_id):
+                approve_tx = await swap_client.approve(
+                    wallet_client.address,
+                    scan_result.token_meta.address,
+                    chain_settings.max_gas_price,
+                    chain_settings.max_gas_limit,
+                    chain_settings.approve_gas_delta
+                )
+                if nonce is not None:
+                    approve_tx["nonce"] = nonce
+
+                approve_hash = await wallet_client.execute_transaction(approve_tx)
+            prepared.tx["nonce"] = approve_tx["nonce"] + 1
+
+        # the hash is known once the swap is signed, a caller can record it
+        # before the broadcast to find the swap again after a crash
+        signed_tx = wallet_client.sign_transaction(prepared.tx)
+        if before_send is not None:
+            await before_send(AsyncWeb3.keccak(hexstr=signed_tx).hex())
+
+        async with rpc_scheduler.slot(chain_config, RpcClass.TRADE, user_id):
+            tx_hash = await wallet_client.send_transaction(signed_tx)
+
+        return TradeResult(TradeStatus.SENT, simulation, prepared.tx, tx_hash, approve_hash)
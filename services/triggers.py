@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import time
+from abc import abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from chains.dto import ChainConfig
+from clients.evm.swap import SwapClient
+from clients.evm.wallet import WalletClient
+from config import settings
+from db import UserChainSettings, Wallet
+from enums.trade import OrderStatus, TradeStatus
+from services.dto import PoolUpdate, TradeResult
+from services.notifier import notifier
+from services.trading import TradingService
+from services.wallet import WalletService
+from services.watch_engine import WatchConsumer, watch_engine
+from utils.threshold_book import ThresholdBook
+
+module_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Trigger:
+    item_id: int
+    user_id: int
+    telegram_id: int
+    wallet: Wallet
+    chain_settings: UserChainSettings
+    is_buy: bool
+    amount: Decimal # eth on a buy, tokens on a sell
+    # usd thresholds, falling fires when the price drops to it, rising when
+    # the price climbs to it
+    falling: Decimal | None = None
+    rising: Decimal | None = None
+    defers: int = 0 # fills retried after a passing failure
+
+
+@dataclass
+class _TokenBooks:
+    falling: ThresholdBook
+    rising: ThresholdBook
+
+
+class TriggerEngine(WatchConsumer):
+    # swaps fired by pool updates (limit orders, stop losses, take profits):
+    # crossed thresholds are popped from sorted books, claimed in one
+    # conditional update and sent through TradingService
+    LABEL = "Trigger"
+
+    def __init__(self):
+        self.session_factory: sessionmaker | None = None
+        # (chain_id, token address) -> books of the token's armed triggers
+        self._books: dict[tuple[int, str], _TokenBooks] = {}
+        # a trigger with both thresholds sits in both books, the side that
+        # did not fire is skipped lazily
+        self._fired: set[int] = set()
+        # kept open so a fill does not pay for a new rpc connection
+        self._swap_clients: dict[int, SwapClient] = {}
+        self._fills: set[asyncio.Task] = set()
+        # item id -> monotonic time a deferred item is armed again
+        self._deferred: dict[int, float] = {}
+
+    @abstractmethod
+    async def _load(self, session: AsyncSession) -> list[tuple[int, str, dict[str, Any], Trigger]]:
+        # (evm chain id, token address, route, trigger) of every armed item
+        pass
+
+    @abstractmethod
+    def _repository(self, session: AsyncSession):
+        # claim(prices) -> claimed ids, set_result(id, status, tx_hash, error),
+        # release(id, defers, error) puts a claimed item back to open
+        pass
+
+    @abstractmethod
+    def _format(
+        self,
+        chain_config: ChainConfig,
+        trigger: Trigger,
+        update: PoolUpdate,
+        status: OrderStatus,
+        tx_hash: str | None = None,
+        error: str | None = None
+    ) -> str:
+        pass
+
+    async def _prepare(self, chain_config: ChainConfig, swap_client: SwapClient, items: list[tuple[Trigger, PoolUpdate]]):
+        # last chance to adjust the amounts of the claimed triggers before
+        # anything is sent
+        pass
+
+    async def load(self, session_factory: sessionmaker) -> list[dict[str, Any]]:
+        self.session_factory = session_factory
+
+        async with session_factory() as session:
+            rows = await self._load(session)
+
+        # deferred items stay off the books until their retry is due
+        now = time.monotonic()
+        self._deferred = {item_id: until for item_id, until in self._deferred.items() if until > now}
+
+        books, routes = {}, {}
+        for chain_id, address, route, trigger in sorted(rows, key=lambda row: row[3].item_id):
+            if trigger.item_id in self._deferred:
+                continue
+
+            key = (chain_id, address.lower())
+            token_books = books.setdefault(key, _TokenBooks(ThresholdBook(), ThresholdBook()))
+
+            if trigger.falling is not None:
+                token_books.falling.add(trigger.falling, trigger)
+            if trigger.rising is not None:
+                token_books.rising.add(trigger.rising, trigger)
+
+            routes[key] = route
+
+        # items claimed since the query started are still in the rows, the
+        # conditional update of claim keeps them from being sent twice
+        self._books = books
+        self._fired = set()
+        return list(routes.values())
+
+    async def close(self):
+        for task in self._fills:
+            task.cancel()
+        await asyncio.gather(*self._fills, return_exceptions=True)
+
+        for client in self._swap_clients.values():
+            await client.__aexit__(None, None, None)
+        self._swap_clients = {}
+
+    async def _swap_client(self, chain_config: ChainConfig) -> SwapClient:
+        client = self._swap_clients.get(chain_config.chain_id)
+        if client is None:
+            client = await SwapClient(chain_config).__aenter__()
+            self._swap_clients[chain_config.chain_id] = client
+        return client
+
+    async def on_updates(self, chain_config: ChainConfig, updates: list[PoolUpdate]):
+        triggered_at = time.monotonic()
+        crossed: dict[int, tuple[Trigger, PoolUpdate]] = {}
+
+        for update in updates:
+            token_books = self._books.get((update.chain_id, update.token_address.lower()))
+            if token_books is None:
+                continue
+
+            # O(log n + k) per token and side however many triggers rest on it
+            for trigger in token_books.falling.pop_at_or_above(update.price_usd) + \
+                           token_books.rising.pop_at_or_below(update.price_usd):
+                if trigger.item_id not in self._fired:
+                    crossed[trigger.item_id] = (trigger, update)
+
+        if not crossed:
+            return
+
+        self._fired.update(crossed)
+
+        try:
+            async with self.session_factory() as session:
+                claimed = await self._repository(session).claim(
+                    {item_id: update.price_usd for item_id, (_, update) in crossed.items()}
+                )
+                await session.commit()
+        except Exception:
+            # nothing was claimed, the next update may fire them again
+            for trigger, update in crossed.values():
+                self._rearm(trigger, update)
+            raise
+
+        if not claimed:
+            return
+
+        items = [crossed[item_id] for item_id in sorted(claimed)]
+        swap_client = await self._swap_client(chain_config)
+        await self._prepare(chain_config, swap_client, items)
+
+        # items of one wallet go out one after another with consecutive
+        # nonces, different wallets are sent in parallel
+        by_wallet = defaultdict(list)
+        for trigger, update in items:
+            by_wallet[trigger.wallet.id].append((trigger, update))
+
+        for wallet_items in by_wallet.values():
+            task = asyncio.create_task(self._fill_wallet(chain_config, swap_client, wallet_items, triggered_at))
+            self._fills.add(task)
+            task.add_done_callback(self._fills.discard)
+
+        module_logger.info(f"{len(claimed)} {self.LABEL.lower()}s fired on {chain_config.name}")
+
+    def _rearm(self, trigger: Trigger, update: PoolUpdate):
+        self._fired.discard(trigger.item_id)
+
+        # a reload since the pop already put it back
+        token_books = self._books.get((update.chain_id, update.token_address.lower()))
+        if token_books is None:
+            return
+
+        if trigger.falling is not None and update.price_usd <= trigger.falling:
+            token_books.falling.add(trigger.falling, trigger)
+        else:
+            token_books.rising.add(trigger.rising, trigger)
+
+    def _defer(self, item_ids: list[int]):
+        delay = float(settings.get("TRIGGER_DEFER", 15))
+        until = time.monotonic() + delay
+        for item_id in item_ids:
+            self._deferred[item_id] = until
+
+        async def rearm_later():
+            await asyncio.sleep(delay)
+            watch_engine.request_reload()
+
+        task = asyncio.create_task(rearm_later())
+        self._fills.add(task)
+        task.add_done_callback(self._fills.discard)
+
+    @staticmethod
+    def _amount_raw(trigger: Trigger, update: PoolUpdate) -> int:
+        decimals = 18 if trigger.is_buy else update.result.token_meta.decimals
+        return int(trigger.amount * (10 ** decimals))
+
+    @staticmethod
+    def _trade_error(trigger: Trigger, trade: TradeResult | None, error: str | None) -> str:
+        if trade is None:
+            return error or "Unknown error"
+
+        price_impact_limit, slippage_limit, _ = TradingService.limits(trigger.chain_settings, trigger.is_buy)
+        simulation = trade.simulation
+
+        if trade.status == TradeStatus.PRICE_IMPACT:
+            return f"Price impact {simulation.price_impact} > {price_impact_limit}"
+        if trade.status == TradeStatus.SLIPPAGE:
+            return f"Slippage {simulation.slippage} > {slippage_limit}"
+        return simulation.error or "Simulation failed"
+
+    async def _set_results(
+        self,
+        results: list[tuple[int, OrderStatus, str | None, str | None]],
+        released: list[tuple[int, int, str]] | None = None
+    ):
+        async with self.session_factory() as session:
+            repo = self._repository(session)
+            for item_id, status, tx_hash, error in results:
+                await repo.set_result(item_id, status, tx_hash, error)
+            for item_id, defers, error in released or []:
+                await repo.release(item_id, defers, error)
+            await session.commit()
+
+    async def _fill_wallet(
+        self,
+        chain_config: ChainConfig,
+        swap_client: SwapClient,
+        items: list[tuple[Trigger, PoolUpdate]],
+        triggered_at: float
+    ):
+        pk = items[0][0].wallet.decrypt_private_key(WalletService.get_cipher())
+        wallet_client = WalletClient(chain_config, pk, swap_client.w3)
+
+        max_defers = int(settings.get("TRIGGER_MAX_DEFERS", 3))
+        nonce, sent, results, released = None, [], [], []
+        for trigger, update in items:
+            trade, error = None, None
+            amount_raw = self._amount_raw(trigger, update)
+
+            try:
+                if amount_raw <= 0:
+                    raise ValueError("Nothing left to sell")
+
+                trade = await TradingService.swap(
+                    swap_client,
+                    wallet_client,
+                    trigger.chain_settings,
+                    trigger.user_id,
+                    update.result,
+                    amount_raw,
+                    trigger.is_buy,
+                    nonce
+                )
+            except Exception as e:
+                error = str(e)
+
+            if trade is not None and trade.status == TradeStatus.SENT:
+                nonce = trade.next_nonce
+                sent.append((trigger, update, trade.tx_hash))
+                results.append((trigger.item_id, OrderStatus.SENT, trade.tx_hash, None))
+
+                module_logger.info(
+                    f"{self.LABEL} {trigger.item_id} sent {time.monotonic() - triggered_at:.3f}s after the trigger"
+                )
+                notifier.send(trigger.telegram_id, self._format(chain_config, trigger, update, OrderStatus.SENT, trade.tx_hash))
+            else:
+                error = self._trade_error(trigger, trade, error)
+
+                # an empty balance will not fix itself, impact or slippage
+                # over the limits and rpc errors may pass on a later block
+                if amount_raw > 0 and trigger.defers < max_defers:
+                    released.append((trigger.item_id, trigger.defers + 1, error))
+                    continue
+
+                results.append((trigger.item_id, OrderStatus.FAILED, None, error))
+                notifier.send(trigger.telegram_id, self._format(chain_config, trigger, update, OrderStatus.FAILED, error=error))
+
+        # bookkeeping waits until every swap of the wallet is broadcast,
+        # released items are held back before a reload can see them open
+        if released:
+            self._defer([item_id for item_id, _, _ in released])
+        await self._set_results(results, released)
+
+        results = []
+        for trigger, update, tx_hash in sent:
+            try:
+                receipt = await wallet_client.wait_transaction(tx_hash)
+            except Exception as e:
+                module_logger.warning(f"No receipt for {self.LABEL.lower()} {trigger.item_id} ({tx_hash}): {e}")
+                continue
+
+            status = OrderStatus.FILLED if receipt["status"] == 1 else OrderStatus.FAILED
+            error = None if status == OrderStatus.FILLED else "Transaction reverted"
+
+            results.append((trigger.item_id, status, tx_hash, error))
+            notifier.send(trigger.telegram_id, self._format(chain_config, trigger, update, status, tx_hash, error))
+
+        if results:
+            await self._set_results(results)
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import re
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any
+
+from redis.asyncio import Redis
+from sqlalchemy.orm import sessionmaker
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from chains import registery
+from chains.dto import ChainConfig
+from clients.evm.scanner import LiquidityScanner, ScanResult
+from clients.evm.swap import SwapClient
+from clients.evm.wallet import WalletClient
+from config import settings
+from db import TwapOrder, UserChainSettings, Wallet
+from db.repositories.twap_order import TwapOrderRepository
+from enums.rpc import RpcClass
+from enums.trade import OrderStatus, TradeStatus
+from services.dto import TradeResult
+from services.notifier import Notifier
+from services.trading import TradingService
+from services.wallet import WalletService
+from utils.utils import format_amount
+
+module_logger = logging.getLogger(__name__)
+
+
+class TwapScheduler:
+    # one tick serves every open order, the state of an order lives in its
+    # row so a restarted worker picks up where the last one stopped
+
+    def __init__(self, session_factory: sessionmaker, redis: Redis):
+        self.session_factory = session_factory
+        self.redis = redis
+
+    async def tick(self) -> int:
+        async with self.session_factory() as session:
+            rows = await TwapOrderRepository(session).claim_due(
+                int(settings.get("TWAP_BATCH", 50)),
+                int(settings.get("TWAP_LEASE", 120))
+            )
+            await session.commit()
+
+        # slices of one wallet go out one after another with consecutive
+        # nonces, different wallets in parallel
+        by_wallet = defaultdict(list)
+        for row in rows:
+            by_wallet[row[4].id].append(row)
+
+        await asyncio.gather(*[self._run_wallet(items) for items in by_wallet.values()])
+        return len(rows)
+
+    async def _run_wallet(self, rows: list[tuple]):
+        nonce = None
+        for order, address, chain_id, telegram_id, wallet, chain_settings in rows:
+            try:
+                nonce = await self._run_slice(order, address, registery.get(chain_id), telegram_id, wallet, chain_settings, nonce)
+            except Exception as e:
+                module_logger.warning(f"TWAP order {order.id} slice failed: {e}")
+
+    async def _quote(
+        self,
+        order: TwapOrder,
+        address: str,
+        chain_config: ChainConfig,
+        wallet: Wallet
+    ) -> tuple[ScanResult, dict[str, Any] | None]:
+        # every slice is priced on the pool state of its own block
+        price = await self.redis.get("eth:usd")
+        if price is None:
+            raise ValueError("No eth price yet")
+
+        price = Decimal(price)
+        scanner = LiquidityScanner([chain_config], self.session_factory, self.redis, order.user_id, RpcClass.TRADE)
+        wallets = {
+            str(chain_config.chain_id): [{"id": wallet.id, "wallet_name": wallet.name, "address": wallet.address}]
+        }
+
+        scan_data = await scanner.refresh_route(order.route, price, wallets)
+        if scan_data is not None:
+            return scan_data, None
+
+        # a drained or migrated pool moves the rest of the order to a new route
+        scan_data = await scanner.scan_token(address, price)
+        if scan_data.display_chain is None or scan_data.display_chain.chain_id != chain_config.chain_id:
+            raise ValueError("No pool to trade on")
+
+        return scan_data, LiquidityScanner.route_state(scan_data)
+
+    @staticmethod
+    def _token_balance(scan_data: ScanResult, chain_id: int) -> Decimal | None:
+        wallets = scan_data.wallet_balances.get(chain_id, {}).get("wallets", [])
+        return wallets[0]["token_balance"] if wallets else None
+
+    async def _run_slice(
+        self,
+        order: TwapOrder,
+        address: str,
+        chain_config: ChainConfig,
+        telegram_id: int,
+        wallet: Wallet,
+        chain_settings: UserChainSettings,
+        nonce: int | None
+    ) -> int | None:
+        # the last slice is settled by its receipt before the next one goes out
+        if order.pending_tx_hash is not None:
+            await self._settle(order, chain_config, telegram_id, wait=False)
+            return nonce
+
+        amount = order.total_amount / order.slices
+        values, trade, error, fatal = {}, None, None, False
+
+        async def record_pending(tx_hash: str):
+            async with self.session_factory() as session:
+                await TwapOrderRepository(session).update_progress(
+                    order.id, {"pending_tx_hash": tx_hash, "pending_amount": amount}
+                )
+                await session.commit()
+
+        try:
+            scan_data, route = await self._quote(order, address, chain_config, wallet)
+            if route is not None:
+                values["route"] = route
+
+            balance = None if order.is_buy else self._token_balance(scan_data, chain_config.chain_id)
+            if balance is not None:
+                amount = min(amount, balance)
+
+            if amount > 0:
+                decimals = 18 if order.is_buy else scan_data.token_meta.decimals
+                pk = wallet.decrypt_private_key(WalletService.get_cipher())
+
+                async with SwapClient(chain_config) as swap_client:
+                    trade = await TradingService.swap(
+                        swap_client,
+                        WalletClient(chain_config, pk, swap_client.w3),
+                        chain_settings,
+                        order.user_id,
+                        scan_data,
+                        int(amount * (10 ** decimals)),
+                        order.is_buy,
+                        nonce,
+                        record_pending
+                    )
+            else:
+                error, fatal = "No balance left to sell", True
+        except Exception as e:
+            error = str(e)
+
+        repo_values, delay, notice = self._next_state(order, chain_settings, amount, trade, error, fatal)
+        values.update(repo_values)
+
+        async with self.session_factory() as session:
+            await TwapOrderRepository(session).update_progress(order.id, values, delay)
+            await session.commit()
+
+        if notice:
+            await Notifier.publish(self.redis, telegram_id, self._format(chain_config, order, values, notice))
+
+        if trade is None or trade.status != TradeStatus.SENT:
+            return nonce
+
+        order.pending_tx_hash, order.pending_amount = trade.tx_hash, amount
+        await self._settle(order, chain_config, telegram_id, wait=True)
+        return trade.next_nonce
+
+    async def _settle(self, order: TwapOrder, chain_config: ChainConfig, telegram_id: int, wait: bool):
+        async with WalletClient(chain_config) as wallet_client:
+            try:
+                receipt = await wallet_client.wait_transaction(order.pending_tx_hash) \
+                        if wait else \
+                        await wallet_client.w3.eth.get_transaction_receipt(order.pending_tx_hash)
+            except (TimeExhausted, TransactionNotFound):
+                receipt = None
+
+            # signed but never broadcast, the worker stopped in between
+            dropped = False
+            if receipt is None and not wait:
+                try:
+                    await wallet_client.w3.eth.get_transaction(order.pending_tx_hash)
+                except TransactionNotFound:
+                    dropped = True
+
+        if receipt is None and not dropped:
+            # still pending, looked at again on a later tick
+            values, delay, notice = {}, float(settings.get("TWAP_DEFER", 15)), None
+        else:
+            values, delay, notice = self._settled_state(order, receipt)
+
+        async with self.session_factory() as session:
+            await TwapOrderRepository(session).update_progress(order.id, values, delay)
+            await session.commit()
+
+        if notice:
+            await Notifier.publish(self.redis, telegram_id, self._format(chain_config, order, values, notice))
+
+    @staticmethod
+    def _settled_state(order: TwapOrder, receipt: dict | None) -> tuple[dict[str, Any], float | None, str | None]:
+        # (row values, seconds to the next run, notice for the user)
+        values = {"pending_tx_hash": None, "pending_amount": None}
+        if receipt is None:
+            return values, 0, None
+
+        done = order.slices_done + 1
+        values["slices_done"] = done
+
+        if receipt["status"] == 1:
+            values["filled_amount"] = order.filled_amount + order.pending_amount
+            notice = "filled"
+        else:
+            values["slices_skipped"] = order.slices_skipped + 1
+            values["error"] = "Transaction reverted"
+            notice = "reverted"
+
+        if done >= order.slices:
+            filled = values.get("filled_amount", order.filled_amount)
+            values["status"] = OrderStatus.FILLED.value if filled > 0 else OrderStatus.FAILED.value
+        return values, order.interval, notice
+
+    @staticmethod
+    def _next_state(
+        order: TwapOrder,
+        chain_settings: UserChainSettings,
+        amount: Decimal,
+        trade: TradeResult | None,
+        error: str | None,
+        fatal: bool = False
+    ) -> tuple[dict[str, Any], float | None, str | None]:
+        # (row values, seconds to the next run, notice for the user)
+        # a sent slice only counts once its receipt is settled
+        if trade is not None and trade.status == TradeStatus.SENT:
+            values = {
+                "defers": 0,
+                "last_tx_hash": trade.tx_hash,
+                "error": None,
+            }
+            return values, float(settings.get("TWAP_DEFER", 15)), None
+
+        # a reverting simulation or an empty balance will not fix itself
+        if fatal or (trade is not None and trade.status == TradeStatus.FAILED):
+            reason = error or trade.simulation.error or "Simulation failed"
+            return {"status": OrderStatus.FAILED.value, "error": reason}, None, "failed"
+
+        if trade is not None:
+            price_impact_limit, slippage_limit, _ = TradingService.limits(chain_settings, order.is_buy)
+            error = f"Price impact {trade.simulation.price_impact} > {price_impact_limit}" \
+                    if trade.status == TradeStatus.PRICE_IMPACT else \
+                    f"Slippage {trade.simulation.slippage} > {slippage_limit}"
+
+        # impact over the limit (or an rpc error) waits for the pool to
+        # recover a few times, then the slice is dropped
+        if order.defers < int(settings.get("TWAP_MAX_DEFERS", 3)):
+            return {"defers": order.defers + 1, "error": error}, float(settings.get("TWAP_DEFER", 15)), None
+
+        done = order.slices_done + 1
+        values = {
+            "slices_done": done,
+            "slices_skipped": order.slices_skipped + 1,
+            "defers": 0,
+            "error": error,
+        }
+        if done >= order.slices:
+            values["status"] = OrderStatus.FILLED.value if order.filled_amount > 0 else OrderStatus.FAILED.value
+        return values, order.interval, "skipped"
+
+    @staticmethod
+    def _format(
+        chain_config: ChainConfig,
+        order: TwapOrder,
+        values: dict[str, Any],
+        notice: str
+    ) -> str:
+        token_meta = order.route["token_meta"]
+        emoji = {"filled": "🟢", "skipped": "🟨"}.get(notice, "🟥")
+        done = values.get("slices_done", order.slices_done)
+        filled = values.get("filled_amount", order.filled_amount)
+        unit = chain_config.symbol if order.is_buy else token_meta["ticker"]
+        tx = f"<a href='{chain_config.explorer}tx/0x{order.pending_tx_hash}'>{notice}</a>" \
+            if notice in ("filled", "reverted") else \
+            notice
+
+        text = (
+            f"⏱ <b><a href='{chain_config.explorer}token/{token_meta['address']}'>{token_meta['name']}</a></b> "
+            f"<code>(${token_meta['ticker']})</code> | {chain_config.name}\n\n"
+            f"{emoji} TWAP {'buy' if order.is_buy else 'sell'} #{order.id} slice {done}/{order.slices} {tx}\n"
+            f"💰 {format_amount(filled)} of {format_amount(order.total_amount)} {unit} done"
+        )
+        if values.get("status") in (OrderStatus.FILLED.value, OrderStatus.FAILED.value):
+            text += f" | order {values['status']}"
+        if notice != "filled" and values.get("error"):
+            text += f"\n\n<blockquote>ℹ️ Error: {values['error']}</blockquote>"
+        return text
+
+
+def parse_twap_input(text: str, is_buy: bool) -> tuple[Decimal, int, int]:
+    # "<amount> <slices> <duration>": "1 10 30m" buys for 1 eth in 10 slices
+    # over 30 minutes, sells take a share of the balance ("50% 5 1h")
+    amount_text, slices_text, duration_text = text.strip().replace(",", ".").split()
+
+    if is_buy:
+        amount = Decimal(amount_text)
+        if not Decimal("0.0001") <= amount <= 100:
+            raise ValueError("amount out of range")
+    else:
+        amount = Decimal(amount_text.rstrip("%")) / 100
+        if not 0 < amount <= 1:
+            raise ValueError("share out of range")
+
+    slices = int(slices_text)
+    if not 2 <= slices <= int(settings.get("TWAP_MAX_SLICES", 100)):
+        raise ValueError("slices out of range")
+
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", duration_text.lower())
+    if match is None:
+        raise ValueError("unknown duration")
+
+    duration = float(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+    interval = int(duration / slices)
+
+    if interval < int(settings.get("TWAP_MIN_INTERVAL", 30)):
+        raise ValueError("slices are too close")
+
+    return amount, slices, interval
@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any
+
+from redis.asyncio import Redis
+from sqlalchemy.orm import sessionmaker
+
+from chains import registery
+from chains.dto import ChainConfig
+from clients.evm.base import parse_pool_ref_job
+from clients.evm.dex.dto import PoolRef, TokenPair
+from clients.evm.dto import TokenMeta
+from clients.evm.scanner import BestPool, ChainWithToken, LiquidityScanner
+from clients.evm.scheduler import rpc_scheduler
+from clients.evm.wallet import WalletClient
+from config import settings
+from enums.rpc import RpcClass
+from services.dto import PoolUpdate
+from utils import metrics
+from utils.cpu import CpuExecutor
+
+module_logger = logging.getLogger(__name__)
+
+
+class WatchConsumer(ABC):
+    @abstractmethod
+    async def load(self, session_factory: sessionmaker) -> list[dict[str, Any]]:
+        # routes (LiquidityScanner.route_state) of every token the consumer
+        # needs priced, called on each engine reload
+        pass
+
+    @abstractmethod
+    async def on_updates(self, chain_config: ChainConfig, updates: list[PoolUpdate]):
+        # all tokens of one chain re-priced at the same block
+        pass
+
+
+@dataclass
+class _WatchedToken:
+    token_meta: TokenMeta
+    refs: list[PoolRef]
+    route: dict[str, Any]
+    # built on the first poll with the chain's dex clients
+    pairs: list[TokenPair] = field(default_factory=list)
+    calls: list[tuple] = field(default_factory=list)
+    spans: list[tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def pools(self) -> tuple[str, ...]:
+        return tuple(ref.pool for ref in self.refs)
+
+
+class WatchEngine:
+    METRICS_PREFIX = "watch"
+    LEADER_KEY = "watch:leader"
+
+    RENEW_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("expire", KEYS[1], ARGV[2])
+    end
+    return redis.call("set", KEYS[1], ARGV[1], "NX", "EX", ARGV[2]) and 1 or 0
+    """
+
+    def __init__(self):
+        self._consumers: list[WatchConsumer] = []
+        # chain_id -> token address -> watched token, shared by all users
+        self._tokens: dict[int, dict[str, _WatchedToken]] = {}
+        # (chain_id, token) -> (expires_at, route), routes found by
+        # rediscovery replace the stored ones while the token is watched
+        # and for at most WATCH_REDISCOVERED_TTL
+        self._rediscovered: dict[tuple[int, str], tuple[float, dict[str, Any]]] = {}
+        self._rediscovering: set[tuple[int, str]] = set()
+        self._rediscoveries: set[asyncio.Task] = set()
+        self._reload = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._owner = uuid.uuid4().hex
+        self.is_leader = False
+        self.session_factory: sessionmaker | None = None
+        self.redis: Redis | None = None
+
+    def register(self, consumer: WatchConsumer):
+        self._consumers.append(consumer)
+
+    def request_reload(self):
+        self._reload.set()
+
+    def watched(self, chain_id: int) -> int:
+        return len(self._tokens.get(chain_id, {}))
+
+    async def start(self, session_factory: sessionmaker, redis: Redis):
+        self.session_factory = session_factory
+        self.redis = redis
+
+        self._tasks = [asyncio.create_task(self._reload_loop())] + [
+            asyncio.create_task(self._run_chain(chain_config))
+            for chain_config in registery.list()
+        ]
+
+    async def stop(self):
+        for task in self._tasks + list(self._rediscoveries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._rediscoveries, return_exceptions=True)
+        self._tasks = []
+
+    async def _renew_leadership(self) -> bool:
+        # one bot process polls, the others only keep their routes loaded
+        ttl = max(1, int(float(settings.get("WATCH_RELOAD", 30)) * 2))
+        renewed = await self.redis.eval(self.RENEW_SCRIPT, 1, self.LEADER_KEY, self._owner, ttl)
+        self.is_leader = bool(renewed)
+        return self.is_leader
+
+    async def _reload_loop(self):
+        interval = float(settings.get("WATCH_RELOAD", 30))
+
+        while True:
+            try:
+                await self._renew_leadership()
+                await self._load_routes()
+            except Exception as e:
+                module_logger.warning(f"Watch engine reload failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._reload.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._reload.clear()
+
+    async def _load_routes(self):
+        routes = []
+        for consumer in self._consumers:
+            routes.extend(await consumer.load(self.session_factory))
+
+        tokens: dict[int, dict[str, _WatchedToken]] = defaultdict(dict)
+
+        # tokens nobody watches any more and expired routes are dropped
+        now = time.time()
+        watched_keys = {(route["chain_id"], route["token_meta"]["address"].lower()) for route in routes}
+        self._rediscovered = {
+            key: entry for key, entry in self._rediscovered.items()
+            if key in watched_keys and entry[0] > now
+        }
+
+        for route in routes:
+            chain_id = route["chain_id"]
+            key = route["token_meta"]["address"].lower()
+            rediscovered = self._rediscovered.get((chain_id, key))
+            watched = self._watched_from_route(rediscovered[1] if rediscovered else route)
+            if watched is None:
+                continue
+
+            # keep the built calls of unchanged routes
+            current = self._tokens.get(chain_id, {}).get(key)
+            if current is not None and current.pools == watched.pools:
+                watched = current
+
+            tokens[chain_id][key] = watched
+
+        self._tokens = dict(tokens)
+
+    @staticmethod
+    def _watched_from_route(route: dict[str, Any]) -> _WatchedToken | None:
+        refs = [PoolRef(**ref) for ref in route["pools"]]
+
+        # the price is read from the eth-token pool, see _price_result
+        if not any(ref.category == "eth_token" for ref in refs):
+            return None
+
+        return _WatchedToken(TokenMeta(**route["token_meta"]), refs, route)
+
+    async def _run_chain(self, chain_config: ChainConfig):
+        last_block = None
+
+        async with AsyncExitStack() as stack:
+            wallet = await stack.enter_async_context(WalletClient(chain_config))
+            clients = {
+                name: await stack.enter_async_context(client_cls(chain_config))
+                for name, client_cls in LiquidityScanner.DEX_CLIENTS.items()
+            }
+
+            while True:
+                started = time.monotonic()
+
+                if self.is_leader and self._tokens.get(chain_config.chain_id):
+                    try:
+                        last_block = await self._poll_chain(chain_config, wallet, clients, last_block)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        module_logger.warning(f"Watch cycle on {chain_config.name} failed: {e}")
+
+                await asyncio.sleep(max(0.0, chain_config.block_time - (time.monotonic() - started)))
+
+    @staticmethod
+    def _build_calls(watched: _WatchedToken, clients: dict):
+        for ref in watched.refs:
+            client = clients[f"{ref.dex}_{ref.version}"]
+            pair = client._create_token_pair(ref.token_x, ref.token_y, ref.decimals_x, ref.decimals_y)
+            pool_calls = client.pool_calls(pair, ref)
+
+            watched.pairs.append(pair)
+            watched.spans.append((len(watched.calls), len(pool_calls)))
+            watched.calls.extend(pool_calls)
+
+    async def _aggregate(self, chain_config: ChainConfig, multicall, calls: list, block: int) -> list:
+        async with rpc_scheduler.slot(chain_config, RpcClass.WATCH):
+            return await multicall.functions.aggregate3(calls).call(block_identifier=block)
+
+    async def _poll_chain(
+        self,
+        chain_config: ChainConfig,
+        wallet: WalletClient,
+        clients: dict,
+        last_block: int | None
+    ) -> int | None:
+        async with rpc_scheduler.slot(chain_config, RpcClass.WATCH):
+            block = await wallet.w3.eth.block_number
+
+        if block == last_block:
+            return last_block
+
+        started = time.monotonic()
+        # rediscovery may swap entries while the cycle waits on the rpc
+        tokens = dict(self._tokens.get(chain_config.chain_id, {}))
+
+        # every watched pool of the chain in as few aggregate3 calls as
+        # possible, no matter how many users watch it
+        calls, offsets = [], {}
+        for key, watched in tokens.items():
+            if not watched.calls:
+                self._build_calls(watched, clients)
+            offsets[key] = len(calls)
+            calls.extend(watched.calls)
+
+        chunk_size = int(settings.get("WATCH_CHUNK_CALLS", 500))
+        multicall = wallet._get_multicall_contract()
+
+        chunks = await asyncio.gather(*[
+            self._aggregate(chain_config, multicall, calls[i:i + chunk_size], block)
+            for i in range(0, len(calls), chunk_size)
+        ])
+        results = [result for chunk in chunks for result in chunk]
+        fetched = time.monotonic()
+
+        # decoding is grouped by dex, large watchlists go to the process pool
+        jobs, owners = defaultdict(list), defaultdict(list)
+        for key, watched in tokens.items():
+            for ref, pair, (start, count) in zip(watched.refs, watched.pairs, watched.spans):
+                begin = offsets[key] + start
+                jobs[f"{ref.dex}_{ref.version}"].append((results[begin:begin + count], pair, ref))
+                owners[f"{ref.dex}_{ref.version}"].append(key)
+
+        pools = defaultdict(list)
+        for name, dex_jobs in jobs.items():
+            parsed = await CpuExecutor.map(
+                parse_pool_ref_job,
+                dex_jobs,
+                LiquidityScanner.DEX_CLIENTS[name],
+                chain_config
+            )
+            for key, job, pool in zip(owners[name], dex_jobs, parsed):
+                pools[key].append((job[2], pool))
+
+        # without an eth price nothing can be priced, the block is polled again
+        price = await self.redis.get("eth:usd")
+        if price is None:
+            module_logger.warning(f"Watch cycle on {chain_config.name} skipped: no eth price")
+            return last_block
+
+        price = Decimal(price)
+        max_drop = Decimal(str(settings.get("REFRESH_TVL_DROP", 0.5)))
+
+        updates, stale = [], 0
+        for key, watched in tokens.items():
+            best_pools = {"eth_token": None, "eth_stable": None, "stable_token": None}
+
+            for ref, pool in pools[key]:
+                if pool is None or pool.tvl < Decimal(ref.tvl) * (1 - max_drop):
+                    best_pools = None
+                    break
+
+                best_pools[ref.category] = BestPool(
+                    chain=chain_config,
+                    category=ref.category,
+                    dex=ref.dex,
+                    version=ref.version,
+                    pool=pool,
+                    tvl=pool.tvl,
+                    stable_symbol=ref.stable_symbol,
+                    stable_address=ref.stable_address,
+                )
+
+            if best_pools is None:
+                stale += 1
+                self._schedule_rediscovery(chain_config, key, watched, price)
+                continue
+
+            result = LiquidityScanner._price_result(
+                best_pools,
+                [ChainWithToken(chain_config=chain_config, token_meta=watched.token_meta)],
+                watched.token_meta,
+                price
+            )
+            updates.append(PoolUpdate(
+                chain_id=chain_config.chain_id,
+                token_address=watched.token_meta.address,
+                block_number=block,
+                result=result,
+                price_usd=result.token_price * price,
+            ))
+
+        await asyncio.gather(*[
+            self._dispatch(consumer, chain_config, updates)
+            for consumer in self._consumers
+        ])
+        finished = time.monotonic()
+
+        module_logger.debug(
+            f"Watch cycle {chain_config.name} block {block}: {len(tokens)} tokens, "
+            f"{len(calls)} calls, fetch {fetched - started:.3f}s, total {finished - started:.3f}s"
+        )
+
+        await metrics.incr(self.redis, f"{self.METRICS_PREFIX}:{chain_config.chain_id}", {
+            "cycles": 1,
+            "tokens": len(tokens),
+            "calls": len(calls),
+            "rpc": len(chunks) + 1,
+            "stale": stale,
+            "fetch_total": fetched - started,
+            "latency_total": finished - started,
+            "late": int(finished - started > chain_config.block_time),
+        })
+        await rpc_scheduler.flush(self.redis)
+
+        return block
+
+    @staticmethod
+    async def _dispatch(consumer: WatchConsumer, chain_config: ChainConfig, updates: list[PoolUpdate]):
+        try:
+            await consumer.on_updates(chain_config, updates)
+        except Exception as e:
+            module_logger.warning(f"{type(consumer).__name__} failed on {chain_config.name} updates: {e}")
+
+    def _schedule_rediscovery(
+        self,
+        chain_config: ChainConfig,
+        key: str,
+        watched: _WatchedToken,
+        price: Decimal
+    ):
+        if (chain_config.chain_id, key) in self._rediscovering:
+            return
+
+        self._rediscovering.add((chain_config.chain_id, key))
+        task = asyncio.create_task(self._rediscover(chain_config, key, watched, price))
+        self._rediscoveries.add(task)
+        task.add_done_callback(self._rediscoveries.discard)
+
+    async def _rediscover(
+        self,
+        chain_config: ChainConfig,
+        key: str,
+        watched: _WatchedToken,
+        price: Decimal
+    ):
+        # a drained or migrated pool is replaced by a full scan of the token
+        try:
+            scanner = LiquidityScanner([chain_config], self.session_factory, self.redis, rpc_class=RpcClass.WATCH)
+            result = await scanner.scan_token(watched.token_meta.address, price)
+
+            if result.display_chain is None or result.display_chain.chain_id != chain_config.chain_id:
+                return
+
+            route = LiquidityScanner.route_state(result)
+            replacement = self._watched_from_route(route)
+            if replacement is None:
+                return
+
+            self._rediscovered[(chain_config.chain_id, key)] = (
+                time.time() + float(settings.get("WATCH_REDISCOVERED_TTL", 3600)), route
+            )
+
+            tokens = self._tokens.get(chain_config.chain_id, {})
+            if tokens.get(key) is watched:
+                tokens[key] = replacement
+        except Exception as e:
+            module_logger.warning(f"Rediscovery of {watched.token_meta.address} on {chain_config.name} failed: {e}")
+        finally:
+            self._rediscovering.discard((chain_config.chain_id, key))
+
+
+watch_engine = WatchEngine()
@@ -0,0 +1,84 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.orm import sessionmaker
+
+from chains.dto import ChainConfig
+from db.repositories.watchlist import WatchlistRepository
+from services.dto import PoolUpdate
+from services.notifier import notifier
+from services.watch_engine import WatchConsumer
+from utils.utils import convert_price
+
+module_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Watcher:
+    item_id: int
+    telegram_id: int
+    last_price: Decimal | None
+    notify_change: Decimal
+
+
+class WatchlistNotifier(WatchConsumer):
+    def __init__(self):
+        self.session_factory: sessionmaker | None = None
+        # (chain_id, token address) -> users watching the token
+        self._watchers: dict[tuple[int, str], list[_Watcher]] = {}
+
+    async def load(self, session_factory: sessionmaker) -> list[dict[str, Any]]:
+        self.session_factory = session_factory
+
+        async with session_factory() as session:
+            rows = await WatchlistRepository(session).get_watched()
+
+        watchers, routes = defaultdict(list), {}
+        for item, address, chain_id, telegram_id in sorted(rows, key=lambda row: row[0].updated_at):
+            key = (chain_id, address.lower())
+            watchers[key].append(_Watcher(item.id, telegram_id, item.last_price, item.notify_change))
+            # the most recently updated route of a token is polled for everyone
+            routes[key] = item.route
+
+        self._watchers = dict(watchers)
+        return list(routes.values())
+
+    @staticmethod
+    def _format(chain_config: ChainConfig, update: PoolUpdate, change: Decimal) -> str:
+        token_meta = update.result.token_meta
+
+        return (
+            f"{'📈' if change > 0 else '📉'} <b><a href='{chain_config.explorer}token/{update.token_address}'>"
+            f"{token_meta.name}</a></b> <code>(${token_meta.ticker})</code> | {chain_config.name}\n\n"
+            f"💵 Price: <b>${convert_price(update.price_usd, Decimal(1))}</b> ({change:+.2f}%)\n"
+            f"🧢 MC: <b>${convert_price(update.result.market_cap, Decimal(1))}</b>\n\n"
+            f"📝 <code>{update.token_address}</code>"
+        )
+
+    async def on_updates(self, chain_config: ChainConfig, updates: list[PoolUpdate]):
+        notices, prices = [], {}
+
+        for update in updates:
+            for watcher in self._watchers.get((update.chain_id, update.token_address.lower()), []):
+                # the first price seen is the baseline, nothing to compare yet
+                if not watcher.last_price:
+                    watcher.last_price = prices[watcher.item_id] = update.price_usd
+                    continue
+
+                change = (update.price_usd / watcher.last_price - 1) * 100
+                if abs(change) < watcher.notify_change:
+                    continue
+
+                watcher.last_price = prices[watcher.item_id] = update.price_usd
+                notices.append((watcher.telegram_id, self._format(chain_config, update, change)))
+
+        if prices:
+            async with self.session_factory() as session:
+                await WatchlistRepository(session).set_last_prices(prices)
+                await session.commit()
+
+        for telegram_id, text in notices:
+            notifier.send(telegram_id, text)
@@ -4,3 +4,7 @@ from aiogram.fsm.state import StatesGroup, State
 class TokenInfo(StatesGroup):
     info = State()
     amount = State()
+    alert = State()
+    limit = State()
+    twap = State()
+    sltp = State()
@@ -15,4 +15,4 @@ broker = (
     .with_result_backend(result_backend)
 )
 
-from taskiq_app.tasks import eth_price
+from taskiq_app.tasks import eth_price, prewarm, scan, twap
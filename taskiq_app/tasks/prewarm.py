@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import math
+import time
+
+from redis.asyncio import Redis
+from taskiq import Context, TaskiqDepends
+
+from chains import registery
+from chains.dto import ChainConfig
+from clients.evm.dto import TokenMeta
+from clients.evm.scanner import LiquidityScanner
+from clients.evm.scheduler import rpc_scheduler
+from clients.evm.token import TokenService
+from config import settings
+from db.repositories.token import TokenRepository
+from enums.rpc import RpcClass
+from taskiq_app.broker import broker
+from utils import metrics
+
+module_logger = logging.getLogger(__name__)
+
+# [rank limit, blocks between refreshes], most viewed tokens first
+DEFAULT_TIERS = [[10, 1], [50, 5], [200, 20]]
+
+
+def refresh_intervals(chain_config: ChainConfig, count: int) -> list[int]:
+    tiers = settings.get("PREWARM_TIERS", DEFAULT_TIERS)
+
+    intervals = [
+        next((blocks for limit, blocks in tiers if rank < limit), tiers[-1][1])
+        for rank in range(count)
+    ]
+
+    # over budget every interval is stretched by the same factor, so the
+    # ordering by popularity is kept
+    budget = float(settings.get("PREWARM_BUDGET", 120))
+    demand = sum(60 / (blocks * chain_config.block_time) for blocks in intervals)
+
+    if demand > budget:
+        scale = demand / budget
+        intervals = [math.ceil(blocks * scale) for blocks in intervals]
+
+    return intervals
+
+
+async def prewarm_chain(
+    redis: Redis,
+    scanner: LiquidityScanner,
+    chain_config: ChainConfig,
+    tokens: list[TokenMeta],
+    window_end: float
+):
+    intervals = refresh_intervals(chain_config, len(tokens))
+    semaphore = asyncio.Semaphore(int(settings.get("PREWARM_CONCURRENCY", 5)))
+    counters = {"refreshed": 0, "failed": 0}
+
+    async def refresh(token_meta: TokenMeta):
+        async with semaphore:
+            try:
+                await scanner.refresh_chain(chain_config, token_meta)
+                counters["refreshed"] += 1
+            except Exception as e:
+                counters["failed"] += 1
+                module_logger.debug(f"Prewarm {chain_config.name} {token_meta.address} failed: {e}")
+
+    block = 0
+    while time.monotonic() < window_end:
+        started = time.monotonic()
+
+        due = [t for t, every in zip(tokens, intervals) if block % every == 0]
+        await asyncio.gather(*[refresh(t) for t in due])
+
+        block += 1
+        await asyncio.sleep(max(0.0, chain_config.block_time - (time.monotonic() - started)))
+
+    await metrics.incr(redis, f"prewarm:{chain_config.chain_id}", counters)
+
+
+@broker.task(schedule=[{"cron": "* * * * *"}])
+async def prewarm_popular_tokens_task(context: Context = TaskiqDepends()):
+    window_end = time.monotonic() + float(settings.get("PREWARM_WINDOW", 55))
+    top_n = settings.get("PREWARM_TIERS", DEFAULT_TIERS)[-1][0]
+
+    redis = context.state.redis
+    session_factory = context.state.session_factory
+
+    chain_configs = registery.list()
+    scanner = LiquidityScanner(chain_configs, session_factory, redis, rpc_class=RpcClass.PREWARM)
+
+    popular = {}
+    async with session_factory() as session:
+        token_repo = TokenRepository(session)
+
+        for chain_config in chain_configs:
+            tokens = await token_repo.get_popular(chain_config.chain_id, top_n)
+            popular[chain_config.chain_id] = [TokenService.meta_from_model(t) for t in tokens]
+
+            # one batch per chain keeps the stored metadata of the hot tokens
+            # fresh, the scans below price market caps with it
+            if tokens:
+                try:
+                    async with TokenService(chain_config) as token_service:
+                        async with rpc_scheduler.slot(chain_config, RpcClass.PREWARM):
+                            fresh = await token_service.get_tokens_meta(
+                                session, [t.address for t in tokens], chain_config.chain_id, refresh=True
+                            )
+                    popular[chain_config.chain_id] = [
+                        fresh.get(meta.address, meta) for meta in popular[chain_config.chain_id]
+                    ]
+                except Exception as e:
+                    module_logger.warning(f"Prewarm metadata refresh on {chain_config.name} failed: {e}")
+
+    await asyncio.gather(*[
+        prewarm_chain(redis, scanner, c, popular[c.chain_id], window_end)
+        for c in chain_configs
+        if popular[c.chain_id]
+    ])
+
+
+@broker.task(schedule=[{"cron": "0 * * * *"}])
+async def decay_token_views_task(context: Context = TaskiqDepends()):
+    # popularity follows recent views, a token nobody opens any more drops
+    # out of the prewarm tiers within a few hours
+    async with context.state.session_factory() as session:
+        await TokenRepository(session).decay_views(int(settings.get("PREWARM_VIEW_DECAY", 2)))
+        await session.commit()
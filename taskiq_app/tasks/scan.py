@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from taskiq import Context, TaskiqDepends, TaskiqEvents, TaskiqState
+
+from chains import registery
+from clients.evm.codec import dumps_text
+from clients.evm.scanner import LiquidityScanner
+from config import settings
+from taskiq_app.broker import broker
+from taskiq_app.tasks.eth_price import REDIS_DATA_URL
+
+
+@broker.on_event(TaskiqEvents.WORKER_STARTUP)
+async def open_scan_resources(state: TaskiqState):
+    state.redis = Redis.from_url(REDIS_DATA_URL, decode_responses=True)
+    state.engine = create_async_engine(
+        settings.POSTGRES_DSN,
+        pool_size=5,
+        max_overflow=5,
+        pool_pre_ping=True,
+    )
+    state.session_factory = sessionmaker(state.engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def close_scan_resources(state: TaskiqState):
+    await state.engine.dispose()
+    await state.redis.aclose()
+
+
+@broker.task(task_name="scan_token")
+async def scan_token_task(
+    token_address: str,
+    chain_ids: list[int],
+    price: str,
+    user_id: int | None = None,
+    context: Context = TaskiqDepends(),
+) -> str:
+    # user independent pool scan, balances stay with the caller
+    scanner = LiquidityScanner(
+        [registery.get(chain_id) for chain_id in chain_ids if registery.get(chain_id)],
+        context.state.session_factory,
+        context.state.redis,
+        user_id
+    )
+
+    result = await scanner.scan_token(token_address, Decimal(price))
+    return dumps_text(result)
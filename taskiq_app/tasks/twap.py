@@ -0,0 +1,30 @@
+import asyncio
+import logging
+import time
+
+from taskiq import Context, TaskiqDepends
+
+from config import settings
+from services.twap import TwapScheduler
+from taskiq_app.broker import broker
+
+module_logger = logging.getLogger(__name__)
+
+
+@broker.task(task_name="twap_tick", schedule=[{"cron": "* * * * *"}])
+async def twap_tick_task(context: Context = TaskiqDepends()):
+    # cron fires once a minute, the task ticks through the minute itself so
+    # slices keep second precision without a timer per order
+    window_end = time.monotonic() + float(settings.get("TWAP_WINDOW", 55))
+    interval = float(settings.get("TWAP_TICK", 5))
+    scheduler = TwapScheduler(context.state.session_factory, context.state.redis)
+
+    while time.monotonic() < window_end:
+        started = time.monotonic()
+
+        try:
+            await scheduler.tick()
+        except Exception as e:
+            module_logger.warning(f"TWAP tick failed: {e}")
+
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -1,3 +1,3 @@
 from taskiq_app.broker import broker
-from taskiq_app.tasks import eth_price
+from taskiq_app.tasks import eth_price, prewarm, scan, twap
 
@@ -0,0 +1,64 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+from chains import registery
+from clients.evm.dex.dto import PoolInfoAerodromeV2, PoolInfoV2, PoolInfoV3, TokenSnapshot
+from clients.evm.dto import TokenMeta
+from clients.evm.scan_cache import ChainScan, SkippedStage
+from clients.evm.scanner import BestPool, ChainWithToken, ScanResult
+
+
+@pytest.fixture(scope="session")
+def samples() -> dict[str, object]:
+    chain = registery.list()[0]
+    meta = TokenMeta("0x" + "ab" * 20, "Sample Token", "SMPL", 18, 10 ** 27)
+
+    v3 = PoolInfoV3(
+        pool="0x" + "11" * 20,
+        price_raw=Decimal("0.000000000123456789012345678"),
+        price=Decimal("0.000412345678901234567890"),
+        tvl=Decimal("1234567.891234567890123456"),
+        fee=3000,
+        sqrt_price=2 ** 150 + 12345,
+        liquidity_raw=2 ** 90 + 7,
+        amount_a=Decimal("1000.123456789012345678"),
+        amount_b=Decimal("52000.987654321098765432"),
+    )
+    v2 = PoolInfoV2("0x" + "22" * 20, Decimal("1.5"), Decimal("1.5"), Decimal("90000.5"), 10 ** 24, 10 ** 25)
+    aero = PoolInfoAerodromeV2("0x" + "33" * 20, Decimal("2.5"), Decimal("2.5"), Decimal("1000"), 10 ** 20, 10 ** 21, True)
+
+    snapshots = [
+        TokenSnapshot(
+            dex=dex,
+            version=version,
+            chain=chain,
+            token=meta.address,
+            weth=chain.weth_address,
+            meta=meta,
+            eth_token_pool=pool,
+            eth_stable_pools={"usdt": v2, "usdc": v3},
+            stable_token_pools={"usdt": aero, "usdc": None},
+            market_cap=Decimal("4123456.78"),
+        )
+        for dex, version, pool in [("uniswap", "v3", v3), ("uniswap", "v2", v2), ("aerodrome", "v2", aero)]
+    ]
+
+    best = BestPool(chain, "eth_token", "uniswap", "v3", v3, v3.tvl)
+    result = ScanResult(
+        route_type="direct",
+        chains_found=[ChainWithToken(c, meta) for c in registery.list()],
+        market_cap=Decimal("4123456.78"),
+        best_eth_token_pool=best,
+        best_eth_stable_pool=None,
+        best_stable_token_pool=None,
+        token_meta=meta,
+        token_price=Decimal("0.00412345678901234"),
+        token_price_raw=Decimal("0.000000000123456789012345678"),
+        skipped=[SkippedStage(chain.chain_id, chain.name, "snapshots", "aerodrome")],
+        wallet_balances={chain.chain_id: {"wallets": [{"id": 1, "address": "0x" + "44" * 20, "balance": "1.5"}]}},
+    )
+    scan = ChainScan(chain, meta, snapshots, 21_000_000, time.time())
+
+    return {"ScanResult": result, "ChainScan": scan}
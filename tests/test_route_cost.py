@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+from eth_abi import encode
+
+from chains import registery
+from clients.evm.dex.uniswap import UniswapV2Client
+from clients.evm.scanner import BestPool, ScanResult
+from clients.evm.swap import SwapClient
+
+LOW = "0x" + "01" * 20
+HIGH = "0x" + "fe" * 20
+
+
+def _v2_pool(client: UniswapV2Client, base: str, target: str, base_amount: int, target_amount: int, decimals: dict[str, int]):
+    pair = client._create_token_pair(base, target, decimals[base], decimals[target])
+    amounts = {base: base_amount * 10 ** decimals[base], target: target_amount * 10 ** decimals[target]}
+    data = encode(["uint112", "uint112", "uint32"], [amounts[pair.token_a], amounts[pair.token_b], 0])
+    return client._parse_pool_chunk((True, data), "0x" + "22" * 20, pair)
+
+
+def _scan(route_type: str, **pools: BestPool) -> ScanResult:
+    return ScanResult(
+        route_type=route_type,
+        chains_found=[],
+        market_cap=Decimal(0),
+        best_eth_token_pool=pools.get("eth_token"),
+        best_eth_stable_pool=pools.get("eth_stable"),
+        best_stable_token_pool=pools.get("stable_token"),
+        token_meta=None,
+        token_price=Decimal(0),
+        token_price_raw=Decimal(0),
+    )
+
+
+def _expected(*reserves_eth: Decimal) -> Decimal:
+    kept = Decimal(1)
+    for reserve in reserves_eth:
+        kept *= (1 - SwapClient.V2_FEE) * (1 - 1 / (reserve + 1))
+    return (1 - kept) * 100
+
+
+def test_direct_route_cost():
+    chain = registery.list()[0]
+    client = UniswapV2Client(chain)
+    weth, token = LOW, HIGH
+    pool = _v2_pool(client, weth, token, 100, 5_000_000, {weth: 18, token: 18})
+
+    best = BestPool(chain, "eth_token", "uniswap", "v2", pool, pool.tvl)
+    cost = SwapClient._route_cost(_scan("direct", eth_token=best), 10 ** 18)
+
+    assert cost == pytest.approx(_expected(Decimal(100)))
+
+
+# the stable sits on either side of the sort order, so both pool orientations are covered
+@pytest.mark.parametrize("weth, stable, token", [(LOW, "0x" + "80" * 20, HIGH), (HIGH, "0x" + "02" * 20, "0x" + "fd" * 20)])
+def test_multihop_route_cost(weth: str, stable: str, token: str):
+    chain = registery.list()[0]
+    client = UniswapV2Client(chain)
+    decimals = {weth: 18, stable: 6, token: 18}
+
+    # 1 eth = 3000 usd, the stable/token pool holds 60000 usd a side, i.e. 20 eth
+    eth_stable = _v2_pool(client, weth, stable, 100, 300_000, decimals)
+    stable_token = _v2_pool(client, stable, token, 60_000, 1_000_000, decimals)
+
+    result = _scan(
+        "multihop",
+        eth_stable=BestPool(chain, "eth_stable", "uniswap", "v2", eth_stable, eth_stable.tvl),
+        stable_token=BestPool(chain, "stable_token", "uniswap", "v2", stable_token, stable_token.tvl),
+    )
+    cost = SwapClient._route_cost(result, 10 ** 18)
+
+    assert cost == pytest.approx(_expected(Decimal(100), Decimal(20)))
@@ -0,0 +1,24 @@
+import msgpack
+import pytest
+
+from clients.evm import codec
+
+
+@pytest.mark.parametrize("name", ["ScanResult", "ChainScan"])
+def test_round_trip(samples, name):
+    value = samples[name]
+
+    assert codec.loads(codec.dumps(value)) == value
+    assert codec.loads_text(codec.dumps_text(value)) == value
+
+
+def test_other_version_is_rejected():
+    with pytest.raises(codec.CodecError):
+        codec.loads(b"{" + codec.dumps(1)[1:])
+
+
+def test_unknown_chain_is_rejected():
+    payload = msgpack.packb(msgpack.ExtType(codec.EXT_CHAIN, (999_999).to_bytes(8, "big")))
+
+    with pytest.raises(codec.CodecError):
+        codec.loads(bytes([codec.VERSION]) + payload)
@@ -0,0 +1,46 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+from config import settings
+
+
+def _run_jobs(fn: Callable, jobs: list, args: tuple) -> list:
+    return [fn(job, *args) for job in jobs]
+
+
+class CpuExecutor:
+    # created on the first offloaded batch, shared by the whole process
+    _pool: ProcessPoolExecutor | None = None
+
+    @classmethod
+    def _get_pool(cls) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            workers = int(settings.get("CPU_WORKERS", 0)) or max(1, (os.cpu_count() or 2) - 1)
+            cls._pool = ProcessPoolExecutor(max_workers=workers)
+        return cls._pool
+
+    @classmethod
+    async def map(cls, fn: Callable, jobs: list, *args: Any) -> list:
+        # small batches are cheaper inline than pickled to another process,
+        # fn and its arguments must be importable module-level objects
+        if len(jobs) < int(settings.get("CPU_OFFLOAD_MIN_BATCH", 200)):
+            return _run_jobs(fn, jobs, args)
+
+        chunk_size = int(settings.get("CPU_OFFLOAD_CHUNK", 250))
+        loop = asyncio.get_running_loop()
+        pool = cls._get_pool()
+
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(pool, _run_jobs, fn, jobs[i:i + chunk_size], args)
+            for i in range(0, len(jobs), chunk_size)
+        ])
+
+        return [result for chunk in chunks for result in chunk]
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(cancel_futures=True)
+            cls._pool = None
@@ -0,0 +1,28 @@
+from redis.asyncio import Redis
+
+METRICS_PREFIX = "metrics"
+
+
+def metrics_key(name: str) -> str:
+    return f"{METRICS_PREFIX}:{name}"
+
+
+async def incr(redis: Redis, name: str, counters: dict[str, int | float]):
+    pipe = redis.pipeline(transaction=False)
+
+    for field, amount in counters.items():
+        if isinstance(amount, float):
+            pipe.hincrbyfloat(metrics_key(name), field, amount)
+        else:
+            pipe.hincrby(metrics_key(name), field, amount)
+
+    await pipe.execute()
+
+
+async def get(redis: Redis, name: str) -> dict[str, float]:
+    raw = await redis.hgetall(metrics_key(name))
+
+    return {
+        (k.decode() if isinstance(k, bytes) else k): float(v)
+        for k, v in raw.items()
+    }
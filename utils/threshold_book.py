@@ -0,0 +1,33 @@
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from typing import Any
+
+
+class ThresholdBook:
+    # items sorted by threshold price, crossed items are found and removed
+    # with one bisect and one slice
+    def __init__(self):
+        self._prices: list[Decimal] = []
+        self._items: list[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, price: Decimal, item: Any):
+        i = bisect_right(self._prices, price)
+        self._prices.insert(i, price)
+        self._items.insert(i, item)
+
+    def pop_at_or_below(self, price: Decimal) -> list[Any]:
+        # thresholds a rising price has reached
+        i = bisect_right(self._prices, price)
+        items = self._items[:i]
+        del self._prices[:i], self._items[:i]
+        return items
+
+    def pop_at_or_above(self, price: Decimal) -> list[Any]:
+        # thresholds a falling price has reached
+        i = bisect_left(self._prices, price)
+        items = self._items[i:]
+        del self._prices[i:], self._items[i:]
+        return items